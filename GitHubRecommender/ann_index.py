@@ -0,0 +1,275 @@
+import time
+
+# Default number of hash tables and of bits (random hyperplanes) per table
+DEFAULT_TABLES = 8
+DEFAULT_BITS = 12
+
+# Default number of neighbouring buckets, differing in one bit, probed per table in addition to the exact bucket
+DEFAULT_PROBES = 4
+
+# Recommendation backends: the exact similarity to every repository, or the approximate search of an LSHIndex
+EXACT_BACKEND = 'exact'
+LSH_BACKEND = 'lsh'
+RECOMMENDER_BACKENDS = (EXACT_BACKEND, LSH_BACKEND)
+
+
+class LSHIndex:
+    """
+    An approximate nearest-neighbour index for cosine similarity, based on random-projection locality-sensitive
+    hashing and written with NumPy only.
+
+    Every row is hashed in each of n_tables tables by the signs of its projections on n_bits random hyperplanes.
+    Rows pointing in similar directions share a bucket with high probability, so a query only computes the exact
+    similarity of the rows in its buckets instead of the whole corpus. The buckets of a table are stored as sorted
+    arrays of hash keys and looked up with binary search.
+
+    Recall and latency are tuned with three parameters: more tables and more probes find more true neighbours at the
+    cost of more candidates, while more bits make buckets smaller and queries faster but miss more neighbours.
+
+    :param matrix: The feature matrix with one row per repository, e.g. the matrix of a recommender_system.TfidfIndex.
+    :type matrix: scipy.sparse.spmatrix
+    :param n_tables: The number of hash tables.
+    :type n_tables: int
+    :param n_bits: The number of bits per hash key, at most 63.
+    :type n_bits: int
+    :param n_probes: The number of neighbouring buckets probed per table, from 0 to n_bits.
+    :type n_probes: int
+    :param seed: The seed of the random hyperplanes.
+    :type seed: int
+    """
+
+    def __init__(self, matrix, n_tables=DEFAULT_TABLES, n_bits=DEFAULT_BITS, n_probes=DEFAULT_PROBES, seed=0):
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        if n_tables < 1:
+            raise ValueError(f"n_tables must be at least 1, got {n_tables}")
+        if not 1 <= n_bits <= 63:
+            raise ValueError(f"n_bits must be between 1 and 63, got {n_bits}")
+
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.n_probes = min(max(n_probes, 0), n_bits)
+        self.matrix = normalize(matrix.tocsr(), norm='l2')
+
+        rng = np.random.default_rng(seed)
+        self.hyperplanes = rng.standard_normal((self.matrix.shape[1], n_tables * n_bits)).astype(np.float32)
+        self._weights = np.left_shift(np.uint64(1), np.arange(n_bits, dtype=np.uint64))
+
+        keys = self._keys(self.matrix @ self.hyperplanes)
+        self._order = np.argsort(keys, axis=0, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=0)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _keys(self, projections):
+        import numpy as np
+
+        bits = (np.asarray(projections) > 0).reshape(-1, self.n_tables, self.n_bits).astype(np.uint64)
+        return (bits * self._weights).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, vector):
+        """
+        Returns the rows that share a probed bucket with a query vector.
+
+        :param vector: The query, a matrix of one row with the columns of the indexed matrix.
+        :type vector: scipy.sparse.spmatrix or numpy.ndarray
+
+        :return: The sorted, unique candidate rows.
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+
+        keys = self._keys(vector @ self.hyperplanes)[0]
+        flips = np.concatenate(([np.uint64(0)], self._weights[:self.n_probes]))
+
+        found = []
+        for table in range(self.n_tables):
+            probes = keys[table] ^ flips
+            starts = np.searchsorted(self._sorted_keys[:, table], probes, side='left')
+            stops = np.searchsorted(self._sorted_keys[:, table], probes, side='right')
+            found.extend(self._order[start:stop, table] for start, stop in zip(starts, stops) if stop > start)
+
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def query(self, vector, top_n=5, exclude=None, allowed=None):
+        """
+        Finds the approximate top-n most similar rows to a query vector.
+
+        :param vector: The query, a matrix of one row with the columns of the indexed matrix.
+        :type vector: scipy.sparse.spmatrix or numpy.ndarray
+        :param top_n: The number of rows to return.
+        :type top_n: int
+        :param exclude: A row that is never returned, e.g. the row of the query itself.
+        :type exclude: int or None
+        :param allowed: A boolean array marking the rows that may be returned, e.g. recommender_system.language_mask.
+                        None allows every row.
+        :type allowed: numpy.ndarray or None
+
+        :return: The rows and their cosine similarities, most similar first. Fewer than top_n rows are returned if the
+                 probed buckets hold fewer (allowed) candidates.
+        :rtype: tuple of (numpy.ndarray, numpy.ndarray)
+        """
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        if top_n < 1:
+            raise ValueError(f"top_n must be at least 1, got {top_n}")
+
+        candidates = self.candidates(vector)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+
+        # Rank the candidates by their exact similarity
+        product = self.matrix[candidates] @ normalize(vector, norm='l2').T
+        scores = (product.toarray() if hasattr(product, 'toarray') else np.asarray(product)).ravel()
+        if len(candidates) > top_n:
+            best = np.argpartition(-scores, top_n - 1)[:top_n]
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((candidates, -scores))
+        return candidates[order], scores[order]
+
+    def top_n(self, base_repo_id, top_n=5):
+        """
+        Returns the rows of the repositories most similar to an indexed repository.
+
+        :param base_repo_id: The row index of the repository.
+        :type base_repo_id: int
+        :param top_n: The number of rows to return.
+        :type top_n: int
+
+        :return: The row indices, most similar first, excluding the repository itself.
+        :rtype: numpy.ndarray
+        """
+        return self.query(self.matrix[base_repo_id], top_n, exclude=base_repo_id)[0]
+
+
+def ann_recommendation(repositories, base_repo_id, use_additional_features=False, top_n=5, index=None,
+                       feature_weights=None, language=None, ann_index=None, **lsh_parameters):
+    """
+    The approximate counterpart of recommender_system.content_based_recommendation.
+
+    It takes the same arguments and returns recommendations in the same form, but only compares the base repository
+    with the candidates found by an LSHIndex.
+
+    :param repositories: A list of repository dictionaries.
+    :type repositories: list of dict
+    :param base_repo_id: The index in repositories of the repository to get recommendations for.
+    :type base_repo_id: int
+    :param use_additional_features: Whether the language and stars are combined with the descriptions.
+    :type use_additional_features: bool
+    :param top_n: The number of recommendations.
+    :type top_n: int
+    :param index: A prebuilt TF-IDF index of the repositories.
+    :type index: recommender_system.TfidfIndex or None
+    :param feature_weights: The weights of the hybrid feature blocks.
+    :type feature_weights: dict or None
+    :param language: Only recommend repositories of this language (case-insensitive). None recommends any.
+    :type language: str or None
+    :param ann_index: A prebuilt LSH index over the same features. It is reused for many queries, so building it once
+                      is what makes the approximate search pay off.
+    :type ann_index: LSHIndex or None
+    :param lsh_parameters: The parameters of the LSHIndex built when ann_index is not given.
+
+    :return: The recommended repositories, most similar first.
+    :rtype: list of dict
+    """
+    from .recommender_system import TfidfIndex, hybrid_matrix, language_mask
+
+    if ann_index is None:
+        index = index if index is not None else TfidfIndex.build(repositories)
+        matrix = index.matrix if not use_additional_features else hybrid_matrix(index.matrix, repositories,
+                                                                                feature_weights)
+        ann_index = LSHIndex(matrix, **lsh_parameters)
+    allowed = language_mask(repositories, language) if language is not None else None
+    rows, _ = ann_index.query(ann_index.matrix[base_repo_id], top_n, exclude=base_repo_id, allowed=allowed)
+    return [repositories[i] for i in rows]
+
+
+def add_backend_arguments(parser):
+    """
+    Adds the options that select the recommender backend and tune the LSH index to a command line parser.
+
+    :param parser: The parser of a command line entry point.
+    :type parser: argparse.ArgumentParser
+
+    :return: None
+    """
+    parser.add_argument('--recommender', default=EXACT_BACKEND, choices=RECOMMENDER_BACKENDS, help='Compare a repository with every other one (exact) or only with the candidates of an LSH index (lsh), which is much faster for very large catalogs')
+    parser.add_argument('--lsh-tables', default=DEFAULT_TABLES, type=int, help='Number of LSH hash tables (more find more true neighbours)')
+    parser.add_argument('--lsh-bits', default=DEFAULT_BITS, type=int, help='Number of bits per LSH hash key (more make queries faster but miss more neighbours)')
+    parser.add_argument('--lsh-probes', default=DEFAULT_PROBES, type=int, help='Number of neighbouring LSH buckets probed per table')
+
+
+def lsh_parameters(args):
+    """
+    Returns the LSH index parameters of parsed command line arguments, see add_backend_arguments.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+
+    :return: The keyword arguments of LSHIndex.
+    :rtype: dict
+    """
+    return {'n_tables': args.lsh_tables, 'n_bits': args.lsh_bits, 'n_probes': args.lsh_probes}
+
+
+def recall_at_k(ann_index, k=10, queries=None, sample=100, seed=0):
+    """
+    Measures the recall@k of an LSH index against the exact cosine similarity, and the latency of both.
+
+    A returned row counts as a true neighbour if its similarity is at least the k-th best exact similarity, so that
+    ties in the exact ranking do not count as misses.
+
+    :param ann_index: The index to evaluate.
+    :type ann_index: LSHIndex
+    :param k: The number of neighbours per query.
+    :type k: int
+    :param queries: The rows used as queries. Defaults to a random sample of rows.
+    :type queries: list of int or None
+    :param sample: The number of rows sampled when queries is not given.
+    :type sample: int
+    :param seed: The seed of the sample.
+    :type seed: int
+
+    :return: A dictionary with the mean 'recall', the mean number of exact similarities computed per query
+             ('candidates'), the mean latencies in seconds of the approximate and the exact query ('ann_seconds' and
+             'exact_seconds'), and the number of 'queries'.
+    :rtype: dict
+    """
+    import numpy as np
+
+    matrix = ann_index.matrix
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows - 1)
+    if queries is None:
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(n_rows, size=min(sample, n_rows), replace=False)
+
+    recalls, candidates = [], []
+    ann_seconds = exact_seconds = 0.0
+    for row in queries:
+        start = time.perf_counter()
+        found, _ = ann_index.query(matrix[row], k, exclude=row)
+        ann_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = (matrix @ matrix[row].T).toarray().ravel()
+        scores[row] = -np.inf
+        threshold = np.partition(scores, n_rows - k)[n_rows - k]
+        exact_seconds += time.perf_counter() - start
+
+        recalls.append(np.count_nonzero(scores[found] >= threshold) / k)
+        candidates.append(len(ann_index.candidates(matrix[row])))
+
+    count = max(len(queries), 1)
+    return {
+        'recall': float(np.mean(recalls)) if recalls else 0.0,
+        'candidates': float(np.mean(candidates)) if candidates else 0.0,
+        'ann_seconds': ann_seconds / count,
+        'exact_seconds': exact_seconds / count,
+        'queries': len(queries),
+    }
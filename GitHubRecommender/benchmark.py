@@ -0,0 +1,462 @@
+import argparse
+import base64
+import json
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Corpus sizes benchmarked by default
+DEFAULT_SIZES = (100, 10000, 100000)
+
+# Network stages fetch at most this many repositories, the most the GitHub search API returns for one query
+DEFAULT_NETWORK_LIMIT = 1000
+
+# Number of recommendation queries timed per corpus
+DEFAULT_QUERIES = 20
+
+# Size of the corpus processed once before the timed runs
+WARMUP_SIZE = 10
+
+# Allowed slowdown of a stage against a baseline before it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Stages in the order they run, with the corpus they work on
+NETWORK_STAGES = ('search', 'readme_fetch', 'news')
+STAGES = NETWORK_STAGES + ('scoring', 'scoring_batch', 'process_repositories', 'process_repositories_batch',
+                           'clean_and_transform', 'clean_and_transform_batch', 'vectorization', 'recommendation')
+
+WORDS = ('python', 'library', 'framework', 'tool', 'fast', 'simple', 'web', 'data', 'machine', 'learning', 'api',
+         'client', 'server', 'async', 'testing', 'cli', 'parser', 'database', 'orm', 'plotting', 'scientific',
+         'computing', 'deep', 'neural', 'network', 'tutorial', 'beginner', 'guide', 'examples', 'automation',
+         'scraping', 'crawler', 'http', 'json', 'yaml', 'config', 'logging', 'game', 'engine', 'image', 'audio',
+         'video', 'text', 'nlp', 'vision', 'cloud', 'deployment', 'docker', 'kubernetes', 'security')
+LANGUAGES = ('Python', 'Python', 'Python', 'Jupyter Notebook', 'C++', 'JavaScript', None)
+README_SECTIONS = ('## Getting Started\n', '## Requirements\n', 'Join us on Discord. ', 'See the FAQ? ',
+                   'WARNING: experimental. ', 'A quick start tutorial with examples. ', 'API documentation. ',
+                   'Install with pip. ', 'This project has no limits. ', 'Watch the demo video. ')
+
+
+def _words(i, count, offset):
+    return ' '.join(WORDS[(i * 7 + offset * (k + 3) + k * k) % len(WORDS)] for k in range(count))
+
+
+def make_repository(i):
+    """
+    Generates the search result of a synthetic repository. The same index always gives the same repository.
+
+    :param i: The index of the repository.
+    :type i: int
+
+    :return: A repository dictionary with the fields the package reads from the GitHub search API.
+    :rtype: dict
+    """
+    owner, name = f'owner{i % 997}', f'repo{i}'
+    return {
+        'full_name': f'{owner}/{name}',
+        'name': f'{name.title()}-{WORDS[i % len(WORDS)]}.py',
+        'description': f'A {_words(i, 4 + i % 9, 1)} for {_words(i, 3, 2)}',
+        'language': LANGUAGES[i % len(LANGUAGES)],
+        'stargazers_count': 1000 + (i * 7919) % 90000,
+        'open_issues_count': i % 250,
+        'html_url': f'https://github.com/{owner}/{name}',
+        'url': f'https://api.github.com/repos/{owner}/{name}',
+        'pushed_at': '2023-10-01T00:00:00Z',
+        'updated_at': '2023-10-02T00:00:00Z',
+    }
+
+
+def make_readme(i):
+    """
+    Generates the README of a synthetic repository, mixing the sections the learning score looks for.
+
+    :param i: The index of the repository.
+    :type i: int
+
+    :return: The README content.
+    :rtype: str
+    """
+    sections = [README_SECTIONS[(i + k * k) % len(README_SECTIONS)] for k in range(3 + i % 12)]
+    return f'# repo{i}\n\n' + ''.join(section + _words(i + k, 20, k) + '\n\n' for k, section in enumerate(sections))
+
+
+def make_corpus(size):
+    """
+    Generates a corpus of synthetic repositories.
+
+    :param size: The number of repositories.
+    :type size: int
+
+    :return: The search results of the repositories.
+    :rtype: list of dict
+    """
+    return [make_repository(i) for i in range(size)]
+
+
+def make_news_page(days=10, posts_per_day=5):
+    """
+    Generates a page laid out like planetpython.org.
+
+    :param days: The number of date headers.
+    :type days: int
+    :param posts_per_day: The number of posts under each date header.
+    :type posts_per_day: int
+
+    :return: The HTML of the page.
+    :rtype: str
+    """
+    parts = ['<html><head><title>Planet Python</title></head><body><div id="body-main">']
+    for day in range(days):
+        date = f'October {28 - day}, 2023'
+        parts.append(f'<h2>{date}</h2><hr>')
+        for post in range(posts_per_day):
+            link = f'https://example.com/{day}/{post}/'
+            parts.append(f'<h3 class="post"><a href="https://example.com/">Blog {post}</a></h3>'
+                         f'<h4><a href="{link}">{_words(day + post, 6, 3)}</a></h4>'
+                         f'<div class="content"><p>{_words(post, 80, day)}</p></div>'
+                         f'<p><em><a href="{link}">{date} {post % 12 + 1:02d}:00 PM UTC</a></em></p><hr>')
+    parts.append('</div></body></html>')
+    return ''.join(parts)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Send every response right away, as a real server does, instead of waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        status, payload, content_type = 404, {'message': 'Not Found'}, 'application/json'
+
+        if url.path == '/search/repositories':
+            per_page, page = int(query.get('per_page', ['30'])[0]), int(query.get('page', ['1'])[0])
+            start = (page - 1) * per_page
+            items = [make_repository(i) for i in range(start, min(start + per_page, server.corpus_size))]
+            status, payload = 200, {'total_count': server.corpus_size, 'items': items}
+        elif url.path.startswith('/repos/') and url.path.endswith('/readme'):
+            i = int(url.path.split('/')[3][len('repo'):])
+            content = base64.b64encode(make_readme(i).encode()).decode()
+            status, payload = 200, {'content': content, 'encoding': 'base64', 'sha': f'sha{i}'}
+        elif url.path.startswith('/repos/') and url.path.endswith('/issues'):
+            i = int(url.path.split('/')[3][len('repo'):])
+            status, payload = 200, [{'number': n} for n in range(i % 7)] if query.get('page') == ['1'] else []
+        elif url.path == '/planetpython/':
+            status, payload, content_type = 200, server.news_page, 'text/html; charset=utf-8'
+
+        body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing their pooled keep-alive connections are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandInServer:
+    """
+    A local stand-in for the GitHub API and planetpython.org, serving a synthetic corpus.
+
+    It answers the search, README and issue requests of the package with the repositories of make_repository and
+    make_readme, and serves a news page at news_url, so that the whole pipeline runs without network access. Every
+    response can be delayed to simulate the latency of the real services.
+
+    :param corpus_size: The number of repositories the search API reports and serves.
+    :type corpus_size: int
+    :param latency: The delay in seconds added to every response.
+    :type latency: float
+    :param news_page: The HTML served as the planetpython.org page. Defaults to make_news_page().
+    :type news_page: str or None
+    """
+
+    def __init__(self, corpus_size=DEFAULT_NETWORK_LIMIT, latency=0.0, news_page=None):
+        self._server = _StandInHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self._server.corpus_size = corpus_size
+        self._server.latency = latency
+        self._server.news_page = news_page if news_page is not None else make_news_page()
+        self._server.requests = 0
+        self._server.lock = threading.Lock()
+        self.url = f'http://127.0.0.1:{self._server.server_port}'
+        self.news_url = f'{self.url}/planetpython/'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def requests(self):
+        """
+        The number of requests served so far.
+
+        :rtype: int
+        """
+        return self._server.requests
+
+    def client(self, pool_maxsize=None):
+        """
+        Creates an HTTP client for the stand-in, to be installed with http_client.set_client.
+
+        :param pool_maxsize: The maximum number of pooled connections.
+        :type pool_maxsize: int or None
+
+        :return: The client.
+        :rtype: http_client.HTTPClient
+        """
+        from .http_client import DEFAULT_POOL_MAXSIZE, HTTPClient
+
+        return HTTPClient(token='', api_url=self.url, pool_maxsize=pool_maxsize or DEFAULT_POOL_MAXSIZE)
+
+    def close(self):
+        """
+        Stops the server.
+
+        :return: None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _record(results, stage, repos, items, seconds):
+    results.append({'stage': stage, 'repos': repos, 'items': items, 'seconds': seconds,
+                    'items_per_second': items / seconds if seconds > 0 else None})
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark_network(size, latency=0.0, workers=8, stages=STAGES):
+    """
+    Times the stages that talk to GitHub and planetpython.org against a StandInServer.
+
+    :param size: The number of repositories fetched.
+    :type size: int
+    :param latency: The delay in seconds of every response.
+    :type latency: float
+    :param workers: The number of concurrent README fetches.
+    :type workers: int
+    :param stages: The stages to run.
+    :type stages: iterable of str
+
+    :return: One result dictionary per stage, see run_benchmark.
+    :rtype: list of dict
+    """
+    from .data_acquisition import fetch_readme_blob
+    from .fetch_repos import iter_search_pages
+    from .http_client import get_client, set_client
+    from .news_parser import fetch_news
+
+    results = []
+    previous = get_client()
+    with StandInServer(size, latency) as server:
+        set_client(server.client(pool_maxsize=workers))
+        try:
+            url = f'{server.url}/search/repositories?q=language:python&sort=stars'
+            if 'search' in stages:
+                pages, seconds = _timed(lambda: list(iter_search_pages(url, max_repos=size)))
+                _record(results, 'search', size, sum(len(page) for page in pages), seconds)
+            if 'readme_fetch' in stages:
+                names = [make_repository(i)['full_name'] for i in range(size)]
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    readmes, seconds = _timed(lambda: list(executor.map(fetch_readme_blob, names)))
+                _record(results, 'readme_fetch', size, len(readmes), seconds)
+            if 'news' in stages:
+                (day_articles, posts), seconds = _timed(lambda: fetch_news(days=3, posts=10, url=server.news_url))
+                _record(results, 'news', size, len(day_articles) + len(posts), seconds)
+        finally:
+            get_client().close()
+            set_client(previous)
+    return results
+
+
+def benchmark_processing(size, queries=DEFAULT_QUERIES, stages=STAGES):
+    """
+    Times the stages that score, process, vectorize and recommend a synthetic corpus, without any network access.
+
+    :param size: The number of repositories of the corpus.
+    :type size: int
+    :param queries: The number of recommendation queries timed.
+    :type queries: int
+    :param stages: The stages to run.
+    :type stages: iterable of str
+
+    :return: One result dictionary per stage, see run_benchmark.
+    :rtype: list of dict
+    """
+    from .data_processing import (clean_and_transform, clean_and_transform_batch,
+                                  evaluate_learning_friendliness_batch, process_repositories,
+                                  process_repositories_batch, rank_repositories, score_repository)
+    from .recommender_system import TfidfIndex, content_based_recommendation
+
+    results = []
+    corpus = make_corpus(size)
+    readmes = [make_readme(i) for i in range(size)]
+
+    def score():
+        return rank_repositories([score_repository(repo, readme) for repo, readme in zip(corpus, readmes)])
+
+    def score_batch():
+        return evaluate_learning_friendliness_batch(readmes)
+
+    for stage, function in (('scoring', score), ('scoring_batch', score_batch),
+                            ('process_repositories', lambda: process_repositories(corpus)),
+                            ('process_repositories_batch', lambda: process_repositories_batch(corpus))):
+        if stage in stages:
+            _, seconds = _timed(function)
+            _record(results, stage, size, size, seconds)
+
+    # clean_and_transform works in place, so each version gets its own copy
+    for stage, function in (('clean_and_transform', clean_and_transform),
+                            ('clean_and_transform_batch', clean_and_transform_batch)):
+        if stage in stages:
+            data = [dict(repo) for repo in corpus]
+            _, seconds = _timed(function, data)
+            _record(results, stage, size, size, seconds)
+
+    repositories = process_repositories(corpus)
+    index = None
+    if 'vectorization' in stages or 'recommendation' in stages:
+        index, seconds = _timed(TfidfIndex.build, repositories)
+        if 'vectorization' in stages:
+            _record(results, 'vectorization', size, size, seconds)
+    if 'recommendation' in stages:
+        rows = [(i * 7919) % size for i in range(min(queries, size))]
+        _, seconds = _timed(lambda: [content_based_recommendation(repositories, row, index=index) for row in rows])
+        _record(results, 'recommendation', size, len(rows), seconds)
+    return results
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, latency=0.0, network_limit=DEFAULT_NETWORK_LIMIT, workers=8,
+                  queries=DEFAULT_QUERIES, stages=STAGES):
+    """
+    Runs every stage of the pipeline on corpora of the given sizes and times each stage separately.
+
+    The network stages fetch at most network_limit repositories from a StandInServer, as GitHub never returns more
+    for one search; all other stages work on the whole corpus.
+
+    :param sizes: The numbers of repositories of the corpora.
+    :type sizes: iterable of int
+    :param latency: The delay in seconds of every response of the stand-in server.
+    :type latency: float
+    :param network_limit: The maximum number of repositories of the network stages.
+    :type network_limit: int
+    :param workers: The number of concurrent README fetches.
+    :type workers: int
+    :param queries: The number of recommendation queries timed per corpus.
+    :type queries: int
+    :param stages: The stages to run, a subset of STAGES.
+    :type stages: iterable of str
+
+    :return: A dictionary with the 'environment' and parameters of the run, and its 'results': one dictionary per
+             stage and corpus with the 'stage', the corpus size ('repos'), the number of 'items' processed (e.g.
+             queries), the 'seconds' it took and the 'items_per_second'.
+    :rtype: dict
+    """
+    stages = tuple(stages)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    # Load the lazily imported dependencies (numpy, scikit-learn) first, so the first corpus does not pay for them
+    benchmark_processing(WARMUP_SIZE, 1, stages)
+
+    results = []
+    for size in sizes:
+        if any(stage in stages for stage in NETWORK_STAGES):
+            results.extend(benchmark_network(min(size, network_limit), latency, workers, stages))
+        results.extend(benchmark_processing(size, queries, stages))
+
+    return {
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'created_at': time.time()},
+        'parameters': {'sizes': list(sizes), 'latency': latency, 'network_limit': network_limit,
+                       'workers': workers, 'queries': queries},
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds the stages that got slower than in a baseline run.
+
+    :param results: The results of run_benchmark.
+    :type results: dict
+    :param baseline: The results of an earlier run_benchmark, e.g. of the main branch.
+    :type baseline: dict
+    :param tolerance: The allowed relative slowdown, e.g. 0.25 for 25%.
+    :type tolerance: float
+
+    :return: The regressions, as dictionaries with the 'stage', 'repos', the 'seconds' of both runs and the 'ratio'
+             of the times. Stages that are not in both runs are skipped.
+    :rtype: list of dict
+    """
+    previous = {(result['stage'], result['repos']): result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        before = previous.get((result['stage'], result['repos']))
+        if before and result['seconds'] > before * (1 + tolerance):
+            regressions.append({'stage': result['stage'], 'repos': result['repos'], 'baseline_seconds': before,
+                                'seconds': result['seconds'], 'ratio': result['seconds'] / before})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of every stage of the recommender pipeline')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, type=int, help='Numbers of repositories of the benchmarked corpora')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help='Stages to benchmark')
+    parser.add_argument('--latency', default=0.0, type=float, help='Seconds added to every response of the stand-in GitHub server')
+    parser.add_argument('--network-limit', default=DEFAULT_NETWORK_LIMIT, type=int, help='Maximum number of repositories fetched by the network stages')
+    parser.add_argument('-w', '--workers', default=8, type=int, help='Number of READMEs fetched concurrently')
+    parser.add_argument('--queries', default=DEFAULT_QUERIES, type=int, help='Number of recommendation queries timed per corpus')
+    parser.add_argument('-o', '--output', default=None, type=str, help='Write the results as JSON to this file instead of standard output')
+    parser.add_argument('--baseline', default=None, type=str, help='Compare with the JSON results of an earlier run and fail on regressions')
+    parser.add_argument('--tolerance', default=DEFAULT_TOLERANCE, type=float, help='Allowed relative slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.latency, args.network_limit, args.workers, args.queries, args.stages)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression['stage']} on {regression['repos']} repositories took "
+                  f"{regression['seconds']:.3f}s instead of {regression['baseline_seconds']:.3f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
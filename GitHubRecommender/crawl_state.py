@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# Default location of the crawl state database
+DEFAULT_STATE_PATH = 'crawl_state.db'
+
+CrawlRecord = namedtuple('CrawlRecord', ['full_name', 'pushed_at', 'updated_at', 'readme_sha', 'learning_score',
+                                         'crawled_at'])
+
+
+class CrawlState:
+    """
+    Remembers what every repository looked like at the previous crawl, so that a recrawl only fetches and rescores
+    the repositories that changed.
+
+    For each repository the 'pushed_at' and 'updated_at' timestamps of the search result, the SHA of the README blob
+    and the learning score computed from it are stored. A README can only change through a push, so a repository
+    whose 'pushed_at' is unchanged keeps its stored learning score without its README being fetched. A repository that
+    was pushed to has its README fetched again, but is only rescored if the README blob SHA differs.
+
+    :param path: The path of the SQLite database file. Use ':memory:' for a state that is not persisted.
+    :type path: str
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.reused = 0
+        self.refetched = 0
+        self.rescored = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS repositories (
+                full_name TEXT PRIMARY KEY,
+                pushed_at TEXT,
+                updated_at TEXT,
+                readme_sha TEXT,
+                learning_score INTEGER NOT NULL,
+                crawled_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, full_name):
+        """
+        Looks up the state of a repository at the previous crawl.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+
+        :return: The stored record, or None if the repository was never crawled.
+        :rtype: CrawlRecord or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT full_name, pushed_at, updated_at, readme_sha, learning_score, crawled_at "
+                "FROM repositories WHERE full_name = ?", (full_name,)
+            ).fetchone()
+        return CrawlRecord(*row) if row else None
+
+    @staticmethod
+    def is_unchanged(repo, record):
+        """
+        Checks whether a repository can have changed its README since it was recorded.
+
+        :param repo: A repository dictionary from the current search results.
+        :type repo: dict
+        :param record: The stored record of the repository.
+        :type record: CrawlRecord
+
+        :return: True if the repository was not pushed to (or, without 'pushed_at', not updated) since the record.
+        :rtype: bool
+        """
+        if repo.get('pushed_at') is not None:
+            return repo['pushed_at'] == record.pushed_at
+        return repo.get('updated_at') is not None and repo['updated_at'] == record.updated_at
+
+    def split_unchanged(self, repos):
+        """
+        Restores the learning score of every unchanged repository and returns the ones that need to be fetched.
+
+        :param repos: A list of repository dictionaries from the current search results. Unchanged repositories get
+                      their stored 'learning_score' and 'readme_sha' set in place.
+        :type repos: list of dict
+
+        :return: The repositories that are new or were pushed to since the previous crawl, in their original order.
+        :rtype: list of dict
+        """
+        changed = []
+        for repo in repos:
+            record = self.lookup(repo['full_name'])
+            if record is not None and self.is_unchanged(repo, record):
+                repo['learning_score'] = record.learning_score
+                repo['readme_sha'] = record.readme_sha
+            else:
+                changed.append(repo)
+
+        with self._lock:
+            self.reused += len(repos) - len(changed)
+            self.refetched += len(changed)
+        return changed
+
+    def stored_score(self, full_name, readme_sha):
+        """
+        Returns the stored learning score of a repository if its README has not changed.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+        :param readme_sha: The SHA of the current README blob.
+        :type readme_sha: str or None
+
+        :return: The stored learning score, or None if the README is new or changed and has to be scored.
+        :rtype: int or None
+        """
+        record = self.lookup(full_name)
+        if readme_sha is not None and record is not None and record.readme_sha == readme_sha:
+            return record.learning_score
+        with self._lock:
+            self.rescored += 1
+        return None
+
+    def save(self, repos):
+        """
+        Records the state of scored repositories for the next crawl.
+
+        :param repos: A list of repository dictionaries with 'learning_score' set.
+        :type repos: list of dict
+
+        :return: None
+        """
+        now = time.time()
+        rows = [
+            (repo['full_name'], repo.get('pushed_at'), repo.get('updated_at'), repo.get('readme_sha'),
+             repo['learning_score'], now)
+            for repo in repos
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO repositories VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def stats(self):
+        """
+        Returns the delta crawl counters.
+
+        :return: A dictionary with the number of repositories whose score was reused without a request, whose README
+                 was fetched again, and which were rescored.
+        :rtype: dict
+        """
+        with self._lock:
+            return {'reused': self.reused, 'refetched': self.refetched, 'rescored': self.rescored}
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,8 @@
 import re
 import base64
+from .metrics import timed
 
+@timed('clean_and_transform', count=len)
 def clean_and_transform(data):
     """
     Cleans and transforms repository data.
@@ -12,12 +14,16 @@ def clean_and_transform(data):
     - Categorizes repositories based on their number of stars into 'Highly Popular', 'Popular', or 'Moderately Popular'.
     - Handles missing or 'Unknown' values for the 'updated_at' attribute.
     
-    :param data: A list of repository data dictionaries.
-    :type data: list of dict
+    :param data: A list of repository data dictionaries, or a repo_store.RepositoryStore, which is transformed
+                 column by column.
+    :type data: list of dict or repo_store.RepositoryStore
     
     :return: The transformed repository data.
-    :rtype: list of dict
+    :rtype: list of dict or repo_store.RepositoryStore
     """
+    if hasattr(data, 'columns'):
+        return _clean_and_transform_store(data)
+
     for item in data:
         # Ensure the number of stars is correctly extracted
         item['stars'] = int(item.get('stargazers_count', 0))
@@ -41,8 +47,188 @@ def clean_and_transform(data):
 
     return data
 
-import re
+# Popularity categories assigned by clean_and_transform, most popular first
+POPULARITY_CATEGORIES = ('Highly Popular', 'Popular', 'Moderately Popular')
+
+_NON_WORD_RE = re.compile(r'\W+')
+_ASCII_NON_WORD_TABLE = {code: None for code in range(128) if _NON_WORD_RE.match(chr(code)) and chr(code) != '\n'}
+
+
+def popularity_category_codes(stars):
+    """
+    Returns the index into POPULARITY_CATEGORIES of the category of every star count.
+
+    :param stars: The star counts.
+    :type stars: numpy.ndarray
+
+    :return: The category indices.
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+
+    return np.select([stars > 10000, stars >= 5000], [0, 1], default=2)
+
+
+def clean_names(names):
+    """
+    Simplifies repository names like clean_and_transform does, by removing special characters and lowercasing them.
+
+    :param names: The repository names.
+    :type names: iterable of str
+
+    :return: The simplified names.
+    :rtype: list of str
+    """
+    names = list(names)
+
+    # ASCII names (all GitHub repository names) are cleaned in one pass over the whole column, joined by newlines.
+    # The newline is kept by the translation table, so this only works if no name contains one itself.
+    joined = '\n'.join(names)
+    if joined.isascii() and joined.count('\n') == len(names) - 1:
+        return joined.translate(_ASCII_NON_WORD_TABLE).lower().split('\n') if names else []
+
+    sub = _NON_WORD_RE.sub
+    return [sub('', name).lower() for name in names]
+
+
+def short_urls(urls):
+    """
+    Shortens repository URLs like clean_and_transform does, to the 'user/repo' part after '.com/'.
+
+    :param urls: The repository URLs.
+    :type urls: iterable of str
+
+    :return: The short URLs.
+    :rtype: list of str
+
+    :raises IndexError: If a URL does not contain '.com/'.
+    """
+    return [url.split('.com/')[1] for url in urls]
+
+
+def _clean_and_transform_store(store):
+    import numpy as np
+
+    # The star counts are already stored as integers
+    names, urls, updated_at = store.columns['name'], store.columns['url'], store.columns['updated_at']
+    names[:] = clean_names(names)
+    urls[:] = short_urls(urls)
+
+    codes = np.array([store.intern('category', category) for category in POPULARITY_CATEGORIES], dtype=np.int32)
+    store.columns['category'] = codes[popularity_category_codes(store.columns['stars'])]
+
+    updated_at[[value is None for value in updated_at]] = 'Unknown'
+    return store
+
+
+def clean_and_transform_batch(data):
+    """
+    The column-at-a-time version of clean_and_transform, with the same result.
+
+    Each transformation runs once over a whole column instead of once per repository: the star counts are bucketed
+    into popularity categories with one np.select, names and URLs are rewritten column by column, and missing update
+    times are filled in bulk.
+
+    :param data: A list of repository data dictionaries, or a repo_store.RepositoryStore.
+    :type data: list of dict or repo_store.RepositoryStore
+
+    :return: The transformed repository data. Dictionaries are updated in place, as by clean_and_transform.
+    :rtype: list of dict or repo_store.RepositoryStore
+    """
+    if hasattr(data, 'columns'):
+        return _clean_and_transform_store(data)
+
+    import numpy as np
+
+    stars = [int(item.get('stargazers_count', 0)) for item in data]
+    names = clean_names([item['name'] for item in data])
+    urls = short_urls([item['url'] for item in data])
+    categories = np.array(POPULARITY_CATEGORIES, dtype=object)[popularity_category_codes(np.array(stars))]
+
+    for item, star_count, name, url, category in zip(data, stars, names, urls, categories.tolist()):
+        item['stars'] = star_count
+        item['name'] = name
+        item['url'] = url
+        item['category'] = category
+        item.setdefault('updated_at', 'Unknown')
+
+    return data
+
+
+# Beginner-friendly sections and community keywords looked for in READMEs
+BEGINNER_SECTIONS = ("getting started", "quick start", "tutorial", "examples")
+COMMUNITY_KEYWORDS = ("forum", "faq", "discussion", "chat", "discord", "slack", "gitter")
+
+# Word-bounded README patterns, compiled once. The plain versions are matched against the lowercased README, the
+# IGNORECASE versions against the original text.
+VIDEO_PATTERN = r'\bvideo\b|\bdemo\b'
+API_DOCUMENTATION_PATTERN = r'\bapi\b.*\bdocumentation\b|\bdocumentation\b.*\bapi\b'
+COMMON_ERRORS_PATTERN = r'\bcommon errors\b|\bfaq\b|\btroubleshooting\b'
+_VIDEO_RE = re.compile(VIDEO_PATTERN)
+_API_DOCUMENTATION_RE = re.compile(API_DOCUMENTATION_PATTERN)
+_COMMON_ERRORS_RE = re.compile(COMMON_ERRORS_PATTERN)
+_VIDEO_RE_I = re.compile(VIDEO_PATTERN, re.IGNORECASE)
+_API_DOCUMENTATION_RE_I = re.compile(API_DOCUMENTATION_PATTERN, re.IGNORECASE)
+_COMMON_ERRORS_RE_I = re.compile(COMMON_ERRORS_PATTERN, re.IGNORECASE)
+_SECTION_RES_I = tuple(re.compile(re.escape(section), re.IGNORECASE) for section in BEGINNER_SECTIONS)
+_COMMUNITY_RES_I = tuple(re.compile(re.escape(keyword), re.IGNORECASE) for keyword in COMMUNITY_KEYWORDS)
+
+# Non-ASCII characters whose case mapping or case-insensitive match involves an ASCII letter (e.g. the dotted capital
+# I, the long s or the Kelvin sign). For them, lowercasing the README is not equivalent to a case-insensitive search,
+# so READMEs containing any of them are scored on the exact (slower) path.
+_CASE_SPECIAL_CHARACTERS = re.compile(
+    '[\u00df\u0130\u0131\u0149\u017f\u01f0\u1e96-\u1e9a\u212a\ufb00-\ufb06]'
+)
+
+
+def _readme_features(readme_data):
+    """
+    Extracts the counts and flags that the learning score is computed from.
+
+    For the common case the README is lowercased once and every keyword is found with a plain substring search;
+    the word-bounded patterns only run when their keywords occur at all. READMEs containing characters with unusual
+    case mappings fall back to case-insensitive searches on the original text, so both paths give the same result.
+
+    :param readme_data: The content of the README file.
+    :type readme_data: str
+
+    :return: The number of 'requirement' mentions, whether 'no limits' occurs, the number of question marks, the
+             number of warnings, the number of beginner sections and community keywords found, and whether videos,
+             API documentation and a common errors section are mentioned.
+    :rtype: tuple
+    """
+    num_questions = readme_data.count('?')
+
+    if readme_data.isascii() or not _CASE_SPECIAL_CHARACTERS.search(readme_data):
+        text = readme_data.lower()
+        return (
+            text.count('requirement'),
+            'no limits' in text,
+            num_questions,
+            text.count('warning'),
+            sum(1 for section in BEGINNER_SECTIONS if section in text),
+            sum(1 for keyword in COMMUNITY_KEYWORDS if keyword in text),
+            ('video' in text or 'demo' in text) and _VIDEO_RE.search(text) is not None,
+            'api' in text and 'documentation' in text and _API_DOCUMENTATION_RE.search(text) is not None,
+            ('common errors' in text or 'faq' in text or 'troubleshooting' in text)
+            and _COMMON_ERRORS_RE.search(text) is not None,
+        )
+
+    lowered = readme_data.lower()
+    return (
+        lowered.count('requirement'),
+        'no limits' in lowered,
+        num_questions,
+        readme_data.upper().count('WARNING'),
+        sum(1 for pattern in _SECTION_RES_I if pattern.search(readme_data)),
+        sum(1 for pattern in _COMMUNITY_RES_I if pattern.search(readme_data)),
+        _VIDEO_RE_I.search(readme_data) is not None,
+        _API_DOCUMENTATION_RE_I.search(readme_data) is not None,
+        _COMMON_ERRORS_RE_I.search(readme_data) is not None,
+    )
+
 
+@timed('learning_score')
 def evaluate_learning_friendliness(readme_data):
     """
     Evaluates the learning friendliness of a repository based on its README.
@@ -56,6 +242,9 @@ def evaluate_learning_friendliness(readme_data):
     :return: The learning score for the repository.
     :rtype: int
     """
+    (num_requirements, has_no_limits, num_questions, num_warnings, num_sections, num_community,
+     has_video, has_api_documentation, has_common_errors) = _readme_features(readme_data)
+
     learning_score = 0
 
     # Score based on README content length
@@ -64,7 +253,6 @@ def evaluate_learning_friendliness(readme_data):
         learning_score += readme_length // 10  # For every 100 characters, gain 10 points
 
     # Score based on the number of requirements in README
-    num_requirements = readme_data.lower().count('requirement')
     if num_requirements <= 3:
         learning_score += 100
     elif 3 < num_requirements <= 6:
@@ -75,43 +263,137 @@ def evaluate_learning_friendliness(readme_data):
         learning_score -= 10
 
     # Score for 'No limits' phrase in README
-    if 'no limits' in readme_data.lower():
+    if has_no_limits:
         learning_score += 100
 
     # Score based on the number of question marks
-    num_questions = readme_data.count('?')
     learning_score += (10 * num_questions)
 
     # Deduction for each WARNING found
-    num_warnings = readme_data.upper().count('WARNING')
     learning_score -= (10 * num_warnings)
-    
-    # Checking for beginner-friendly sections
-    beginner_sections = ["getting started", "quick start", "tutorial", "examples"]
-    for section in beginner_sections:
-        if re.search(section, readme_data, re.IGNORECASE):
-            learning_score += 100  # Score for each section found
-
-    # Checking for community support and communication
-    community_keywords = ["forum", "faq", "discussion", "chat", "discord", "slack", "gitter"]
-    for keyword in community_keywords:
-        if re.search(keyword, readme_data, re.IGNORECASE):
-            learning_score += 50  # Score for each keyword found
+
+    # Score for each beginner-friendly section found
+    learning_score += 100 * num_sections
+
+    # Score for each community support and communication keyword found
+    learning_score += 50 * num_community
 
     # Checking for video tutorials or demos
-    if re.search(r'\bvideo\b|\bdemo\b', readme_data, re.IGNORECASE):
+    if has_video:
         learning_score += 100
 
     # Checking for API documentation links
-    if re.search(r'\bapi\b.*\bdocumentation\b|\bdocumentation\b.*\bapi\b', readme_data, re.IGNORECASE):
+    if has_api_documentation:
         learning_score += 100
 
     # Checking for common errors and solutions section
-    if re.search(r'\bcommon errors\b|\bfaq\b|\btroubleshooting\b', readme_data, re.IGNORECASE):
+    if has_common_errors:
         learning_score += 100
 
     return learning_score
 
+@timed('learning_score', count=len)
+def evaluate_learning_friendliness_batch(readmes):
+    """
+    Evaluates the learning friendliness of many READMEs at once.
+
+    The features of every README are extracted first, and the scores are then computed for the whole batch with
+    NumPy array operations. The result is identical to calling evaluate_learning_friendliness on each README.
+
+    :param readmes: The contents of the README files.
+    :type readmes: list of str or iterable of str
+
+    :return: The learning scores, in the order of the READMEs.
+    :rtype: numpy.ndarray of int64
+    """
+    import numpy as np
+
+    lengths = []
+    features = []
+    for readme_data in readmes:
+        lengths.append(len(readme_data))
+        features.append(_readme_features(readme_data))
+
+    lengths = np.array(lengths, dtype=np.int64)
+    features = np.array(features, dtype=np.int64).reshape(-1, 9)
+    (num_requirements, has_no_limits, num_questions, num_warnings, num_sections, num_community,
+     has_video, has_api_documentation, has_common_errors) = features.T
+
+    learning_scores = np.where(lengths >= 900, lengths // 10, 0)
+    learning_scores += np.select(
+        [num_requirements <= 3, num_requirements <= 6, num_requirements <= 10], [100, 50, 10], default=-10
+    )
+    learning_scores += 100 * (has_no_limits + num_sections + has_video + has_api_documentation + has_common_errors)
+    learning_scores += 10 * (num_questions - num_warnings)
+    learning_scores += 50 * num_community
+    return learning_scores
+
+def score_repository(repo, readme_content, learning_score=None):
+    """
+    Calculates the learning score and star score of a repository from its README content.
+
+    :param repo: A repository dictionary with a 'stargazers_count' attribute. It is updated in place.
+    :type repo: dict
+    :param readme_content: The content of the repository's README file.
+    :type readme_content: str
+    :param learning_score: A learning score that is already known for this README (e.g. from a previous crawl).
+                           When given, the README is not scored again.
+    :type learning_score: int or None
+
+    :return: The same repository dictionary with 'learning_score' and 'star_score' set.
+    :rtype: dict
+    """
+    # Calculate the learning score for the repository based on the README content
+    if learning_score is None:
+        learning_score = evaluate_learning_friendliness(readme_content)
+    repo['learning_score'] = learning_score
+
+    # Calculate the star score for the repository (35% of stargazers_count)
+    repo['star_score'] = repo['stargazers_count'] * 0.35
+
+    return repo
+
+@timed('ranking', count=len)
+def rank_repositories(repos):
+    """
+    Ranks scored repositories by their weighted score.
+
+    The weighted score combines the star score with 65% of the learning score. Repositories are sorted by it in
+    descending order, and ties keep their original order.
+
+    :param repos: A list of repository dictionaries with 'learning_score' and 'star_score' set, or a
+                  repo_store.RepositoryStore, which is ranked column by column.
+    :type repos: list of dict or repo_store.RepositoryStore
+
+    :return: A new list (or store) with the repositories sorted by weighted score, with 'weighted_score' rounded to
+             two decimals.
+    :rtype: list of dict or repo_store.RepositoryStore
+    """
+    if hasattr(repos, 'columns'):
+        import numpy as np
+
+        weighted_scores = repos.columns['star_score'] + (repos.columns['learning_score'] * 0.65)
+        order = np.argsort(-weighted_scores, kind='stable')
+        ranked = repos.take(order)
+
+        # Python's round, unlike np.round, rounds exactly like the list version does
+        ranked.columns['weighted_score'] = np.array([round(score, 2) for score in weighted_scores[order].tolist()])
+        return ranked
+
+    # Calculate the weighted score for each repository based on star score and learning score
+    for repo in repos:
+        repo['weighted_score'] = repo['star_score'] + (repo['learning_score'] * 0.65)
+
+    # Sort the repositories based on weighted score in descending order
+    repos = sorted(repos, key=lambda x: x['weighted_score'], reverse=True)
+
+    # Round the weighted score to two decimal places
+    for repo in repos:
+        repo['weighted_score'] = round(repo['weighted_score'], 2)
+
+    return repos
+
+@timed('process_repositories', count=len)
 def process_repositories(repositories):
     """
     Processes the list of repositories to extract necessary information.
@@ -120,12 +402,16 @@ def process_repositories(repositories):
     repository, including 'full_name', 'name', 'description', 'language', 'stars', 'updated_at', and 'url'. The extracted
     data is returned as a list of dictionaries.
     
-    :param repositories: A list of GitHub repository data dictionaries.
-    :type repositories: list of dict
+    :param repositories: A list of GitHub repository data dictionaries, or a repo_store.RepositoryStore, which
+                         already holds only this information and is copied.
+    :type repositories: list of dict or repo_store.RepositoryStore
     
-    :return: A list of dictionaries containing processed repository information.
-    :rtype: list of dict
+    :return: A list of dictionaries (or a store) containing processed repository information.
+    :rtype: list of dict or repo_store.RepositoryStore
     """
+    if hasattr(repositories, 'columns'):
+        return repositories[:]
+
     processed_repos = []
     for repo in repositories:
         repo_full_name = repo['full_name']
@@ -141,6 +427,33 @@ def process_repositories(repositories):
         processed_repos.append(repo_data)
     return processed_repos
 
+@timed('process_repositories', count=len)
+def process_repositories_batch(repositories):
+    """
+    The column-at-a-time version of process_repositories.
+
+    Instead of a new dictionary per repository, every extracted field becomes one column of a
+    repo_store.RepositoryStore, with the same defaults for missing values as process_repositories.
+
+    :param repositories: A list of GitHub repository data dictionaries.
+    :type repositories: list of dict
+
+    :return: A store with the 'full_name', 'name', 'description', 'language', 'stars', 'updated_at' and 'url' of
+             every repository, in the same order.
+    :rtype: repo_store.RepositoryStore
+    """
+    from .repo_store import RepositoryStore
+
+    return RepositoryStore.from_columns({
+        'full_name': [repo['full_name'] for repo in repositories],
+        'name': [repo['name'] for repo in repositories],
+        'description': [repo.get('description', 'No description available') for repo in repositories],
+        'language': [repo.get('language', 'Unknown') for repo in repositories],
+        'stars': [repo.get('stargazers_count', 0) for repo in repositories],
+        'updated_at': [repo.get('updated_at', 'Unknown') for repo in repositories],
+        'url': [repo.get('html_url', '') for repo in repositories],
+    })
+
 def decode_readme_content(readme_data):
     """
     Decodes the README content from base64 to string.
@@ -0,0 +1,243 @@
+from .http_client import GitHubAPIError, check_response, get_client
+from .data_processing import rank_repositories, score_repository
+
+# Number of repositories requested per GraphQL query. GitHub caps the nodes per query, and large READMEs make big
+# batches slow, so a few dozen repositories per query is a good balance.
+DEFAULT_BATCH_SIZE = 25
+
+# README file names tried, in order, on the default branch of each repository
+README_PATHS = ('README.md', 'README.rst', 'README.txt', 'README', 'readme.md', 'Readme.md')
+
+# The fields fetched for every repository: metadata, default branch, open issue count and the README blob text
+REPOSITORY_FIELDS = """
+fragment RepositoryFields on Repository {
+  nameWithOwner
+  name
+  description
+  url
+  stargazerCount
+  updatedAt
+  pushedAt
+  primaryLanguage { name }
+  defaultBranchRef { name }
+  issues(states: OPEN) { totalCount }
+%s
+}
+""" % '\n'.join(
+    f'  readme{i}: object(expression: "HEAD:{path}") {{ ... on Blob {{ text oid }} }}'
+    for i, path in enumerate(README_PATHS)
+)
+
+SEARCH_QUERY = """
+query($query: String!, $first: Int!, $after: String) {
+  search(query: $query, type: REPOSITORY, first: $first, after: $after) {
+    repositoryCount
+    pageInfo { hasNextPage endCursor }
+    nodes { ...RepositoryFields }
+  }
+}
+""" + REPOSITORY_FIELDS
+
+
+def graphql_query(query, variables=None, client=None, allow_not_found=False):
+    """
+    Sends a query to the GitHub GraphQL API.
+
+    :param query: The GraphQL query.
+    :type query: str
+    :param variables: The variables of the query.
+    :type variables: dict or None
+    :param client: The HTTP client to use. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+    :param allow_not_found: Whether 'NOT_FOUND' errors (e.g. a deleted repository in a batch) are ignored.
+    :type allow_not_found: bool
+
+    :return: The 'data' object of the response.
+    :rtype: dict
+
+    :raises http_client.GitHubAPIError: If the request fails or the response contains errors.
+    """
+    client = client or get_client()
+    response = check_response(client.post(f'{client.api_url}/graphql', json={'query': query, 'variables': variables or {}}))
+    payload = response.json()
+
+    errors = payload.get('errors') or []
+    if allow_not_found:
+        errors = [error for error in errors if error.get('type') != 'NOT_FOUND']
+    if errors:
+        raise GitHubAPIError(response, f"GraphQL query failed: {errors[0].get('message')}")
+
+    return payload.get('data') or {}
+
+
+def node_to_repository(node, api_url):
+    """
+    Converts a GraphQL repository node into the dictionary shape of the GitHub REST search API.
+
+    The result can be used anywhere a repository from fetch_repositories is expected, e.g. by
+    data_processing.process_repositories. In addition it contains the README text ('readme'), its blob SHA
+    ('readme_sha') and the default branch, which would otherwise need separate REST calls. Note that
+    'open_issues_count' counts open issues only, while the REST API also counts open pull requests.
+
+    :param node: A repository node selected with the RepositoryFields fragment.
+    :type node: dict
+    :param api_url: The base URL of the GitHub REST API, used to build the 'url' attribute.
+    :type api_url: str
+
+    :return: A repository dictionary.
+    :rtype: dict
+    """
+    # Use the first README file name that exists on the default branch
+    readme = None
+    for i in range(len(README_PATHS)):
+        blob = node.get(f'readme{i}')
+        if blob and blob.get('text') is not None:
+            readme = blob
+            break
+
+    return {
+        'full_name': node['nameWithOwner'],
+        'name': node['name'],
+        'description': node.get('description'),
+        'html_url': node['url'],
+        'url': f"{api_url}/repos/{node['nameWithOwner']}",
+        'stargazers_count': node['stargazerCount'],
+        'language': (node.get('primaryLanguage') or {}).get('name'),
+        'updated_at': node.get('updatedAt'),
+        'pushed_at': node.get('pushedAt'),
+        'default_branch': (node.get('defaultBranchRef') or {}).get('name', 'main'),
+        'open_issues_count': node['issues']['totalCount'],
+        'readme': readme['text'] if readme else '',
+        'readme_sha': readme['oid'] if readme else None,
+    }
+
+
+def build_repositories_query(full_names):
+    """
+    Builds one GraphQL query that fetches several repositories by name.
+
+    :param full_names: The full names of the repositories in the format 'owner/repo'.
+    :type full_names: list of str
+
+    :return: The query and its variables.
+    :rtype: tuple of (str, dict)
+    """
+    parameters = []
+    selections = []
+    variables = {}
+    for i, full_name in enumerate(full_names):
+        owner, name = full_name.split('/', 1)
+        variables[f'owner{i}'] = owner
+        variables[f'name{i}'] = name
+        parameters.append(f'$owner{i}: String!, $name{i}: String!')
+        selections.append(f'  repo{i}: repository(owner: $owner{i}, name: $name{i}) {{ ...RepositoryFields }}')
+
+    query = 'query(' + ', '.join(parameters) + ') {\n' + '\n'.join(selections) + '\n}\n' + REPOSITORY_FIELDS
+    return query, variables
+
+
+def fetch_repository_batch(full_names, batch_size=DEFAULT_BATCH_SIZE, client=None):
+    """
+    Fetches the metadata, README, default branch and open issue count of many repositories.
+
+    Instead of up to three REST calls per repository (fetch_readme, fetch_default_branch and fetch_issues), one
+    GraphQL query is sent per batch of repositories.
+
+    :param full_names: The full names of the repositories in the format 'owner/repo'.
+    :type full_names: list of str
+    :param batch_size: The number of repositories fetched per query.
+    :type batch_size: int
+    :param client: The HTTP client to use. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: A list of repository dictionaries (see node_to_repository) in the order of full_names.
+             Repositories that do not exist are left out.
+    :rtype: list of dict
+    """
+    client = client or get_client()
+    repositories = []
+    for start in range(0, len(full_names), batch_size):
+        batch = full_names[start:start + batch_size]
+        query, variables = build_repositories_query(batch)
+        data = graphql_query(query, variables, client=client, allow_not_found=True)
+        for i in range(len(batch)):
+            node = data.get(f'repo{i}')
+            if node is not None:
+                repositories.append(node_to_repository(node, client.api_url))
+    return repositories
+
+
+def search_repositories_graphql(language, min_stars, max_repos=30, page_size=DEFAULT_BATCH_SIZE, client=None):
+    """
+    Searches repositories by language and minimum number of stars, including their README texts.
+
+    :param language: The programming language to filter repositories by.
+    :type language: str
+    :param min_stars: The minimum number of stars a repository must have.
+    :type min_stars: int
+    :param max_repos: The maximum number of repositories to return.
+    :type max_repos: int
+    :param page_size: The number of repositories fetched per query.
+    :type page_size: int
+    :param client: The HTTP client to use. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: A list of repository dictionaries (see node_to_repository), most starred first.
+    :rtype: list of dict
+    """
+    client = client or get_client()
+    search = f'language:{language} stars:>={min_stars} sort:stars'
+    repositories = []
+    cursor = None
+
+    while len(repositories) < max_repos:
+        variables = {'query': search, 'first': min(page_size, max_repos - len(repositories)), 'after': cursor}
+        result = graphql_query(SEARCH_QUERY, variables, client=client)['search']
+        repositories.extend(node_to_repository(node, client.api_url) for node in result['nodes'] if node)
+
+        if not result['pageInfo']['hasNextPage'] or not result['nodes']:
+            break
+        cursor = result['pageInfo']['endCursor']
+
+    return repositories[:max_repos]
+
+
+def fetch_repositories_graphql(language, min_stars, max_repos=30, page_size=DEFAULT_BATCH_SIZE, client=None,
+                               state=None):
+    """
+    The GraphQL counterpart of data_acquisition.fetch_repositories.
+
+    Repositories and their READMEs are fetched with a few GraphQL queries instead of one REST call per README, then
+    scored and ranked exactly like fetch_repositories does.
+
+    :param language: The programming language to filter repositories by.
+    :type language: str
+    :param min_stars: The minimum number of stars a repository must have to be included in the results.
+    :type min_stars: int
+    :param max_repos: The maximum number of repositories to fetch.
+    :type max_repos: int
+    :param page_size: The number of repositories fetched per query.
+    :type page_size: int
+    :param client: The HTTP client to use. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+    :param state: The state of the previous crawl. READMEs whose blob SHA is unchanged are not scored again, and the
+                  state is updated with the results of this crawl.
+    :type state: crawl_state.CrawlState or None
+
+    :return: A list of repository dictionaries ranked by weighted score, with 'learning_score', 'star_score' and
+             'weighted_score' set.
+    :rtype: list of dict
+    """
+    repos = search_repositories_graphql(language, min_stars, max_repos, page_size, client=client)
+
+    # Sort the repositories based on stargazers count in descending order, as the REST backend does
+    repos = sorted(repos, key=lambda x: x['stargazers_count'], reverse=True)
+
+    for repo in repos:
+        learning_score = state.stored_score(repo['full_name'], repo['readme_sha']) if state is not None else None
+        score_repository(repo, repo['readme'], learning_score)
+
+    if state is not None:
+        state.save(repos)
+
+    return rank_repositories(repos)
@@ -0,0 +1,218 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from .http_client import content_length
+
+# Default location and size limit of the on-disk response cache
+DEFAULT_CACHE_PATH = 'http_cache.db'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Response headers kept alongside a cached body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+CachedResponse = namedtuple('CachedResponse', ['url', 'status_code', 'headers', 'body', 'etag', 'last_modified'])
+
+
+class ResponseCache:
+    """
+    A persistent, size-bounded cache of HTTP responses keyed by URL.
+
+    Only responses that carry an 'ETag' or 'Last-Modified' header are stored. On the next request for the same URL
+    the stored validators are sent as 'If-None-Match' / 'If-Modified-Since', and a '304 Not Modified' answer is
+    served from the cache instead of being downloaded again. GitHub does not count 304 responses against the rate
+    limit, so a repeated crawl of unchanged repositories is almost free.
+
+    Entries are stored in a SQLite database. When the total size of the stored bodies exceeds max_bytes, the least
+    recently used entries are evicted.
+
+    :param path: The path of the SQLite database file. Use ':memory:' for a cache that is not persisted.
+    :type path: str
+    :param max_bytes: The maximum total size in bytes of the cached response bodies.
+    :type max_bytes: int
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # The connection is shared by all fetcher threads and guarded by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, url):
+        """
+        Looks up the cached response for a URL.
+
+        :param url: The URL of the request.
+        :type url: str
+
+        :return: The cached response, or None if the URL is not cached.
+        :rtype: CachedResponse or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, headers, body, etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        status_code, headers, body, etag, last_modified = row
+        return CachedResponse(url, status_code, json.loads(headers), bytes(body), etag, last_modified)
+
+    def conditional_headers(self, entry):
+        """
+        Builds the revalidation headers for a cached response.
+
+        :param entry: The cached response to revalidate.
+        :type entry: CachedResponse
+
+        :return: A dictionary with 'If-None-Match' and/or 'If-Modified-Since'.
+        :rtype: dict
+        """
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url, response):
+        """
+        Stores a response in the cache if it carries a validator, evicting old entries if the cache is full.
+
+        :param url: The URL of the request.
+        :type url: str
+        :param response: The response to store.
+        :type response: requests.Response
+
+        :return: True if the response was stored, False otherwise.
+        :rtype: bool
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return False
+
+        # The body is only read once the response is known to be cacheable, and not at all if it is declared too large
+        if content_length(response) > self.max_bytes:
+            return False
+        body = response.content
+        if len(body) > self.max_bytes:
+            return False
+
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if previous is not None:
+                self.total_bytes -= previous[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(headers), body, etag, last_modified, len(body), time.time())
+            )
+            self.total_bytes += len(body)
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def touch(self, url):
+        """
+        Marks a cached response as recently used.
+
+        :param url: The URL of the cached response.
+        :type url: str
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop the least recently used entries until the cache fits into max_bytes again
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT url, size FROM responses ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.total_bytes = 0
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            self.total_bytes -= row[1]
+            self.evictions += 1
+
+    def record_hit(self):
+        """
+        Counts a request that was answered from the cache.
+
+        :return: None
+        """
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        """
+        Counts a request that had to be downloaded.
+
+        :return: None
+        """
+        with self._lock:
+            self.misses += 1
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        :return: A dictionary with the number of hits, misses and evictions, the hit ratio, the number of entries and
+                 the total size in bytes of the cached bodies.
+        :rtype: dict
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'bytes': self.total_bytes,
+            }
+
+    def clear(self):
+        """
+        Removes every cached response.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.total_bytes = 0
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,552 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from .metrics import get_metrics
+
+# Base URL of the GitHub REST API
+GITHUB_API_URL = 'https://api.github.com'
+
+# Default connection pool and timeout settings
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_TIMEOUT = 10
+
+# Unauthenticated GitHub limits (requests per window, window in seconds), used until a response reports the real ones
+DEFAULT_RATE_LIMITS = {
+    'core': (60, 3600),
+    'search': (10, 60),
+}
+
+# Seconds to back off after a secondary rate limit that does not say how long to wait
+DEFAULT_BACKOFF = 60
+
+# Number of times a rate-limited request is retried after waiting for the limit to reset
+DEFAULT_RATE_LIMIT_RETRIES = 3
+
+
+class GitHubAPIError(Exception):
+    """
+    Raised when the GitHub API answers with an unexpected status code.
+
+    :param response: The response that caused the error.
+    :type response: requests.Response
+    """
+
+    def __init__(self, response, message=None):
+        self.response = response
+        self.status_code = response.status_code
+        super().__init__(message or f"API request failed with status code: {response.status_code}")
+
+
+class RateLimitError(GitHubAPIError):
+    """
+    Raised when a GitHub request is still rate limited after all retries.
+    """
+
+
+def is_rate_limited(response):
+    """
+    Checks whether a response was rejected by a GitHub primary or secondary rate limit.
+
+    :param response: The response to check.
+    :type response: requests.Response
+
+    :return: True if the request was rate limited, False otherwise.
+    :rtype: bool
+    """
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return (response.headers.get('X-RateLimit-Remaining') == '0'
+            or 'Retry-After' in response.headers
+            or 'rate limit' in response.text.lower())
+
+
+def check_response(response, allowed=(200,)):
+    """
+    Raises an error if a GitHub response does not have one of the allowed status codes.
+
+    :param response: The response to check.
+    :type response: requests.Response
+    :param allowed: The status codes that are not errors.
+    :type allowed: tuple of int
+
+    :return: The response.
+    :rtype: requests.Response
+    """
+    if response.status_code in allowed:
+        return response
+    if is_rate_limited(response):
+        raise RateLimitError(response, f"GitHub rate limit exceeded (status code: {response.status_code})")
+    raise GitHubAPIError(response)
+
+
+def content_length(response):
+    """
+    Returns the body size a response declares in its Content-Length header.
+
+    :param response: The response to check.
+    :type response: requests.Response
+
+    :return: The declared size in bytes, or 0 if the header is missing or malformed.
+    :rtype: int
+    """
+    try:
+        return max(int(response.headers.get('Content-Length') or 0), 0)
+    except ValueError:
+        return 0
+
+
+class TokenBucket:
+    """
+    The request budget of one GitHub rate limit resource (e.g. 'core' or 'search').
+
+    GitHub limits are fixed windows: 'limit' requests are allowed until 'reset_at', after which the budget is refilled.
+    Requests in flight are counted separately, so the budget reported by a response can be corrected for requests
+    that were already sent but not yet answered.
+
+    :param limit: The number of requests allowed per window.
+    :type limit: int
+    :param window: The length of the window in seconds, used until a response reports the actual reset time.
+    :type window: float
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = None
+        self.in_flight = 0
+
+    def refill(self, now):
+        """
+        Refills the budget if the current window has ended.
+
+        :param now: The current time as a Unix timestamp.
+        :type now: float
+
+        :return: None
+        """
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = None
+
+
+class RateLimitScheduler:
+    """
+    Paces GitHub requests so that they never exceed the rate limits, sharing one budget between all fetchers.
+
+    Every request takes a token from the bucket of its resource before it is sent, and waits for the window to reset
+    when the bucket is empty. The buckets are kept in sync with the 'X-RateLimit-Limit', 'X-RateLimit-Remaining' and
+    'X-RateLimit-Reset' headers of every response, and a 'Retry-After' header (or a secondary rate limit) blocks the
+    resource for the requested time. The search API and the core API have separate budgets.
+
+    :param limits: The initial (limit, window) of each resource. Defaults to the unauthenticated GitHub limits.
+    :type limits: dict or None
+    :param clock: A function returning the current Unix timestamp.
+    :type clock: callable
+    :param sleep: A function that sleeps for the given number of seconds.
+    :type sleep: callable
+    """
+
+    def __init__(self, limits=None, clock=time.time, sleep=time.sleep):
+        limits = dict(DEFAULT_RATE_LIMITS, **(limits or {}))
+        self.buckets = {resource: TokenBucket(limit, window) for resource, (limit, window) in limits.items()}
+        self.blocked_until = {resource: 0.0 for resource in self.buckets}
+        self.waits = 0
+        self.total_wait = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resource_for(path):
+        """
+        Returns the rate limit resource a GitHub API path is counted against.
+
+        :param path: The path of the request relative to the API root, e.g. '/search/repositories?q=...'.
+        :type path: str
+
+        :return: 'search', 'graphql' or 'core'.
+        :rtype: str
+        """
+        if path.startswith('/search/'):
+            return 'search'
+        if path.startswith('/graphql'):
+            return 'graphql'
+        return 'core'
+
+    def _bucket(self, resource):
+        if resource not in self.buckets:
+            limit, window = DEFAULT_RATE_LIMITS['core']
+            self.buckets[resource] = TokenBucket(limit, window)
+            self.blocked_until[resource] = 0.0
+        return self.buckets[resource]
+
+    def acquire(self, resource):
+        """
+        Waits until a request against the resource is allowed and takes a token from its budget.
+
+        :param resource: The rate limit resource, as returned by resource_for.
+        :type resource: str
+
+        :return: The number of seconds spent waiting.
+        :rtype: float
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                bucket = self._bucket(resource)
+                bucket.refill(now)
+                blocked_until = self.blocked_until[resource]
+
+                if now >= blocked_until and (bucket.remaining > 0 or bucket.reset_at is None):
+                    # A budget that was never reported by GitHub starts its window with the first request
+                    if bucket.reset_at is None:
+                        bucket.reset_at = now + bucket.window
+                    bucket.remaining -= 1
+                    bucket.in_flight += 1
+                    if waited:
+                        self.waits += 1
+                        self.total_wait += waited
+                    return waited
+
+                # Wait for a Retry-After block to pass, and for the window to reset if the budget is used up
+                if bucket.remaining > 0:
+                    delay = blocked_until - now
+                else:
+                    delay = max(blocked_until, bucket.reset_at) - now
+
+            delay = max(delay, 0.01)
+            self._sleep(delay)
+            waited += delay
+
+    def release(self, resource):
+        """
+        Gives back the token of a request that failed before it reached GitHub.
+
+        :param resource: The rate limit resource of the request.
+        :type resource: str
+
+        :return: None
+        """
+        with self._lock:
+            bucket = self._bucket(resource)
+            bucket.in_flight = max(bucket.in_flight - 1, 0)
+            bucket.remaining += 1
+
+    def update(self, resource, response):
+        """
+        Synchronises the budget of a resource with the rate limit headers of a response.
+
+        :param resource: The rate limit resource of the request.
+        :type resource: str
+        :param response: The response of the request.
+        :type response: requests.Response
+
+        :return: None
+        """
+        headers = response.headers
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(resource)
+            bucket.in_flight = max(bucket.in_flight - 1, 0)
+
+            if 'X-RateLimit-Limit' in headers:
+                bucket.limit = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Reset' in headers:
+                bucket.reset_at = float(headers['X-RateLimit-Reset'])
+            if 'X-RateLimit-Remaining' in headers:
+                # Requests still in flight have already been counted locally but not yet by GitHub
+                bucket.remaining = max(int(headers['X-RateLimit-Remaining']) - bucket.in_flight, 0)
+
+            if is_rate_limited(response):
+                if 'Retry-After' in headers:
+                    blocked_until = now + float(headers['Retry-After'])
+                elif headers.get('X-RateLimit-Remaining') == '0' and bucket.reset_at is not None:
+                    blocked_until = bucket.reset_at
+                else:
+                    blocked_until = now + DEFAULT_BACKOFF
+                self.blocked_until[resource] = max(self.blocked_until[resource], blocked_until)
+
+    def stats(self):
+        """
+        Returns the current budget of every resource and the time spent waiting for it.
+
+        :return: A dictionary with the remaining requests, limit and reset time of each resource, the number of waits
+                 and the total number of seconds spent waiting.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'resources': {
+                    resource: {'remaining': bucket.remaining, 'limit': bucket.limit, 'reset_at': bucket.reset_at}
+                    for resource, bucket in self.buckets.items()
+                },
+                'waits': self.waits,
+                'total_wait': self.total_wait,
+            }
+
+
+class HTTPClient:
+    """
+    A shared HTTP client that keeps connections alive and injects GitHub authentication in one place.
+
+    All fetchers go through a single requests.Session, so a crawl of hundreds of repositories reuses a handful of
+    pooled TCP/TLS connections instead of opening a new one for every request. Requests to the GitHub API get the
+    'Accept' and 'Authorization' headers added automatically; requests to any other host (e.g. planetpython.org)
+    are sent without the token.
+
+    When a rate limit scheduler is given, every GitHub request is paced by it, and a request rejected by a rate limit
+    is retried once the limit allows it again.
+
+    When a response cache is given, every GET to the GitHub API is revalidated against it with 'If-None-Match' /
+    'If-Modified-Since' and '304 Not Modified' answers are served from the cache as ordinary 200 responses. Streamed
+    requests bypass the cache, so their bodies are never read into memory.
+
+    :param token: The GitHub token to authenticate with. Defaults to the GITHUB_TOKEN environment variable.
+                  When no token is available, requests are sent unauthenticated.
+    :type token: str or None
+    :param api_url: The base URL of the GitHub API.
+    :type api_url: str
+    :param pool_connections: The number of distinct hosts to keep connection pools for.
+    :type pool_connections: int
+    :param pool_maxsize: The maximum number of connections kept alive per host. This should be at least the number
+                         of worker threads issuing requests concurrently.
+    :type pool_maxsize: int
+    :param timeout: The default timeout in seconds for every request.
+    :type timeout: float
+    :param max_retries: The number of times a failed connection is retried by the transport adapter.
+    :type max_retries: int
+    :param cache: An optional response cache used for conditional requests, e.g. http_cache.ResponseCache.
+    :type cache: http_cache.ResponseCache or None
+    :param scheduler: An optional rate limit scheduler shared by every GitHub request.
+    :type scheduler: RateLimitScheduler or None
+    :param rate_limit_retries: The number of times a rate-limited request is retried.
+    :type rate_limit_retries: int
+    :param metrics: The metrics every request, response size, status code and cache lookup is counted in. Defaults
+                    to the metrics shared by the package.
+    :type metrics: metrics.Metrics or None
+    """
+
+    def __init__(self, token=None, api_url=GITHUB_API_URL, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, timeout=DEFAULT_TIMEOUT, max_retries=0, cache=None,
+                 scheduler=None, rate_limit_retries=DEFAULT_RATE_LIMIT_RETRIES, metrics=None):
+        self.token = token if token is not None else os.environ.get('GITHUB_TOKEN')
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self.rate_limit_retries = rate_limit_retries
+        self.metrics = metrics if metrics is not None else get_metrics()
+
+        # requests is only imported once a client is created, which keeps importing the package fast
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # Mount a pooled adapter for both schemes so every host reuses its connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def is_github_url(self, url):
+        """
+        Checks whether a URL points at the configured GitHub API.
+
+        :param url: The URL to check.
+        :type url: str
+
+        :return: True if the URL belongs to the GitHub API, False otherwise.
+        :rtype: bool
+        """
+        return url.startswith(self.api_url + '/') or url == self.api_url
+
+    def github_headers(self):
+        """
+        Builds the headers sent with every GitHub API request.
+
+        :return: A dictionary with the 'Accept' header and, if a token is configured, the 'Authorization' header.
+        :rtype: dict
+        """
+        headers = {'Accept': 'application/vnd.github.v3+json'}
+        if self.token:
+            headers['Authorization'] = f'token {self.token}'
+        return headers
+
+    def get(self, url, headers=None, **kwargs):
+        """
+        Sends a GET request through the pooled session.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param headers: Extra headers for this request. They override the injected GitHub headers.
+        :type headers: dict or None
+        :param kwargs: Any other keyword arguments accepted by requests.Session.get.
+
+        :return: The response of the request. Responses served from the cache have 'from_cache' set to True.
+        :rtype: requests.Response
+        """
+        request_headers = self.github_headers() if self.is_github_url(url) else {}
+        if headers:
+            request_headers.update(headers)
+        kwargs.setdefault('timeout', self.timeout)
+
+        # Requests with query parameters passed separately are not cached, as the URL alone does not identify them.
+        # Neither are streamed responses, which must not be read into memory, nor responses of other hosts.
+        if self.cache is None or 'params' in kwargs or kwargs.get('stream') or not self.is_github_url(url):
+            return self._send('GET', url, request_headers, kwargs)
+
+        # Revalidate a cached copy instead of downloading it again
+        entry = self.cache.lookup(url)
+        if entry is not None:
+            request_headers.update(self.cache.conditional_headers(entry))
+
+        response = self._send('GET', url, request_headers, kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url)
+            self.cache.record_hit()
+            self.metrics.record_cache(True)
+            return self._cached_response(entry, response)
+
+        self.cache.record_miss()
+        self.metrics.record_cache(False)
+        self.cache.store(url, response)
+        return response
+
+    def post(self, url, headers=None, **kwargs):
+        """
+        Sends a POST request through the pooled session. POST requests are never cached.
+
+        :param url: The URL to post to.
+        :type url: str
+        :param headers: Extra headers for this request. They override the injected GitHub headers.
+        :type headers: dict or None
+        :param kwargs: Any other keyword arguments accepted by requests.Session.post, e.g. json.
+
+        :return: The response of the request.
+        :rtype: requests.Response
+        """
+        request_headers = self.github_headers() if self.is_github_url(url) else {}
+        if headers:
+            request_headers.update(headers)
+        kwargs.setdefault('timeout', self.timeout)
+        return self._send('POST', url, request_headers, kwargs)
+
+    def _send(self, method, url, headers, kwargs):
+        if self.scheduler is None or not self.is_github_url(url):
+            return self._request(method, url, headers, kwargs)
+
+        # Take a token from the shared budget before every attempt, and retry while the request is rate limited
+        resource = self.scheduler.resource_for(url[len(self.api_url):])
+        for attempt in range(self.rate_limit_retries + 1):
+            waited = self.scheduler.acquire(resource)
+            if waited:
+                self.metrics.record_rate_limit_wait(waited)
+            try:
+                response = self._request(method, url, headers, kwargs)
+            except OSError:
+                # The request never reached GitHub (requests' exceptions are OSErrors), so give back its token
+                self.scheduler.release(resource)
+                raise
+            self.scheduler.update(resource, response)
+            if not is_rate_limited(response):
+                break
+        return response
+
+    def _request(self, method, url, headers, kwargs):
+        start = time.perf_counter()
+        response = self.session.request(method, url, headers=headers, **kwargs)
+        seconds = time.perf_counter() - start
+
+        # Streamed bodies are not read yet, so their size is only known from the Content-Length header
+        size = content_length(response) if kwargs.get('stream') else len(response.content)
+        target = (RateLimitScheduler.resource_for(url[len(self.api_url):]) if self.is_github_url(url)
+                  else urlsplit(url).hostname)
+        self.metrics.record_request(target, response.status_code, size, seconds)
+        return response
+
+    @staticmethod
+    def _cached_response(entry, not_modified):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        # Rebuild a full response from the cached body, keeping the live headers (e.g. rate limit) of the 304
+        response = requests.Response()
+        response.status_code = entry.status_code
+        response.url = entry.url
+        response._content = entry.body
+        response.headers = CaseInsensitiveDict(not_modified.headers)
+        response.headers.pop('Content-Length', None)
+        response.headers.update(entry.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        return response
+
+    def close(self):
+        """
+        Closes all pooled connections.
+
+        :return: None
+        """
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared HTTP client, creating it with the default settings on first use.
+
+    :return: The shared HTTP client.
+    :rtype: HTTPClient
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient(scheduler=RateLimitScheduler())
+        return _default_client
+
+
+def configure_client(**kwargs):
+    """
+    Replaces the shared HTTP client with a new one built from the given settings.
+
+    Unless a scheduler is given, the new client keeps the rate limit scheduler of the current one, so the request
+    budget stays shared across reconfigurations.
+
+    :param kwargs: Keyword arguments passed to HTTPClient.
+
+    :return: The new shared HTTP client.
+    :rtype: HTTPClient
+    """
+    if 'scheduler' not in kwargs:
+        current = _default_client
+        kwargs['scheduler'] = current.scheduler if current is not None and current.scheduler else RateLimitScheduler()
+    return set_client(HTTPClient(**kwargs))
+
+
+def set_client(client):
+    """
+    Replaces the shared HTTP client, closing the previous one.
+
+    :param client: The client every fetcher should use from now on.
+    :type client: HTTPClient
+
+    :return: The new shared HTTP client.
+    :rtype: HTTPClient
+    """
+    global _default_client
+    with _default_client_lock:
+        previous, _default_client = _default_client, client
+    if previous is not None and previous is not client:
+        previous.close()
+    return client
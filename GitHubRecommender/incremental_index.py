@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+
+# Number of hashed term columns. Large enough that distinct terms of a description corpus rarely collide.
+DEFAULT_N_FEATURES = 2 ** 20
+
+
+class IncrementalIndex:
+    """
+    A TF-IDF recommendation index that is updated one repository at a time instead of being refitted.
+
+    Terms are mapped to columns by hashing, so a new term never changes the vocabulary. For every repository only its
+    raw term counts are stored, together with the document frequency of every column. The IDF weights, and with them
+    the normalized TF-IDF matrix, are recomputed lazily at the first query after a change, which takes one pass over
+    the stored counts. Without hash collisions the similarities equal those of a TfidfVectorizer fitted on the same
+    descriptions. The index can be saved to a directory and loaded again, so that the next crawl patches it instead of
+    refitting.
+
+    :param n_features: The number of hashed term columns.
+    :type n_features: int
+    """
+
+    # Files of a saved index
+    ARRAY_FILES = ('term_counts', 'term_indices', 'term_indptr', 'document_frequency')
+    METADATA_FILE = 'incremental_index.json'
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES):
+        import numpy as np
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_features = n_features
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self._vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self._repositories = {}
+        self._counts = {}
+        self._matrix = None
+        self._positions = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._repositories)
+
+    def __contains__(self, full_name):
+        return full_name in self._repositories
+
+    def _term_counts(self, description):
+        from .recommender_system import preprocess_text
+
+        row = self._vectorizer.transform([preprocess_text(description)])
+        return row.indices.copy(), row.data.copy()
+
+    def add(self, repo):
+        """
+        Adds a repository, or updates it if a repository with the same full name is already indexed.
+
+        :param repo: A repository dictionary with 'full_name' and 'description'.
+        :type repo: dict
+
+        :return: True if the index changed, False if the repository was indexed with the same description.
+        :rtype: bool
+        """
+        full_name = repo['full_name']
+        with self._lock:
+            previous = self._repositories.get(full_name)
+            if previous is not None and previous.get('description') == repo.get('description'):
+                self._repositories[full_name] = repo
+                return False
+
+            # Tokenize before changing anything, so a failure cannot leave the rows out of step with the repositories
+            indices, counts = self._term_counts(repo.get('description'))
+            self._repositories[full_name] = repo
+            if previous is not None:
+                self.document_frequency[self._counts[full_name][0]] -= 1
+            self.document_frequency[indices] += 1
+            self._counts[full_name] = (indices, counts)
+            self._matrix = None
+            if previous is None:
+                self._positions = None
+            return True
+
+    update = add
+
+    def remove(self, full_name):
+        """
+        Removes a repository.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+
+        :return: None
+
+        :raises KeyError: If the repository is not indexed.
+        """
+        with self._lock:
+            del self._repositories[full_name]
+            indices, _ = self._counts.pop(full_name)
+            self.document_frequency[indices] -= 1
+            self._matrix = None
+            self._positions = None
+
+    def apply(self, repositories, remove_missing=False):
+        """
+        Patches the index with the results of a crawl.
+
+        :param repositories: A list of repository dictionaries.
+        :type repositories: list of dict
+        :param remove_missing: Whether indexed repositories that are not in the list are removed.
+        :type remove_missing: bool
+
+        :return: The number of repositories that were added, updated or removed.
+        :rtype: int
+        """
+        changed = sum(self.add(repo) for repo in repositories)
+        if remove_missing:
+            current = {repo['full_name'] for repo in repositories}
+            for full_name in [name for name in self.repo_ids if name not in current]:
+                self.remove(full_name)
+                changed += 1
+        return changed
+
+    @property
+    def repo_ids(self):
+        """
+        The full names of the indexed repositories, in the order of the rows of the matrix.
+
+        :rtype: list of str
+        """
+        with self._lock:
+            return list(self._repositories)
+
+    @property
+    def idf(self):
+        """
+        The current smoothed IDF weight of every column, as computed by TfidfVectorizer.
+
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+
+        return np.log((1 + len(self._repositories)) / (1 + self.document_frequency)) + 1
+
+    @property
+    def matrix(self):
+        """
+        The L2-normalized TF-IDF matrix with one row per repository, reweighted if the index changed.
+
+        :rtype: scipy.sparse.csr_matrix
+        """
+        with self._lock:
+            return self._current_matrix()
+
+    def _current_matrix(self):
+        # Must be called with the lock held
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        from sklearn.preprocessing import normalize
+
+        if self._matrix is None:
+            rows = list(self._counts.values())
+            indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+            indices = np.concatenate([row[0] for row in rows]) if rows else np.empty(0, dtype=np.int32)
+            counts = np.concatenate([row[1] for row in rows]) if rows else np.empty(0)
+
+            weights = counts * self.idf[indices]
+            matrix = csr_matrix((weights, indices, indptr), shape=(len(rows), self.n_features))
+            self._matrix = normalize(matrix, norm='l2', copy=False)
+        return self._matrix
+
+    def _current_positions(self):
+        # Must be called with the lock held
+        if self._positions is None:
+            self._positions = {name: row for row, name in enumerate(self._repositories)}
+        return self._positions
+
+    def position(self, full_name):
+        """
+        Returns the row of a repository.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+
+        :return: The row index of the repository.
+        :rtype: int
+
+        :raises KeyError: If the repository is not indexed.
+        """
+        with self._lock:
+            return self._current_positions()[full_name]
+
+    def recommend(self, full_name, top_n=5):
+        """
+        Recommends indexed repositories similar to an indexed repository.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+        :param top_n: The number of recommendations.
+        :type top_n: int
+
+        :return: The recommended repositories, most similar first.
+        :rtype: list of dict
+
+        :raises KeyError: If the repository is not indexed.
+        """
+        from .recommendation_table import top_k_rows
+
+        # The matrix, the row and the repositories are taken together, so a concurrent change cannot mix them up
+        with self._lock:
+            matrix = self._current_matrix()
+            row = self._current_positions()[full_name]
+            repositories = list(self._repositories.values())
+        top_n = min(top_n, matrix.shape[0] - 1)
+        if top_n < 1:
+            return []
+        return [repositories[i] for i in top_k_rows(matrix, row, row + 1, top_n)[0][0]]
+
+    def save(self, path):
+        """
+        Saves the index to a directory: the term counts of every repository, the document frequencies, and the full
+        name and description of the repository of every row.
+
+        :param path: The directory to save the index to. It is created if it does not exist.
+        :type path: str
+
+        :return: None
+        """
+        import numpy as np
+
+        with self._lock:
+            rows = list(self._counts.values())
+            indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+            arrays = {
+                'term_counts': np.concatenate([row[1] for row in rows]) if rows else np.empty(0),
+                'term_indices': np.concatenate([row[0] for row in rows]) if rows else np.empty(0, dtype=np.int32),
+                'term_indptr': indptr,
+                'document_frequency': self.document_frequency,
+            }
+            metadata = {
+                'n_features': self.n_features,
+                'repo_ids': list(self._repositories),
+                'descriptions': [repo.get('description') for repo in self._repositories.values()],
+            }
+
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAY_FILES:
+            np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+        with open(os.path.join(path, self.METADATA_FILE), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with save.
+
+        The repositories of the loaded index only have their 'full_name' and 'description'. Applying a crawl replaces
+        them with the crawled repository dictionaries, and only re-tokenizes the descriptions that changed.
+
+        :param path: The directory the index was saved to.
+        :type path: str
+
+        :return: The loaded index, with the rows in the saved order.
+        :rtype: IncrementalIndex
+
+        :raises OSError: If the directory does not hold a saved index.
+        """
+        import numpy as np
+
+        with open(os.path.join(path, cls.METADATA_FILE), encoding='utf-8') as f:
+            metadata = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy')) for name in cls.ARRAY_FILES}
+
+        index = cls(metadata['n_features'])
+        index.document_frequency = arrays['document_frequency']
+        indptr = arrays['term_indptr']
+        for row, (full_name, description) in enumerate(zip(metadata['repo_ids'], metadata['descriptions'])):
+            start, stop = indptr[row], indptr[row + 1]
+            index._repositories[full_name] = {'full_name': full_name, 'description': description}
+            index._counts[full_name] = (arrays['term_indices'][start:stop], arrays['term_counts'][start:stop])
+        return index
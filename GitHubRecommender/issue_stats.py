@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from .http_client import RateLimitError, check_response, get_client, is_rate_limited
+
+# Labels GitHub suggests for issues suited to newcomers, and the repository fields their open issue counts are stored in
+BEGINNER_LABELS = {
+    'good_first_issues': 'good first issue',
+    'help_wanted_issues': 'help wanted',
+}
+
+# Number of issues per page of the issue listing, the maximum allowed by GitHub
+ISSUES_PAGE_SIZE = 100
+
+# Number of pages read per label before the issues are counted with the search API instead
+DEFAULT_MAX_PAGES = 5
+
+
+def count_labelled_issues(repo_full_name, label, max_pages=DEFAULT_MAX_PAGES, client=None):
+    """
+    Counts the open issues of a repository that have a label.
+
+    The issues are listed with the label as a filter, 100 per page. Every page holds the full issue objects, bodies
+    included, so the listing stops at the first page that is not full, which for most repositories is the first one.
+    Pull requests, which GitHub lists together with issues, are not counted. If max_pages are full, the listing would
+    only give a lower bound, so the issues are counted with a single request to the search API instead.
+
+    :param repo_full_name: The full name of the repository in the format 'owner/repo'.
+    :type repo_full_name: str
+    :param label: The name of the label, e.g. 'good first issue'.
+    :type label: str
+    :param max_pages: The maximum number of pages listed. Repositories with more labelled issues are counted with the
+                      search API, which has a much lower rate limit.
+    :type max_pages: int
+    :param client: The HTTP client used for the requests. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: The number of open issues with the label. Repositories with issues disabled have 0.
+    :rtype: int
+
+    :raises http_client.RateLimitError: If a request is still rate limited after all retries.
+    :raises http_client.GitHubAPIError: If a request fails for any other reason.
+    """
+    client = client or get_client()
+    url = (f"{client.api_url}/repos/{repo_full_name}/issues"
+           f"?state=open&labels={quote(label)}&per_page={ISSUES_PAGE_SIZE}")
+
+    count = 0
+    for page in range(1, max_pages + 1):
+        response = client.get(f"{url}&page={page}")
+        if response.status_code in (404, 410):
+            # The repository has its issues disabled
+            return 0
+        if is_rate_limited(response):
+            raise RateLimitError(response)
+        check_response(response)
+
+        issues = response.json()
+        count += sum('pull_request' not in issue for issue in issues)
+        if len(issues) < ISSUES_PAGE_SIZE:
+            return count
+    return search_labelled_issues(repo_full_name, label, client)
+
+
+def search_labelled_issues(repo_full_name, label, client=None):
+    """
+    Counts the open issues of a repository that have a label with the search API.
+
+    The count is the 'total_count' of a search that returns a single result, so it costs one request however many
+    issues there are. The search API has its own, much lower rate limit, which is why count_labelled_issues only uses
+    it for repositories with too many labelled issues to list.
+
+    :param repo_full_name: The full name of the repository in the format 'owner/repo'.
+    :type repo_full_name: str
+    :param label: The name of the label, e.g. 'good first issue'.
+    :type label: str
+    :param client: The HTTP client used for the request. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: The number of open issues with the label, without pull requests.
+    :rtype: int
+
+    :raises http_client.RateLimitError: If the request is still rate limited after all retries.
+    :raises http_client.GitHubAPIError: If the request fails for any other reason.
+    """
+    client = client or get_client()
+    query = quote(f'repo:{repo_full_name} label:"{label}" is:issue is:open')
+    response = client.get(f"{client.api_url}/search/issues?q={query}&per_page=1")
+    if is_rate_limited(response):
+        raise RateLimitError(response)
+    check_response(response)
+    return response.json()['total_count']
+
+
+def fetch_issue_stats(repo, max_pages=DEFAULT_MAX_PAGES, client=None):
+    """
+    Gets the issue statistics of a repository and stores them in the repository dictionary.
+
+    The number of open issues is taken from the 'open_issues_count' of the search result, which costs no request (and,
+    as on GitHub, includes open pull requests). The beginner-friendly issues are counted with count_labelled_issues.
+
+    :param repo: A repository dictionary as returned by the GitHub search API. It is updated in place.
+    :type repo: dict
+    :param max_pages: The maximum number of pages read per label.
+    :type max_pages: int
+    :param client: The HTTP client used for the requests. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: The same repository dictionary with 'good_first_issues' and 'help_wanted_issues' set.
+    :rtype: dict
+    """
+    for field, label in BEGINNER_LABELS.items():
+        repo[field] = count_labelled_issues(repo['full_name'], label, max_pages, client)
+    return repo
+
+
+def add_issue_stats(repos, max_workers=None, max_pages=DEFAULT_MAX_PAGES, client=None):
+    """
+    Gets the issue statistics of every repository, fetching them concurrently.
+
+    :param repos: A list of repository dictionaries as returned by the GitHub search API. They are updated in place.
+    :type repos: list of dict
+    :param max_workers: The maximum number of repositories whose issues are counted at once. None or 1 counts them
+                        one at a time.
+    :type max_workers: int or None
+    :param max_pages: The maximum number of pages read per label.
+    :type max_pages: int
+    :param client: The HTTP client used for the requests. Defaults to the shared client.
+    :type client: http_client.HTTPClient or None
+
+    :return: The same list of repositories, in the same order, with 'good_first_issues' and 'help_wanted_issues' set.
+    :rtype: list of dict
+
+    :raises http_client.GitHubAPIError: If any request fails.
+    """
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+
+    if max_workers is None or max_workers == 1 or len(repos) <= 1:
+        for repo in repos:
+            fetch_issue_stats(repo, max_pages, client)
+        return repos
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(repos))) as executor:
+        # Re-raise any exception from the worker threads
+        list(executor.map(lambda repo: fetch_issue_stats(repo, max_pages, client), repos))
+    return repos
@@ -1,9 +1,20 @@
 import argparse
-import pandas as pd
+import asyncio
 import sqlite3
-import data_acquisition as da
-import data_processing as dp
-import recommender_system as rs
+from . import ann_index
+from . import data_acquisition as da
+from . import graphql_acquisition as ga
+from . import http_client
+from . import http_cache
+from . import issue_stats
+from . import metrics
+from . import crawl_state
+from . import data_processing as dp
+from . import recommender_system as rs
+from . import recommendation_table as rt
+from . import repo_catalog
+from . import server
+from . import snapshot
 
 
 
@@ -16,36 +27,131 @@ def fetch_and_store_news():
     :return: A DataFrame containing the latest Python news.
     :rtype: pandas.DataFrame
     """
+    import pandas as pd
+
     python_news = da.fetch_latest_python_news()
     
     news_df = pd.DataFrame(python_news)
     return news_df
 
 
-def main():
-    # Fetch and store the latest Python news
-    news_df = da.fetch_and_store_news()
-    print("\nFetching the latest Python news...\n")
-    print(news_df.to_string(index=False))
+def crawl(args):
+    """
+    Fetches and scores the repositories selected by the command line arguments.
 
-    # Argument parsing for language and stars
-    parser = argparse.ArgumentParser(description='GitHub Repository Recommender System')
-    parser.add_argument('-l', '--language', default='python', type=str, help='Programming language for repositories')
-    parser.add_argument('-s', '--stars', default=1000, type=int, help='Minimum number of stars for repositories')
-    args = parser.parse_args()
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
 
-    print("GitHub Repository Recommender System")
-    print(f"Fetching {args.language} repositories with at least {args.stars} stars from GitHub...")
-
-    # Fetch repositories and process them
-    repositories = da.fetch_repositories(args.language, args.stars)
+    :return: The scored repositories, sorted by weighted score in descending order.
+    :rtype: list of dict
+    """
+    # Revalidate cached GitHub responses instead of downloading them again, and make sure every concurrent
+    # README fetch can keep its own pooled connection
+    cache = None if args.no_cache else http_cache.ResponseCache(args.cache)
+    http_client.configure_client(pool_maxsize=max(args.workers, http_client.DEFAULT_POOL_MAXSIZE), cache=cache)
+
+    languages = ', '.join(args.languages) if args.languages else args.language
+    print(f"Fetching {languages} repositories with at least {args.stars} stars from GitHub...")
+
+    # Fetch repositories and process them, reusing the scores of repositories unchanged since the previous crawl
+    state = None if args.full_crawl else crawl_state.CrawlState(args.state)
+    if args.languages:
+        # Search every language at once and fetch each distinct README once, into one ranking
+        repositories = da.fetch_repositories_multi(args.languages, args.stars, max_workers=args.workers, state=state,
+                                                   max_repos=args.max_repos)
+        print(f"Found {len(repositories)} distinct repositories in {len(args.languages)} languages")
+    elif args.backend == 'graphql':
+        repositories = ga.fetch_repositories_graphql(args.language, args.stars, max_repos=args.max_repos or 30, state=state)
+    else:
+        repositories = da.fetch_repositories(args.language, args.stars, max_workers=args.workers, state=state,
+                                           max_repos=args.max_repos)
+
+    # Count the beginner-friendly issues of every repository, which costs at least one request per label
+    if args.issues:
+        print("Counting 'good first issue' and 'help wanted' issues...")
+        issue_stats.add_issue_stats(repositories, max_workers=args.workers)
     
     # Sort repositories based on weighted score
     sorted_repos = sorted(repositories, key=lambda x: x['weighted_score'], reverse=True)
 
+    if cache is not None:
+        print(f"HTTP cache: {cache.stats()}")
+    if state is not None:
+        print(f"Delta crawl: {state.stats()}")
+
+    return sorted_repos
+
+
+def run(args):
+    """
+    Runs the recommender with the parsed command line arguments of main.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+
+    :return: None
+    """
+    if args.export_snapshot:
+        http_client.configure_client(pool_maxsize=max(args.workers, http_client.DEFAULT_POOL_MAXSIZE))
+        print(f"Exporting {args.language} repositories with at least {args.stars} stars to {args.export_snapshot}...")
+        repositories, news = snapshot.export_snapshot(args.export_snapshot, args.language, args.stars,
+                                                      max_repos=args.max_repos, max_workers=args.workers)
+        print(f"Saved {repositories} repositories and {news} news articles to {args.export_snapshot}")
+        return
+
+    # Fetch and store the latest Python news, or read it from the snapshot
+    if args.snapshot:
+        import pandas as pd
+
+        news_df = pd.DataFrame(snapshot.load_news(args.snapshot))
+        da.store_news_to_db(news_df)
+    else:
+        news_df = da.fetch_and_store_news()
+    print("\nFetching the latest Python news...\n")
+    print(news_df.to_string(index=False))
+
+    database = repo_catalog.RepositoryCatalog(args.database)
+    print("GitHub Repository Recommender System")
+
+    if args.snapshot:
+        # Score the READMEs of the snapshot instead of fetching them
+        sorted_repos = snapshot.load_repositories(args.snapshot)
+        database.save(sorted_repos)
+    elif args.from_database:
+        # Rank the repositories of earlier crawls with one indexed query
+        if args.languages:
+            languages = {language.lower() for language in args.languages}
+            sorted_repos = [repo for repo in database.ranking(None, args.stars)
+                            if (repo['language'] or '').lower() in languages][:args.max_repos]
+        else:
+            sorted_repos = database.ranking(args.language, args.stars, limit=args.max_repos)
+    else:
+        sorted_repos = crawl(args)
+
+        # Save the crawl to the catalog, where it can be ranked again without crawling
+        database.save(sorted_repos)
+    database.close()
+
     print("\nList of Repositories:")
     for idx, repo in enumerate(sorted_repos):
-        print(f"{idx}: {repo['name']} - Stars: {repo['stargazers_count']}, Learning Score: {repo.get('learning_score', 0)}, Weighted Score: {repo['weighted_score']}")
+        issues = f", Good First Issues: {repo['good_first_issues']}" if repo.get('good_first_issues') is not None else ''
+        language = f" [{repo['language']}]" if args.languages else ''
+        print(f"{idx}: {repo['name']}{language} - Stars: {repo['stargazers_count']}, Learning Score: {repo.get('learning_score', 0)}, Weighted Score: {repo['weighted_score']}{issues}")
+
+    if args.catalog or args.serve:
+        catalog = args.catalog or server.DEFAULT_CATALOG_PATH
+        # Patch the index saved by the previous run with the repositories that were added, changed or dropped
+        changed = server.save_catalog(sorted_repos, catalog)
+        print(f"\nSaved the catalog to {catalog} ({changed} repositories re-indexed)")
+
+    if args.serve:
+        # Keep the catalog warm and answer /recommend requests until interrupted
+        try:
+            asyncio.run(server.serve(catalog, args.host, args.port, backend=args.recommender,
+                                     lsh_parameters=ann_index.lsh_parameters(args)))
+        except KeyboardInterrupt:
+            pass
+        return
 
     try:
         repo_id = int(input("\nEnter the ID (number) of a repository to get recommendations: "))
@@ -58,11 +164,67 @@ def main():
     use_additional_features = input("Do you want to use additional features for recommendations? (yes/no): ").lower() == 'yes'
 
     print(f"\nRecommendations based on: {sorted_repos[repo_id]['name']}")
-    recommended_repos = rs.content_based_recommendation(sorted_repos, repo_id, use_additional_features)
+
+    if args.recommender == ann_index.LSH_BACKEND:
+        # Only compare the repository with the candidates of its LSH buckets instead of every repository
+        recommended_repos = ann_index.ann_recommendation(sorted_repos, repo_id, use_additional_features, top_n=5,
+                                                         language=args.recommend_language,
+                                                         **ann_index.lsh_parameters(args))
+    elif args.recommend_language:
+        # Rank every repository of the language, as the precomputed neighbours may not include enough of them
+        recommended_repos = rs.content_based_recommendation(sorted_repos, repo_id, use_additional_features, top_n=5,
+                                                            language=args.recommend_language)
+    else:
+        # Answer from the precomputed neighbours, recomputing them in one batch if the repositories changed
+        table = rt.RecommendationTable(args.recommendations)
+        mode = rt.HYBRID_MODE if use_additional_features else rt.DESCRIPTION_MODE
+        if not table.is_current(sorted_repos, mode, k=5):
+            table.build(sorted_repos, mode)
+        recommended_repos = table.recommend(sorted_repos, repo_id, mode, top_n=5)
+        table.close()
 
     print("\nRecommended Repositories:")
     for repo in recommended_repos:
         print(f"{repo['name']} - {repo['description']}")
 
+
+def main():
+    # Argument parsing for language and stars
+    parser = argparse.ArgumentParser(description='GitHub Repository Recommender System')
+    parser.add_argument('-l', '--language', default='python', type=str, help='Programming language for repositories')
+    parser.add_argument('-s', '--stars', default=1000, type=int, help='Minimum number of stars for repositories')
+    parser.add_argument('-w', '--workers', default=da.DEFAULT_MAX_WORKERS, type=int, help='Number of READMEs to fetch concurrently')
+    parser.add_argument('--cache', default=http_cache.DEFAULT_CACHE_PATH, type=str, help='Path of the on-disk HTTP response cache')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the on-disk HTTP response cache')
+    parser.add_argument('--state', default=crawl_state.DEFAULT_STATE_PATH, type=str, help='Path of the crawl state used to only refetch changed repositories')
+    parser.add_argument('--full-crawl', action='store_true', help='Fetch and score every README, ignoring the previous crawl')
+    parser.add_argument('-n', '--max-repos', default=None, type=int, help='Number of repositories to fetch (default: the first page of 30 search results)')
+    parser.add_argument('--recommendations', default=rt.DEFAULT_TABLE_PATH, type=str, help='Path of the table of precomputed recommendations')
+    parser.add_argument('--catalog', default=None, type=str, help='Save the ranked repositories and their index to this directory, e.g. for a running server to reload')
+    parser.add_argument('--serve', action='store_true', help='Serve recommendations over HTTP instead of asking for a repository')
+    parser.add_argument('--host', default=server.DEFAULT_HOST, type=str, help='Address the server listens on')
+    parser.add_argument('--port', default=server.DEFAULT_PORT, type=int, help='Port the server listens on')
+    parser.add_argument('--database', default=repo_catalog.DEFAULT_DATABASE_PATH, type=str, help='Path of the SQLite catalog the crawled repositories and scores are saved to')
+    parser.add_argument('--from-database', action='store_true', help='Rank the repositories saved in the catalog instead of crawling GitHub')
+    parser.add_argument('--issues', action='store_true', help="Count the open 'good first issue' and 'help wanted' issues of every repository")
+    parser.add_argument('--backend', default='rest', choices=['rest', 'graphql'], help='GitHub API used to fetch repositories and READMEs (graphql requires GITHUB_TOKEN)')
+    parser.add_argument('--snapshot', default=None, type=str, help='Rank and recommend the repositories and show the news of this snapshot, without any network access')
+    parser.add_argument('--export-snapshot', default=None, type=str, help='Crawl the repositories, their READMEs and the news into this snapshot file and exit')
+    parser.add_argument('-L', '--languages', default=None, type=lambda value: [language.strip() for language in value.split(',') if language.strip()], help='Crawl these comma-separated languages concurrently into one ranking, e.g. python,go,rust (replaces --language)')
+    parser.add_argument('--recommend-language', default=None, type=str, help='Only recommend repositories of this language')
+    parser.add_argument('--metrics', default=None, type=str, help="Write the per-stage timings and HTTP counters of the run to this JSON file ('-' prints them)")
+    ann_index.add_backend_arguments(parser)
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.languages and args.backend == 'graphql':
+        parser.error('--languages is only supported by the rest backend')
+
+    try:
+        run(args)
+    finally:
+        if args.metrics:
+            metrics.get_metrics().write_report(args.metrics)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,300 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefix of every metric exported in the Prometheus text format
+METRIC_PREFIX = 'github_recommender'
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StageTimer:
+    """
+    The handle of a running stage, see Metrics.stage.
+
+    :param items: The number of items the stage processes. It can be changed until the stage ends, e.g. once the
+                  number of results is known.
+    :type items: int
+    """
+
+    def __init__(self, items):
+        self.items = items
+
+
+class Metrics:
+    """
+    Thread-safe counters of a run: the time spent in every stage of the pipeline, and the HTTP requests, bytes,
+    status codes and cache hits of every fetcher.
+
+    A stage is any named piece of work, e.g. 'readme_fetch' or 'tfidf_fit'. Every time it runs, its duration and the
+    number of items it processed are added up, so the seconds of a stage that runs in several threads at once are
+    the sum of the time of every call, not wall-clock time. HTTP requests are counted per target: the GitHub rate
+    limit resource ('core', 'search' or 'graphql') for GitHub requests, and the host name for any other request.
+
+    :param clock: A function returning a monotonic time in seconds.
+    :type clock: callable
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Sets every counter back to zero.
+
+        :return: None
+        """
+        with self._lock:
+            self.started_at = time.time()
+            self._stages = {}
+            self._targets = {}
+            self._statuses = {}
+            self._cache_hits = 0
+            self._cache_misses = 0
+            self._rate_limit_wait = 0.0
+
+    @contextmanager
+    def stage(self, name, items=1):
+        """
+        Times a block of code as one run of a stage.
+
+        :param name: The name of the stage.
+        :type name: str
+        :param items: The number of items processed by the block. It can be updated through the yielded StageTimer.
+        :type items: int
+
+        :return: A context manager yielding a StageTimer.
+        :rtype: contextlib.AbstractContextManager
+        """
+        timer = StageTimer(items)
+        start = self._clock()
+        try:
+            yield timer
+        finally:
+            self.record_stage(name, self._clock() - start, timer.items)
+
+    def record_stage(self, name, seconds, items=1):
+        """
+        Adds one run of a stage.
+
+        :param name: The name of the stage.
+        :type name: str
+        :param seconds: The duration of the run.
+        :type seconds: float
+        :param items: The number of items processed.
+        :type items: int
+
+        :return: None
+        """
+        with self._lock:
+            stage = self._stages.setdefault(name, [0, 0.0, 0])
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] += items
+
+    def record_request(self, target, status_code, size, seconds):
+        """
+        Adds one HTTP request that got a response.
+
+        :param target: The rate limit resource of a GitHub request, or the host of any other request.
+        :type target: str
+        :param status_code: The status code of the response.
+        :type status_code: int
+        :param size: The number of bytes of the response body.
+        :type size: int
+        :param seconds: The time until the response headers arrived.
+        :type seconds: float
+
+        :return: None
+        """
+        with self._lock:
+            counters = self._targets.setdefault(target, [0, 0, 0.0])
+            counters[0] += 1
+            counters[1] += size
+            counters[2] += seconds
+            self._statuses[status_code] = self._statuses.get(status_code, 0) + 1
+
+    def record_rate_limit_wait(self, seconds):
+        """
+        Adds time a request waited for the rate limit scheduler.
+
+        :param seconds: The time spent waiting.
+        :type seconds: float
+
+        :return: None
+        """
+        with self._lock:
+            self._rate_limit_wait += seconds
+
+    def record_cache(self, hit):
+        """
+        Adds one lookup of the HTTP response cache.
+
+        :param hit: Whether the response was served from the cache.
+        :type hit: bool
+
+        :return: None
+        """
+        with self._lock:
+            if hit:
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+
+    def report(self):
+        """
+        Returns every counter as a structured report.
+
+        :return: A JSON-serializable dictionary with the 'started_at' time and 'elapsed' seconds of the run, the
+                 'calls', 'seconds', 'items' and 'items_per_second' of every stage, the HTTP 'requests', 'bytes',
+                 'seconds' and 'status_codes' in total and per target, the seconds spent waiting for the rate limit,
+                 and the hits, misses and hit ratio of the HTTP cache.
+        :rtype: dict
+        """
+        with self._lock:
+            stages = {
+                name: {'calls': calls, 'seconds': seconds, 'items': items,
+                       'items_per_second': items / seconds if seconds else 0.0}
+                for name, (calls, seconds, items) in sorted(self._stages.items())
+            }
+            targets = {
+                target: {'requests': requests, 'bytes': size, 'seconds': seconds}
+                for target, (requests, size, seconds) in sorted(self._targets.items())
+            }
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                'started_at': self.started_at,
+                'elapsed': time.time() - self.started_at,
+                'stages': stages,
+                'http': {
+                    'requests': sum(target['requests'] for target in targets.values()),
+                    'bytes': sum(target['bytes'] for target in targets.values()),
+                    'seconds': sum(target['seconds'] for target in targets.values()),
+                    'rate_limit_wait': self._rate_limit_wait,
+                    'status_codes': {str(status): count for status, count in sorted(self._statuses.items())},
+                    'targets': targets,
+                },
+                'cache': {
+                    'hits': self._cache_hits,
+                    'misses': self._cache_misses,
+                    'hit_ratio': self._cache_hits / lookups if lookups else 0.0,
+                },
+            }
+
+    def prometheus(self, gauges=None):
+        """
+        Renders every counter in the Prometheus text exposition format.
+
+        :param gauges: Additional gauges to export, as a dictionary of metric names (without the prefix) to a tuple of
+                       their help text and value.
+        :type gauges: dict or None
+
+        :return: The metrics, one sample per line.
+        :rtype: str
+        """
+        report = self.report()
+        http = report['http']
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            name = f'{METRIC_PREFIX}_{name}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value!r}' if label_text else f'{name} {value!r}')
+
+        stages = report['stages'].items()
+        metric('stage_seconds_total', 'counter', 'Time spent in each stage, summed over all threads.',
+               [({'stage': name}, stage['seconds']) for name, stage in stages])
+        metric('stage_calls_total', 'counter', 'Number of runs of each stage.',
+               [({'stage': name}, stage['calls']) for name, stage in stages])
+        metric('stage_items_total', 'counter', 'Number of items processed by each stage.',
+               [({'stage': name}, stage['items']) for name, stage in stages])
+
+        targets = http['targets'].items()
+        metric('http_requests_total', 'counter', 'Number of HTTP requests by target.',
+               [({'target': name}, target['requests']) for name, target in targets])
+        metric('http_response_bytes_total', 'counter', 'Bytes of HTTP response bodies by target.',
+               [({'target': name}, target['bytes']) for name, target in targets])
+        metric('http_request_seconds_total', 'counter', 'Time spent waiting for HTTP responses by target.',
+               [({'target': name}, target['seconds']) for name, target in targets])
+        metric('http_responses_total', 'counter', 'Number of HTTP responses by status code.',
+               [({'code': code}, count) for code, count in http['status_codes'].items()])
+        metric('http_rate_limit_wait_seconds_total', 'counter', 'Time spent waiting for the GitHub rate limits.',
+               [({}, http['rate_limit_wait'])])
+
+        cache = report['cache']
+        metric('http_cache_hits_total', 'counter', 'Number of HTTP responses served from the cache.',
+               [({}, cache['hits'])])
+        metric('http_cache_misses_total', 'counter', 'Number of HTTP responses not served from the cache.',
+               [({}, cache['misses'])])
+        metric('http_cache_hit_ratio', 'gauge', 'Share of HTTP cache lookups that were hits.',
+               [({}, cache['hit_ratio'])])
+
+        for name, (help_text, value) in (gauges or {}).items():
+            metric(name, 'gauge', help_text, [({}, value)])
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, path):
+        """
+        Writes the report to a JSON file.
+
+        :param path: The path of the file, or '-' to print the report.
+        :type path: str
+
+        :return: None
+        """
+        text = json.dumps(self.report(), indent=2)
+        if path == '-':
+            print(text)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_default_metrics = Metrics()
+
+
+def get_metrics():
+    """
+    Returns the metrics shared by the whole package.
+
+    :return: The shared metrics.
+    :rtype: Metrics
+    """
+    return _default_metrics
+
+
+def timed(name, count=None):
+    """
+    Decorates a function so that every call is recorded as one run of a stage in the shared metrics.
+
+    :param name: The name of the stage.
+    :type name: str
+    :param count: A function returning the number of items processed from the return value. By default every call
+                  counts as one item.
+    :type count: callable or None
+
+    :return: The decorator.
+    :rtype: callable
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _default_metrics.stage(name) as timer:
+                result = function(*args, **kwargs)
+                if count is not None:
+                    timer.items = count(result)
+                return result
+        return wrapper
+    return decorator
@@ -1,23 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
+from .news_parser import NEWS_URL, fetch_news
 
-def fetch_latest_python_news():
-    url = "https://planetpython.org/"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def fetch_latest_python_news(url=NEWS_URL):
+    """
+    Fetches the ten most recent posts of planetpython.org.
 
-    news_data = []
-    posts = soup.find_all('h3', class_='post')
-
-    for post in posts[:10]:  
-        title_element = post.find('a')
-        title = title_element.get_text().strip()
-        link = title_element['href']
-        date = post.find_next('p').find('em').get_text().strip()
-        description = post.find_next('h4').get_text().strip()
-
-        news_data.append({'title': title, 'link': link, 'date': date, 'description': description})
+    :param url: The URL of the page.
+    :type url: str
 
+    :return: The posts, newest first, as dictionaries with 'title', 'link', 'date' and 'description'.
+    :rtype: list of dict
+    """
+    _, news_data = fetch_news(posts=10, url=url)
     return news_data
 
 
@@ -0,0 +1,339 @@
+import time
+from html.parser import HTMLParser
+from .metrics import timed
+
+# The website the Python news is scraped from
+NEWS_URL = "https://planetpython.org/"
+
+# Number of characters of the page fed to the parser at once
+NEWS_CHUNK_SIZE = 16 * 1024
+
+# Elements that never have content or an end tag
+VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                           'source', 'track', 'wbr'))
+
+
+class NewsParser(HTMLParser):
+    """
+    A single-pass, event-driven extractor of the news articles of planetpython.org.
+
+    The page is parsed as a stream of start tags, end tags and text, with only the currently open elements and the
+    unfinished articles kept in memory, and parsing stops as soon as the requested articles are complete. Articles are
+    extracted in the two layouts the package reads, with the same results as the BeautifulSoup code they replace:
+
+    - By day (data_acquisition.fetch_latest_python_news): for each of the first `days` h2 date headers, every h3
+      sibling up to the next h2 sibling is an article, titled by the text of the h3 and linked by its first link. Its
+      description is the text of the next h4 sibling of the h3.
+    - By post (news_acquisition.fetch_latest_python_news): each of the first `posts` h3 elements of class 'post' is an
+      article, titled and linked by its first link. Its date is the text of the first em in the next p element that
+      has one, and its description is the text of the next h4 element. (The BeautifulSoup code only looked at the
+      very next p element and failed on posts whose content starts with a paragraph.)
+
+    Anything that cannot be found is filled in with 'No ... available'.
+
+    :param days: The number of date headers whose articles are extracted. 0 skips the by-day layout.
+    :type days: int
+    :param posts: The number of posts extracted. 0 skips the by-post layout.
+    :type posts: int
+    """
+
+    def __init__(self, days=0, posts=0):
+        super().__init__(convert_charrefs=True)
+        self.days = days
+        self.posts = posts
+        self.day_articles = []
+        self.post_articles = []
+        self._days_seen = 0
+        self._stack = []
+        self._next_id = 1
+        self._captures = {}
+        # Open day groups, keyed by the element their date header is a child of
+        self._groups = {}
+        # Day articles waiting for their h4 sibling, keyed by the parent element
+        self._waiting_h4_sibling = {}
+        self._waiting_link = []
+        self._waiting_p = []
+        self._waiting_em = []
+        self._waiting_h4 = []
+
+    @property
+    def done(self):
+        """
+        Whether every requested article is complete, so the rest of the page can be skipped.
+
+        :rtype: bool
+        """
+        return (self._days_seen == self.days and not self._groups and not self._waiting_h4_sibling
+                and len(self.post_articles) == self.posts and not self._captures
+                and not (self._waiting_link or self._waiting_p or self._waiting_em or self._waiting_h4))
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def close(self):
+        """
+        Finishes parsing and fills in the defaults of anything that was not found.
+
+        :return: None
+        """
+        if not self.done:
+            super().close()
+        while self._stack:
+            self._end_element(*self._stack.pop())
+        for articles in self._waiting_h4_sibling.values():
+            for article in articles:
+                article['description'] = 'No description available'
+        for article in self._waiting_p + [article for article, _ in self._waiting_em]:
+            article['date'] = 'No date available'
+        for article in self._waiting_h4:
+            article['description'] = 'No description available'
+        self._groups.clear()
+        self._waiting_h4_sibling.clear()
+        self._waiting_p.clear()
+        self._waiting_em.clear()
+        self._waiting_h4.clear()
+
+    def _capture(self, element_id, article, field):
+        self._captures.setdefault(element_id, []).append((article, field, []))
+
+    def handle_starttag(self, tag, attrs):
+        parent = self._stack[-1][1] if self._stack else 0
+        element_id = self._next_id
+        self._next_id += 1
+        attrs = dict(attrs)
+
+        # By day: an h2 ends the day of its siblings, and one of the first `days` h2 elements starts a new day
+        if tag == 'h2':
+            self._groups.pop(parent, None)
+            if self._days_seen < self.days:
+                self._days_seen += 1
+                group = {'date': None}
+                self._groups[parent] = group
+                self._capture(element_id, group, 'date')
+        elif tag == 'h3' and parent in self._groups:
+            article = {'date': self._groups[parent]['date'], 'title': None, 'link': 'No link available',
+                       'description': None}
+            self.day_articles.append(article)
+            self._capture(element_id, article, 'title')
+            self._waiting_link.append((article, element_id, 'day'))
+            self._waiting_h4_sibling.setdefault(parent, []).append(article)
+        if tag == 'h4' and parent in self._waiting_h4_sibling:
+            for article in self._waiting_h4_sibling.pop(parent):
+                self._capture(element_id, article, 'description')
+
+        # By post
+        if tag == 'h3' and 'post' in (attrs.get('class') or '').split() and len(self.post_articles) < self.posts:
+            article = {'title': None, 'link': 'No link available', 'date': None, 'description': None}
+            self.post_articles.append(article)
+            self._waiting_link.append((article, element_id, 'post'))
+            self._waiting_p.append(article)
+            self._waiting_h4.append(article)
+        elif tag == 'p' and self._waiting_p:
+            self._waiting_em.extend((article, element_id) for article in self._waiting_p)
+            self._waiting_p.clear()
+        elif tag == 'em' and self._waiting_em:
+            open_ids = {open_id for _, open_id in self._stack}
+            for article, p_id in [waiting for waiting in self._waiting_em if waiting[1] in open_ids]:
+                self._capture(element_id, article, 'date')
+            self._waiting_em = [waiting for waiting in self._waiting_em if waiting[1] not in open_ids]
+        elif tag == 'h4' and self._waiting_h4:
+            for article in self._waiting_h4:
+                self._capture(element_id, article, 'description')
+            self._waiting_h4.clear()
+
+        # The first link inside a title element
+        if tag == 'a' and self._waiting_link:
+            open_ids = {open_id for _, open_id in self._stack}
+            remaining = []
+            for article, title_id, layout in self._waiting_link:
+                if title_id in open_ids:
+                    article['link'] = attrs.get('href') or 'No link available'
+                    if layout == 'post':
+                        self._capture(element_id, article, 'title')
+                else:
+                    remaining.append((article, title_id, layout))
+            self._waiting_link = remaining
+
+        if tag not in VOID_ELEMENTS:
+            self._stack.append((tag, element_id))
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, an end tag closes the innermost open element of its name and everything inside it, and
+        # an end tag without an open element is ignored
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                while len(self._stack) > position:
+                    self._end_element(*self._stack.pop())
+                return
+
+    def handle_data(self, data):
+        for captures in self._captures.values():
+            for _, _, parts in captures:
+                parts.append(data)
+
+    def _end_element(self, tag, element_id):
+        for article, field, parts in self._captures.pop(element_id, ()):
+            article[field] = ''.join(parts).strip()
+
+        # A day ends with the element its date header is a child of
+        self._groups.pop(element_id, None)
+        for article in self._waiting_h4_sibling.pop(element_id, ()):
+            article['description'] = 'No description available'
+
+        if self._waiting_link:
+            remaining = []
+            for waiting in self._waiting_link:
+                if waiting[1] == element_id:
+                    article, _, layout = waiting
+                    if layout == 'post':
+                        article['title'] = 'No title available'
+                else:
+                    remaining.append(waiting)
+            self._waiting_link = remaining
+
+        if self._waiting_em:
+            # A paragraph without an em, e.g. of the content of a post, does not hold the date; look at the next one
+            self._waiting_p.extend(article for article, p_id in self._waiting_em if p_id == element_id)
+            self._waiting_em = [waiting for waiting in self._waiting_em if waiting[1] != element_id]
+
+
+def parse_news(chunks, days=0, posts=0):
+    """
+    Extracts the news articles of planetpython.org from the text of the page.
+
+    :param chunks: The page, as one string or as an iterable of strings, e.g. the chunks of a streamed response.
+                   Chunks after the last requested article are never read.
+    :type chunks: str or iterable of str
+    :param days: The number of date headers whose articles are extracted, see NewsParser.
+    :type days: int
+    :param posts: The number of posts extracted, see NewsParser.
+    :type posts: int
+
+    :return: The articles by day and the articles by post, each in the order of the page.
+    :rtype: tuple of (list of dict, list of dict)
+    """
+    if isinstance(chunks, str):
+        page = chunks
+        chunks = (page[start:start + NEWS_CHUNK_SIZE] for start in range(0, len(page), NEWS_CHUNK_SIZE))
+
+    parser = NewsParser(days, posts)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+    return parser.day_articles, parser.post_articles
+
+
+@timed('news', count=lambda articles: len(articles[0]) + len(articles[1]))
+def fetch_news(days=0, posts=0, url=NEWS_URL):
+    """
+    Streams the page of planetpython.org and extracts its news articles, closing the connection as soon as the
+    requested articles are complete.
+
+    :param days: The number of date headers whose articles are extracted, see NewsParser.
+    :type days: int
+    :param posts: The number of posts extracted, see NewsParser.
+    :type posts: int
+    :param url: The URL of the page.
+    :type url: str
+
+    :return: The articles by day and the articles by post, each in the order of the page.
+    :rtype: tuple of (list of dict, list of dict)
+    """
+    from .http_client import get_client
+
+    response = get_client().get(url, stream=True)
+    try:
+        # The encoding of the page is declared by the server; planetpython.org is UTF-8
+        response.encoding = response.encoding or 'utf-8'
+        return parse_news(response.iter_content(NEWS_CHUNK_SIZE, decode_unicode=True), days, posts)
+    finally:
+        response.close()
+
+
+def benchmark(html, days=3, posts=10, repeat=5):
+    """
+    Times the extraction of the news articles of a saved page by NewsParser and by the BeautifulSoup code it
+    replaces.
+
+    :param html: The page.
+    :type html: str
+    :param days: The number of date headers whose articles are extracted.
+    :type days: int
+    :param posts: The number of posts extracted.
+    :type posts: int
+    :param repeat: The number of timed runs; the fastest one is reported.
+    :type repeat: int
+
+    :return: A dictionary with the size of the page in 'bytes', the fastest times in seconds of the streaming parser
+             ('stream_seconds') and of BeautifulSoup ('soup_seconds'), and whether both found the same articles
+             ('same').
+    :rtype: dict
+    """
+    stream_seconds = soup_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = parse_news(html, days, posts)
+        stream_seconds = min(stream_seconds, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = _soup_news(html, days, posts)
+        soup_seconds = min(soup_seconds, time.perf_counter() - start)
+
+    return {'bytes': len(html.encode('utf-8')), 'stream_seconds': stream_seconds, 'soup_seconds': soup_seconds,
+            'same': found == expected}
+
+
+def _soup_news(html, days, posts):
+    # The BeautifulSoup extraction that NewsParser replaces, kept as the reference of the benchmark. Post dates are
+    # taken from the first p element with an em, like NewsParser does.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    day_articles = []
+    for date_header in soup.find_all('h2')[:days]:
+        date = date_header.get_text().strip()
+        for sibling in date_header.find_next_siblings():
+            if sibling.name == 'h2':
+                break
+            if sibling.name == 'h3':
+                link = sibling.find('a')['href'] if sibling.find('a') else 'No link available'
+                description_tag = sibling.find_next_sibling('h4')
+                description = description_tag.get_text().strip() if description_tag else 'No description available'
+                day_articles.append({'date': date, 'title': sibling.get_text().strip(), 'link': link,
+                                     'description': description})
+
+    post_articles = []
+    for post in soup.find_all('h3', class_='post')[:posts]:
+        title_element = post.find('a')
+        post_articles.append({
+            'title': title_element.get_text().strip(),
+            'link': title_element['href'],
+            'date': next(p.find('em') for p in post.find_all_next('p') if p.find('em')).get_text().strip(),
+            'description': post.find_next('h4').get_text().strip(),
+        })
+    return day_articles, post_articles
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Benchmark the news parser against BeautifulSoup on saved pages')
+    parser.add_argument('pages', nargs='+', help='Saved HTML pages of planetpython.org')
+    parser.add_argument('--repeat', default=5, type=int, help='Number of timed runs per page')
+    parser.add_argument('--scale', default=1, type=int, help='Concatenate every page this many times, to time larger inputs')
+    args = parser.parse_args()
+
+    results = {}
+    for path in args.pages:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        results[path] = benchmark(html * args.scale, repeat=args.repeat)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
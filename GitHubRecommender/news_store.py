@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Default location of the news database
+DEFAULT_NEWS_PATH = 'python_news.db'
+
+# Fields of a stored news article, in the order of the columns of the news table
+NEWS_FIELDS = ('date', 'title', 'link', 'description')
+
+# Date formats used by planetpython.org, for the day headers and for the dates of single posts
+DATE_FORMATS = ('%B %d, %Y', '%A, %d %B %Y', '%d %B %Y', '%B %d, %Y %I:%M %p', '%Y-%m-%d')
+
+
+def parse_news_date(text):
+    """
+    Converts the date of a news article, as shown on planetpython.org, to an ISO date that sorts chronologically.
+
+    :param text: The date as shown on the website, e.g. 'October 16, 2023'. A trailing ' UTC' is ignored.
+    :type text: str or None
+
+    :return: The date in the format 'YYYY-MM-DD', or None if it cannot be parsed.
+    :rtype: str or None
+    """
+    if not text:
+        return None
+    text = text.strip().removesuffix(' UTC')
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class NewsStore:
+    """
+    An append-only SQLite history of Python news articles.
+
+    Articles are keyed by a unique index on their link, so storing the news of every run only adds the articles that
+    were not seen before, in one transaction, and keeps all earlier ones. Every article also gets the ISO date it was
+    published on, which is indexed, so the latest articles or the articles since a date are read from the database
+    instead of being fetched again.
+
+    A 'news' table written by an earlier version, which replaced the whole table on every run, is upgraded in place:
+    the new columns are added and duplicate links are dropped.
+
+    :param path: The path of the SQLite database file. Use ':memory:' for a store that is not persisted.
+    :type path: str
+    """
+
+    def __init__(self, path=DEFAULT_NEWS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS news (
+                    date TEXT,
+                    title TEXT,
+                    link TEXT,
+                    description TEXT,
+                    published TEXT,
+                    fetched_at REAL
+                )
+            """)
+            self._upgrade()
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS news_link ON news (link)")
+            # Ordered like the queries, with the rowid as the last key, so reading the latest articles needs no sort
+            self._conn.execute("CREATE INDEX IF NOT EXISTS news_published ON news (published DESC, fetched_at DESC)")
+
+    def _upgrade(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(news)")}
+        if 'published' in columns:
+            return
+        self._conn.execute("ALTER TABLE news ADD COLUMN published TEXT")
+        self._conn.execute("ALTER TABLE news ADD COLUMN fetched_at REAL")
+        self._conn.execute("DELETE FROM news WHERE rowid NOT IN (SELECT MIN(rowid) FROM news GROUP BY link)")
+        rows = self._conn.execute("SELECT rowid, date FROM news").fetchall()
+        self._conn.executemany("UPDATE news SET published = ?, fetched_at = 0 WHERE rowid = ?",
+                               [(parse_news_date(date), rowid) for rowid, date in rows])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    def add(self, articles):
+        """
+        Appends the articles whose link is not stored yet.
+
+        :param articles: News article dictionaries with 'date', 'title', 'link' and 'description', newest first, as
+                         returned by data_acquisition.fetch_latest_python_news.
+        :type articles: iterable of dict
+
+        :return: The number of articles that were added.
+        :rtype: int
+        """
+        now = time.time()
+        rows = [tuple(article.get(field) for field in NEWS_FIELDS) + (parse_news_date(article.get('date')), now)
+                for article in articles]
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO news VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def _select(self, where='', parameters=(), limit=None):
+        # Newest day first; within a day, later runs first and articles of one run in the order of the website
+        query = f"""
+            SELECT date, title, link, description, published FROM news {where}
+            ORDER BY published DESC, fetched_at DESC, rowid
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(query, (*parameters, -1 if limit is None else limit)).fetchall()
+        return [dict(zip(NEWS_FIELDS + ('published',), row)) for row in rows]
+
+    def latest(self, n=10):
+        """
+        Returns the most recent stored articles.
+
+        :param n: The number of articles.
+        :type n: int
+
+        :return: The article dictionaries with their ISO 'published' date, newest first.
+        :rtype: list of dict
+        """
+        return self._select(limit=n)
+
+    def since(self, date, limit=None):
+        """
+        Returns the stored articles published on or after a date.
+
+        :param date: The first day, as an ISO date string ('YYYY-MM-DD') or a datetime.date.
+        :type date: str or datetime.date
+        :param limit: The maximum number of articles. None returns all of them.
+        :type limit: int or None
+
+        :return: The article dictionaries with their ISO 'published' date, newest first.
+        :rtype: list of dict
+        """
+        return self._select("WHERE published >= ?", (str(date),), limit)
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,323 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .metrics import timed
+
+# Default location of the precomputed recommendations
+DEFAULT_TABLE_PATH = 'recommendations.db'
+
+# Number of neighbours stored per repository
+DEFAULT_K = 20
+
+# Upper bound in bytes of the memory used to compute the scores of one chunk of rows
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+
+# Peak bytes per similarity score of a chunk: the sparse product (float64 data and int32 indices) is converted to a
+# dense float64 block before it is freed, and argpartition then returns an int64 index block of the same shape. The
+# rest covers the index pointers of the product and the masks of the block.
+BYTES_PER_SCORE = 24
+
+# Feature modes, matching use_additional_features of recommender_system.content_based_recommendation
+DESCRIPTION_MODE = 'description'
+HYBRID_MODE = 'hybrid'
+
+# The matrix shared by the rows computed in a worker process
+_worker_matrix = None
+
+
+def chunk_rows(n_rows, memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    Returns how many rows of similarity scores can be computed at once within the memory limit.
+
+    :param n_rows: The number of rows (repositories) of the matrix.
+    :type n_rows: int
+    :param memory_limit: The maximum number of bytes used by top_k_rows for one chunk, see BYTES_PER_SCORE.
+    :type memory_limit: int
+
+    :return: The number of rows per chunk, at least 1.
+    :rtype: int
+    """
+    return max(1, min(n_rows, memory_limit // (BYTES_PER_SCORE * max(n_rows, 1))))
+
+
+def top_k_rows(matrix, start, stop, k, allowed=None):
+    """
+    Finds the top-k neighbours of a range of rows of an L2-normalized matrix.
+
+    :param matrix: The L2-normalized feature matrix with one row per repository.
+    :type matrix: scipy.sparse.csr_matrix
+    :param start: The first row of the range.
+    :type start: int
+    :param stop: The row after the last row of the range.
+    :type stop: int
+    :param k: The number of neighbours per row.
+    :type k: int
+    :param allowed: A boolean array marking the rows that may be neighbours. None allows every row.
+    :type allowed: numpy.ndarray or None
+
+    :return: The neighbour rows and their cosine similarities, both of shape (stop - start, k), most similar first.
+             Ties are broken by the lower row index, and a row is never its own neighbour. Rows that are not allowed
+             have a similarity of -inf, and only fill up the k neighbours when fewer rows are allowed.
+    :rtype: tuple of (numpy.ndarray, numpy.ndarray)
+    """
+    import numpy as np
+
+    # Only the chunk is transposed; transposing the whole matrix would make scipy convert a full copy of it
+    product = matrix @ matrix[start:stop].T
+    scores = product.T.toarray()
+    del product
+
+    # Negate the scores in place, so the most similar columns are the smallest and no second block is allocated
+    np.negative(scores, out=scores)
+    rows = np.arange(stop - start)
+    scores[rows, rows + start] = np.inf
+    if allowed is not None:
+        scores[:, ~allowed] = np.inf
+
+    # Select the k best columns of every row without sorting the whole row, then order just those. The full index
+    # block of argpartition is dropped as soon as the k columns are copied out of it.
+    candidates = np.argpartition(scores, k - 1, axis=1)[:, :k].copy()
+    candidate_scores = -np.take_along_axis(scores, candidates, axis=1)
+    del scores
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _worker_top_k(start, stop, k):
+    return top_k_rows(_worker_matrix, start, stop, k)
+
+
+def all_pairs_top_k(matrix, k=DEFAULT_K, memory_limit=DEFAULT_MEMORY_LIMIT, workers=1):
+    """
+    Computes the top-k most similar rows of every row of a feature matrix.
+
+    The similarity of all pairs of rows is computed with sparse matrix products over chunks of rows. Each chunk is
+    sized by chunk_rows so that computing it takes at most memory_limit bytes per worker, on top of the normalized
+    copy of the matrix and the (rows, k) results. The best k entries of each row are selected with argpartition
+    instead of a full sort.
+
+    :param matrix: The feature matrix with one row per repository, e.g. the matrix of a TfidfIndex. Rows are
+                   L2-normalized, so the scores are cosine similarities.
+    :type matrix: scipy.sparse.spmatrix
+    :param k: The number of neighbours per row. It is capped at the number of rows minus one.
+    :type k: int
+    :param memory_limit: The maximum number of bytes used to compute one chunk of rows.
+    :type memory_limit: int
+    :param workers: The number of worker processes. 1 computes everything in the current process.
+    :type workers: int
+
+    :return: The neighbour rows and their cosine similarities, both of shape (rows, k), most similar first.
+    :rtype: tuple of (numpy.ndarray, numpy.ndarray)
+    """
+    import numpy as np
+    from sklearn.preprocessing import normalize
+
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    matrix = normalize(matrix.tocsr(), norm='l2')
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows - 1)
+    if k < 1:
+        return np.empty((n_rows, 0), dtype=np.int64), np.empty((n_rows, 0))
+
+    step = chunk_rows(n_rows, memory_limit)
+    ranges = [(start, min(start + step, n_rows)) for start in range(0, n_rows, step)]
+
+    if workers == 1 or len(ranges) == 1:
+        results = [top_k_rows(matrix, start, stop, k) for start, stop in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), initializer=_init_worker,
+                                 initargs=(matrix,)) as executor:
+            results = list(executor.map(_worker_top_k, *zip(*ranges), [k] * len(ranges)))
+
+    return np.vstack([result[0] for result in results]), np.vstack([result[1] for result in results])
+
+
+def corpus_fingerprint(repositories, mode, feature_weights=None):
+    """
+    Computes a fingerprint of everything the recommendations of a list of repositories depend on.
+
+    :param repositories: A list of repository dictionaries.
+    :type repositories: list of dict
+    :param mode: DESCRIPTION_MODE or HYBRID_MODE.
+    :type mode: str
+    :param feature_weights: The weights of the hybrid feature blocks.
+    :type feature_weights: dict or None
+
+    :return: A hexadecimal digest.
+    :rtype: str
+    """
+    digest = hashlib.sha1(f'{mode}\0{sorted((feature_weights or {}).items())}'.encode())
+    for repo in repositories:
+        fields = [repo.get('full_name'), repo.get('description')]
+        if mode == HYBRID_MODE:
+            fields += [repo.get('language'), repo.get('stars', repo.get('stargazers_count'))]
+        digest.update(('\0'.join(map(str, fields)) + '\n').encode())
+    return digest.hexdigest()
+
+
+class RecommendationTable:
+    """
+    An on-disk table of the precomputed top-k neighbours of every repository.
+
+    The neighbours of all repositories are computed in one batch (see all_pairs_top_k) and stored in SQLite keyed by
+    the full name of the repository, so a recommendation is a single indexed lookup instead of a similarity pass over
+    the whole corpus. Each feature mode is stored separately, together with a fingerprint of the repositories it was
+    computed from, so that a changed corpus can be detected.
+
+    :param path: The path of the SQLite database file. Use ':memory:' for a table that is not persisted.
+    :type path: str
+    """
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS corpora (
+                mode TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                k INTEGER NOT NULL,
+                built_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS neighbours (
+                mode TEXT NOT NULL,
+                full_name TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                neighbour TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (mode, full_name, rank)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def is_current(self, repositories, mode=DESCRIPTION_MODE, feature_weights=None, k=1):
+        """
+        Checks whether the stored neighbours were computed from exactly these repositories.
+
+        :param repositories: A list of repository dictionaries.
+        :type repositories: list of dict
+        :param mode: DESCRIPTION_MODE or HYBRID_MODE.
+        :type mode: str
+        :param feature_weights: The weights of the hybrid feature blocks.
+        :type feature_weights: dict or None
+        :param k: The number of neighbours that are needed per repository.
+        :type k: int
+
+        :return: True if the stored neighbours can be used.
+        :rtype: bool
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint, k FROM corpora WHERE mode = ?", (mode,)).fetchone()
+        if row is None:
+            return False
+        fingerprint, stored_k = row
+        return (fingerprint == corpus_fingerprint(repositories, mode, feature_weights)
+                and stored_k >= min(k, len(repositories) - 1))
+
+    @timed('recommendation_table')
+    def build(self, repositories, mode=DESCRIPTION_MODE, k=DEFAULT_K, feature_weights=None,
+              memory_limit=DEFAULT_MEMORY_LIMIT, workers=1, index=None):
+        """
+        Computes the top-k neighbours of every repository and replaces the stored neighbours of the mode.
+
+        :param repositories: A list of repository dictionaries with unique 'full_name' attributes.
+        :type repositories: list of dict
+        :param mode: DESCRIPTION_MODE or HYBRID_MODE.
+        :type mode: str
+        :param k: The number of neighbours stored per repository.
+        :type k: int
+        :param feature_weights: The weights of the hybrid feature blocks.
+        :type feature_weights: dict or None
+        :param memory_limit: The maximum size in bytes of one dense block of scores.
+        :type memory_limit: int
+        :param workers: The number of worker processes.
+        :type workers: int
+        :param index: A prebuilt TF-IDF index of the repositories.
+        :type index: recommender_system.TfidfIndex or None
+
+        :return: None
+        """
+        from .recommender_system import TfidfIndex, hybrid_matrix
+
+        if mode not in (DESCRIPTION_MODE, HYBRID_MODE):
+            raise ValueError(f"Unknown mode: {mode}")
+
+        index = index if index is not None else TfidfIndex.build(repositories)
+        matrix = index.matrix if mode == DESCRIPTION_MODE else hybrid_matrix(index.matrix, repositories, feature_weights)
+        neighbours, scores = all_pairs_top_k(matrix, k, memory_limit, workers)
+
+        names = [repo['full_name'] for repo in repositories]
+        rows = (
+            (mode, names[row], rank, names[neighbour], float(score))
+            for row in range(len(names))
+            for rank, (neighbour, score) in enumerate(zip(neighbours[row], scores[row]))
+        )
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM neighbours WHERE mode = ?", (mode,))
+                self._conn.executemany("INSERT INTO neighbours VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO corpora VALUES (?, ?, ?, ?)",
+                    (mode, corpus_fingerprint(repositories, mode, feature_weights), neighbours.shape[1], time.time())
+                )
+
+    def lookup(self, full_name, mode=DESCRIPTION_MODE, top_n=5):
+        """
+        Looks up the precomputed neighbours of a repository.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+        :param mode: DESCRIPTION_MODE or HYBRID_MODE.
+        :type mode: str
+        :param top_n: The number of neighbours to return.
+        :type top_n: int
+
+        :return: The full names of the neighbours and their cosine similarities, most similar first.
+        :rtype: list of tuple of (str, float)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT neighbour, score FROM neighbours WHERE mode = ? AND full_name = ? ORDER BY rank LIMIT ?",
+                (mode, full_name, top_n)
+            ).fetchall()
+
+    @timed('recommendation')
+    def recommend(self, repositories, base_repo_id, mode=DESCRIPTION_MODE, top_n=5):
+        """
+        Recommends repositories similar to a repository from the precomputed neighbours.
+
+        :param repositories: The repositories the table was built from.
+        :type repositories: list of dict
+        :param base_repo_id: The index in repositories of the repository to get recommendations for.
+        :type base_repo_id: int
+        :param mode: DESCRIPTION_MODE or HYBRID_MODE.
+        :type mode: str
+        :param top_n: The number of recommendations.
+        :type top_n: int
+
+        :return: The recommended repositories, most similar first.
+        :rtype: list of dict
+        """
+        by_name = {repo['full_name']: repo for repo in repositories}
+        neighbours = self.lookup(repositories[base_repo_id]['full_name'], mode, top_n)
+        return [by_name[name] for name, _ in neighbours if name in by_name]
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
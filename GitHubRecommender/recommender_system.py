@@ -1,46 +1,363 @@
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import os
+from .metrics import timed
+
+# Weights of the feature blocks combined by content_based_recommendation with use_additional_features=True
+DEFAULT_FEATURE_WEIGHTS = {'description': 1.0, 'language': 0.5, 'stars': 0.5}
+
 
 def preprocess_text(text):
     # Convert to lowercase, remove punctuation, etc.
     # Check if text is not None
     return text.lower() if text else ''
 
+def repository_column(repositories, field):
+    """
+    Returns one field of every repository.
+
+    :param repositories: A list of repository dictionaries, or a repo_store.RepositoryStore, whose column is then
+                         read at once instead of repository by repository.
+    :type repositories: list of dict or repo_store.RepositoryStore
+    :param field: The name of the field.
+    :type field: str
+
+    :return: The value of the field of every repository, None where it is missing.
+    :rtype: list or numpy.ndarray
+    """
+    if hasattr(repositories, 'column'):
+        return repositories.column(field)
+    if field in ('stars', 'stargazers_count'):
+        return [repo.get('stars', repo.get('stargazers_count')) for repo in repositories]
+    return [repo.get(field) for repo in repositories]
+
+
+def language_mask(repositories, language):
+    """
+    Marks the repositories of a language, e.g. to only recommend repositories of that language.
+
+    :param repositories: A list of repository dictionaries, or a repo_store.RepositoryStore.
+    :type repositories: list of dict or repo_store.RepositoryStore
+    :param language: The language, compared case-insensitively.
+    :type language: str
+
+    :return: A boolean array that is True for every repository of the language.
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+
+    language = language.lower()
+    return np.array([(value or '').lower() == language for value in repository_column(repositories, 'language')],
+                    dtype=bool)
+
+
 def calculate_similarity(vectorizer, repo_matrix, base_vector):
+    from sklearn.metrics.pairwise import cosine_similarity
+
     similarity_scores = cosine_similarity(base_vector, repo_matrix)
     return similarity_scores[0]
 
-def content_based_recommendation(repositories, base_repo_id, use_additional_features=False, top_n=5):
-    # Preprocess descriptions
-    descriptions = [preprocess_text(repo.get('description', '')) for repo in repositories]
-    base_description = preprocess_text(repositories[base_repo_id].get('description', ''))
 
-    # Vectorize descriptions
-    description_vectorizer = TfidfVectorizer()
-    description_matrix = description_vectorizer.fit_transform(descriptions)
-    base_description_vector = description_vectorizer.transform([base_description])
+class TfidfIndex:
+    """
+    A fitted TF-IDF index over repository descriptions that can be reused for many recommendation queries.
 
-    # Prepare the final matrix for similarity calculation
-    final_matrix = description_matrix
-    base_vector = base_description_vector
+    Instead of fitting a TfidfVectorizer for every recommendation, the index is fitted once and holds everything
+    needed to answer queries without refitting: the vocabulary, the IDF weights, the L2-normalized
+    TF-IDF matrix in CSR form and the IDs of the indexed repositories. It can be saved to a directory and loaded
+    again, in which case the arrays are memory-mapped rather than read into memory.
 
-    if use_additional_features:
-        # Combine additional features (language and stars)
-        additional_features = [f"{repo.get('language', '')} {repo.get('stars', 0)}" for repo in repositories]
-        additional_vectorizer = TfidfVectorizer()
-        additional_matrix = additional_vectorizer.fit_transform(additional_features)
+    :param vocabulary: The mapping of terms to column indices.
+    :type vocabulary: dict
+    :param idf: The IDF weight of every column.
+    :type idf: numpy.ndarray
+    :param matrix: The TF-IDF matrix with one row per repository.
+    :type matrix: scipy.sparse.csr_matrix
+    :param repo_ids: The full name of the repository of every row.
+    :type repo_ids: list of str
+    """
 
-        # Concatenate description matrix with additional feature matrix
-        final_matrix = np.hstack((description_matrix.toarray(), additional_matrix.toarray()))
-        base_vector = np.hstack((base_description_vector.toarray(), additional_vectorizer.transform([f"{repositories[base_repo_id].get('language', '')} {repositories[base_repo_id].get('stars', 0)}"]).toarray()))
+    # Files of a saved index
+    ARRAY_FILES = ('data', 'indices', 'indptr', 'idf')
+    METADATA_FILE = 'index.json'
 
-    # Calculate similarity scores
-    scores = calculate_similarity(description_vectorizer, final_matrix, base_vector)
+    def __init__(self, vocabulary, idf, matrix, repo_ids):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = matrix
+        self.repo_ids = list(repo_ids)
+        self._positions = None
+        self._counter = None
 
-    # Get top N similar repositories, excluding the base repository itself
-    top_indices = np.argsort(scores)[::-1][1:top_n+1]
-    return [repositories[i] for i in top_indices]
+    @classmethod
+    @timed('tfidf_fit', count=len)
+    def build(cls, repositories):
+        """
+        Fits an index over the descriptions of a list of repositories.
+
+        :param repositories: A list of repository dictionaries, or a repo_store.RepositoryStore.
+        :type repositories: list of dict or repo_store.RepositoryStore
+
+        :return: The fitted index, with one row per repository in the order of the list.
+        :rtype: TfidfIndex
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        descriptions = [preprocess_text(description) for description in repository_column(repositories, 'description')]
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(descriptions).tocsr()
+        vocabulary = {term: int(column) for term, column in vectorizer.vocabulary_.items()}
+        return cls(vocabulary, vectorizer.idf_, matrix, list(repository_column(repositories, 'full_name')))
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def position(self, repo_id):
+        """
+        Returns the row of a repository.
+
+        :param repo_id: The full name of the repository in the format 'owner/repo'.
+        :type repo_id: str
+
+        :return: The row index of the repository.
+        :rtype: int
+
+        :raises KeyError: If the repository is not in the index.
+        """
+        if self._positions is None:
+            self._positions = {repo_id: row for row, repo_id in enumerate(self.repo_ids)}
+        return self._positions[repo_id]
+
+    def transform(self, texts):
+        """
+        Computes the TF-IDF vectors of texts with the fitted vocabulary and IDF weights.
+
+        :param texts: The texts to vectorize, e.g. repository descriptions.
+        :type texts: list of str
+
+        :return: A matrix with one L2-normalized row per text.
+        :rtype: scipy.sparse.csr_matrix
+        """
+        import numpy as np
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.preprocessing import normalize
+
+        if self._counter is None:
+            self._counter = CountVectorizer(vocabulary=self.vocabulary)
+        counts = self._counter.transform([preprocess_text(text) for text in texts]).astype(np.float64)
+        counts.data *= self.idf[counts.indices]
+        return normalize(counts, norm='l2', copy=False)
+
+    def similarity(self, base_repo_id):
+        """
+        Computes the cosine similarity of one indexed repository to every indexed repository.
+
+        :param base_repo_id: The row index of the repository.
+        :type base_repo_id: int
+
+        :return: The similarity score of every row.
+        :rtype: numpy.ndarray
+        """
+        return calculate_similarity(None, self.matrix, self.matrix[base_repo_id])
+
+    def top_n(self, base_repo_id, top_n=5):
+        """
+        Returns the rows of the repositories most similar to an indexed repository.
+
+        :param base_repo_id: The row index of the repository.
+        :type base_repo_id: int
+        :param top_n: The number of rows to return.
+        :type top_n: int
+
+        :return: The row indices, most similar first, excluding the most similar row (the repository itself).
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+
+        scores = self.similarity(base_repo_id)
+        return np.argsort(scores)[::-1][1:top_n+1]
+
+    def recommend(self, repositories, base_repo_id, top_n=5):
+        """
+        Recommends repositories similar to an indexed repository.
+
+        :param repositories: The repositories the index was built from, in the same order.
+        :type repositories: list of dict
+        :param base_repo_id: The row index of the repository to get recommendations for.
+        :type base_repo_id: int
+        :param top_n: The number of recommendations.
+        :type top_n: int
 
+        :return: The recommended repositories, most similar first.
+        :rtype: list of dict
+        """
+        return [repositories[i] for i in self.top_n(base_repo_id, top_n)]
 
+    def save(self, path):
+        """
+        Saves the index to a directory, one .npy file per array.
 
+        :param path: The directory to save the index to. It is created if it does not exist.
+        :type path: str
+
+        :return: None
+        """
+        import numpy as np
+
+        os.makedirs(path, exist_ok=True)
+        arrays = {'data': self.matrix.data, 'indices': self.matrix.indices, 'indptr': self.matrix.indptr,
+                  'idf': self.idf}
+        for name in self.ARRAY_FILES:
+            np.save(os.path.join(path, f'{name}.npy'), np.asarray(arrays[name]))
+        with open(os.path.join(path, self.METADATA_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'shape': list(self.matrix.shape), 'vocabulary': self.vocabulary, 'repo_ids': self.repo_ids}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads an index saved with save.
+
+        :param path: The directory the index was saved to.
+        :type path: str
+        :param mmap: Whether the arrays are memory-mapped read-only instead of read into memory.
+        :type mmap: bool
+
+        :return: The loaded index.
+        :rtype: TfidfIndex
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in cls.ARRAY_FILES
+        }
+        with open(os.path.join(path, cls.METADATA_FILE), encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(metadata['shape']),
+                            copy=False)
+        return cls(metadata['vocabulary'], arrays['idf'], matrix, metadata['repo_ids'])
+
+
+def language_features(repositories):
+    """
+    Encodes the language of each repository as a one-hot categorical feature.
+
+    :param repositories: A list of repository dictionaries, or a repo_store.RepositoryStore.
+    :type repositories: list of dict or repo_store.RepositoryStore
+
+    :return: A sparse matrix with one row per repository and one column per distinct language. Repositories without
+             a language have an empty row.
+    :rtype: scipy.sparse.csr_matrix
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    categories = {}
+    rows, columns = [], []
+    for row, language in enumerate(repository_column(repositories, 'language')):
+        if language:
+            rows.append(row)
+            columns.append(categories.setdefault(language, len(categories)))
+
+    data = np.ones(len(rows))
+    return csr_matrix((data, (rows, columns)), shape=(len(repositories), len(categories)))
+
+
+def star_features(repositories):
+    """
+    Encodes the star count of each repository as a scaled numeric feature.
+
+    The logarithm of the star count is scaled to an angle between 0 and 90 degrees and stored as its cosine and sine.
+    Every row then has unit length, and the dot product of two rows is the cosine of the difference of their angles,
+    so repositories with a similar number of stars are similar, regardless of how many stars they have.
+
+    :param repositories: A list of repository dictionaries with 'stars' or 'stargazers_count', or a
+                         repo_store.RepositoryStore.
+    :type repositories: list of dict or repo_store.RepositoryStore
+
+    :return: A sparse matrix with one row per repository and two columns.
+    :rtype: scipy.sparse.csr_matrix
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    stars = np.array([count or 0 for count in repository_column(repositories, 'stars')], dtype=np.float64)
+    log_stars = np.log1p(np.maximum(stars, 0))
+    spread = log_stars.max() - log_stars.min() if len(log_stars) else 0
+    scaled = (log_stars - log_stars.min()) / spread if spread > 0 else np.zeros_like(log_stars)
+
+    angles = scaled * (np.pi / 2)
+    return csr_matrix(np.column_stack((np.cos(angles), np.sin(angles))))
+
+
+def hybrid_matrix(description_matrix, repositories, feature_weights=None):
+    """
+    Combines the description, language and star features into one sparse matrix.
+
+    Each block has unit-length rows and is scaled by the square root of its weight before the blocks are stacked side
+    by side, so the cosine similarity of two rows with all blocks present is the weighted mean of the similarities of
+    their blocks. The result stays sparse,
+    and its memory grows with the number of non-zero entries rather than with the size of the vocabulary.
+
+    :param description_matrix: The TF-IDF matrix of the descriptions, e.g. the matrix of a TfidfIndex.
+    :type description_matrix: scipy.sparse.csr_matrix
+    :param repositories: The repositories of the rows of description_matrix, in the same order.
+    :type repositories: list of dict
+    :param feature_weights: The weight of the 'description', 'language' and 'stars' blocks. Missing blocks use
+                            DEFAULT_FEATURE_WEIGHTS, and a weight of 0 leaves a block out.
+    :type feature_weights: dict or None
+
+    :return: A sparse matrix with one row per repository.
+    :rtype: scipy.sparse.csr_matrix
+    """
+    import numpy as np
+    from scipy.sparse import hstack
+
+    weights = dict(DEFAULT_FEATURE_WEIGHTS, **(feature_weights or {}))
+    unknown = set(weights) - set(DEFAULT_FEATURE_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown feature blocks: {', '.join(sorted(unknown))}")
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError(f"Feature weights must not be negative, got {weights}")
+
+    blocks = {
+        'description': lambda: description_matrix,
+        'language': lambda: language_features(repositories),
+        'stars': lambda: star_features(repositories),
+    }
+    matrices = [blocks[name]() * np.sqrt(weight) for name, weight in weights.items() if weight]
+    if not matrices:
+        raise ValueError("At least one feature block needs a non-zero weight")
+    return hstack(matrices, format='csr')
+
+
+@timed('recommendation')
+def content_based_recommendation(repositories, base_repo_id, use_additional_features=False, top_n=5, index=None,
+                                 feature_weights=None, language=None):
+    # NumPy and scikit-learn are only imported when recommendations are actually computed
+    import numpy as np
+
+    # The TF-IDF index of the descriptions can be built once and passed in for reuse
+    index = index if index is not None else TfidfIndex.build(repositories)
+    if not use_additional_features and language is None:
+        return index.recommend(repositories, base_repo_id, top_n)
+
+    if use_additional_features:
+        # Combine the descriptions with the language and star features, without ever building a dense matrix
+        final_matrix = hybrid_matrix(index.matrix, repositories, feature_weights)
+
+        # Calculate similarity scores
+        scores = calculate_similarity(None, final_matrix, final_matrix[base_repo_id])
+    else:
+        scores = index.similarity(base_repo_id)
+
+    if language is None:
+        # Get top N similar repositories, excluding the base repository itself
+        top_indices = np.argsort(scores)[::-1][1:top_n+1]
+    else:
+        # Only repositories of the language are candidates, and never the base repository itself
+        candidates = np.flatnonzero(language_mask(repositories, language))
+        candidates = candidates[candidates != base_repo_id]
+        top_indices = candidates[np.argsort(-scores[candidates], kind='stable')[:top_n]]
+    return [repositories[i] for i in top_indices]
@@ -0,0 +1,230 @@
+import sqlite3
+import threading
+import time
+
+# Default location of the repository catalog database
+DEFAULT_DATABASE_PATH = 'catalog.db'
+
+# Fields of a ranked repository, named as in the GitHub search results, and the catalog columns they are read from
+RANKING_COLUMNS = {
+    'full_name': 'r.full_name',
+    'name': 'r.name',
+    'description': 'r.description',
+    'language': 'r.language',
+    'stargazers_count': 'r.stars',
+    'html_url': 'r.url',
+    'updated_at': 'r.updated_at',
+    'pushed_at': 'r.pushed_at',
+    'readme_sha': 'm.sha',
+    'learning_score': 's.learning_score',
+    'star_score': 's.star_score',
+    'weighted_score': 's.weighted_score',
+    'open_issues_count': 'i.open_issues',
+    'good_first_issues': 'i.good_first_issues',
+    'help_wanted_issues': 'i.help_wanted_issues',
+}
+
+# Issue statistics of a repository dictionary besides the 'open_issues_count' of the search results
+ISSUE_FIELDS = ('good_first_issues', 'help_wanted_issues')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS repositories (
+        full_name TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        language TEXT COLLATE NOCASE,
+        stars INTEGER NOT NULL,
+        url TEXT,
+        updated_at TEXT,
+        pushed_at TEXT,
+        crawled_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS readmes (
+        full_name TEXT PRIMARY KEY REFERENCES repositories (full_name) ON DELETE CASCADE,
+        sha TEXT,
+        size INTEGER,
+        fetched_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS scores (
+        full_name TEXT PRIMARY KEY REFERENCES repositories (full_name) ON DELETE CASCADE,
+        learning_score INTEGER NOT NULL,
+        star_score REAL NOT NULL,
+        weighted_score REAL NOT NULL,
+        scored_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS issue_stats (
+        full_name TEXT PRIMARY KEY REFERENCES repositories (full_name) ON DELETE CASCADE,
+        open_issues INTEGER,
+        good_first_issues INTEGER,
+        help_wanted_issues INTEGER,
+        fetched_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS repositories_language ON repositories (language);
+    CREATE INDEX IF NOT EXISTS repositories_stars ON repositories (stars);
+    CREATE INDEX IF NOT EXISTS scores_weighted_score ON scores (weighted_score);
+"""
+
+
+class RepositoryCatalog:
+    """
+    A normalized SQLite catalog of crawled repositories, their README metadata, scores and issue statistics.
+
+    Every crawl is written with one bulk upsert per table inside a single transaction, so repositories that were
+    crawled before are updated in place and the others are kept. The database runs in WAL mode, so a ranking can be
+    read while a crawl is being written. Repositories are indexed on language and stars, and scores on the weighted
+    score, so a ranking is a single indexed query instead of a crawl.
+
+    :param path: The path of the SQLite database file. Use ':memory:' for a catalog that is not persisted.
+    :type path: str
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+
+    def save(self, repositories):
+        """
+        Upserts crawled repositories with their README metadata, scores and issue statistics.
+
+        :param repositories: A list of repository dictionaries as returned by data_acquisition.fetch_repositories.
+                             Scores are only stored for repositories with a 'weighted_score', and beginner issue
+                             counts for repositories with the fields of issue_stats.add_issue_stats.
+        :type repositories: list of dict
+
+        :return: None
+        """
+        now = time.time()
+        repositories = list(repositories)
+        repository_rows = [
+            (repo['full_name'], repo['name'], repo.get('description'), repo.get('language'),
+             repo.get('stargazers_count', repo.get('stars', 0)), repo.get('html_url', repo.get('url')),
+             repo.get('updated_at'), repo.get('pushed_at'), now)
+            for repo in repositories
+        ]
+        readme_rows = [(repo['full_name'], repo.get('readme_sha'), repo.get('readme_size'), now)
+                       for repo in repositories]
+        score_rows = [
+            (repo['full_name'], repo['learning_score'], repo['star_score'], repo['weighted_score'], now)
+            for repo in repositories if 'weighted_score' in repo
+        ]
+        issue_rows = [
+            (repo['full_name'], repo.get('open_issues_count'), repo.get('good_first_issues'),
+             repo.get('help_wanted_issues'), now)
+            for repo in repositories
+            if any(repo.get(field) is not None for field in ('open_issues_count',) + ISSUE_FIELDS)
+        ]
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("""
+                    INSERT INTO repositories VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (full_name) DO UPDATE SET
+                        name = excluded.name, description = excluded.description, language = excluded.language,
+                        stars = excluded.stars, url = excluded.url, updated_at = excluded.updated_at,
+                        pushed_at = excluded.pushed_at, crawled_at = excluded.crawled_at
+                """, repository_rows)
+                # A repository whose README was not fetched again keeps its stored metadata
+                self._conn.executemany("""
+                    INSERT INTO readmes VALUES (?, ?, ?, ?)
+                    ON CONFLICT (full_name) DO UPDATE SET
+                        sha = COALESCE(excluded.sha, sha), size = COALESCE(excluded.size, size),
+                        fetched_at = excluded.fetched_at
+                """, readme_rows)
+                self._conn.executemany("""
+                    INSERT INTO scores VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (full_name) DO UPDATE SET
+                        learning_score = excluded.learning_score, star_score = excluded.star_score,
+                        weighted_score = excluded.weighted_score, scored_at = excluded.scored_at
+                """, score_rows)
+                # Issue counts that were not fetched in this crawl keep their stored values
+                self._conn.executemany("""
+                    INSERT INTO issue_stats VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (full_name) DO UPDATE SET
+                        open_issues = COALESCE(excluded.open_issues, open_issues),
+                        good_first_issues = COALESCE(excluded.good_first_issues, good_first_issues),
+                        help_wanted_issues = COALESCE(excluded.help_wanted_issues, help_wanted_issues),
+                        fetched_at = excluded.fetched_at
+                """, issue_rows)
+
+    def ranking(self, language=None, min_stars=0, limit=None, min_good_first_issues=0):
+        """
+        Returns the scored repositories of the catalog ranked by their weighted score.
+
+        :param language: Only return repositories in this language (case-insensitive). None returns every language.
+        :type language: str or None
+        :param min_stars: The minimum number of stars.
+        :type min_stars: int
+        :param limit: The maximum number of repositories. None returns all of them.
+        :type limit: int or None
+        :param min_good_first_issues: The minimum number of open 'good first issue' issues. Repositories whose issues
+                                      were never counted only pass the default of 0.
+        :type min_good_first_issues: int
+
+        :return: Repository dictionaries with the fields of RANKING_COLUMNS, highest weighted score first. Ties are
+                 ranked by stars, then by full name.
+        :rtype: list of dict
+        """
+        conditions, parameters = ["r.stars >= ?"], [min_stars]
+        if language is not None:
+            conditions.append("r.language = ?")
+            parameters.append(language)
+        if min_good_first_issues > 0:
+            conditions.append("i.good_first_issues >= ?")
+            parameters.append(min_good_first_issues)
+        parameters.append(-1 if limit is None else limit)
+
+        query = f"""
+            SELECT {', '.join(RANKING_COLUMNS.values())}
+            FROM scores s
+            JOIN repositories r ON r.full_name = s.full_name
+            LEFT JOIN readmes m ON m.full_name = s.full_name
+            LEFT JOIN issue_stats i ON i.full_name = s.full_name
+            WHERE {' AND '.join(conditions)}
+            ORDER BY s.weighted_score DESC, r.stars DESC, r.full_name
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(query, parameters).fetchall()
+        return [dict(zip(RANKING_COLUMNS, row)) for row in rows]
+
+    def lookup(self, full_name):
+        """
+        Looks up one repository of the catalog.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+
+        :return: The repository dictionary with the fields of RANKING_COLUMNS (None for anything not stored), or None
+                 if the repository is not in the catalog.
+        :rtype: dict or None
+        """
+        query = f"""
+            SELECT {', '.join(RANKING_COLUMNS.values())}
+            FROM repositories r
+            LEFT JOIN scores s ON s.full_name = r.full_name
+            LEFT JOIN readmes m ON m.full_name = r.full_name
+            LEFT JOIN issue_stats i ON i.full_name = r.full_name
+            WHERE r.full_name = ?
+        """
+        with self._lock:
+            row = self._conn.execute(query, (full_name,)).fetchone()
+        return dict(zip(RANKING_COLUMNS, row)) if row else None
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,280 @@
+from collections.abc import Mapping
+import numpy as np
+
+# Free-text columns, stored as one Python string per repository. 'url' is the web address of the repository.
+TEXT_FIELDS = ('full_name', 'name', 'description', 'url', 'updated_at')
+
+# Columns with few distinct values, stored as integer codes into a table of interned strings
+INTERNED_FIELDS = ('language', 'category')
+
+# Numeric columns and their NumPy types
+NUMERIC_FIELDS = {
+    'stars': np.int64,
+    'learning_score': np.int64,
+    'star_score': np.float64,
+    'weighted_score': np.float64,
+}
+
+FIELDS = TEXT_FIELDS + INTERNED_FIELDS + tuple(NUMERIC_FIELDS)
+
+# Names of the GitHub search API for the same fields, accepted when reading and building rows
+ALIASES = {'stargazers_count': 'stars', 'html_url': 'url'}
+_FIELD_ALIASES = {field: alias for alias, field in ALIASES.items()}
+
+
+class RepositoryRow(Mapping):
+    """
+    A view of one row of a RepositoryStore that behaves like a repository dictionary.
+
+    Reading a field reads the column of the store, and assigning a field writes it, so code written for repository
+    dictionaries, e.g. data_processing.score_repository, works on rows unchanged. Nothing is copied.
+
+    :param store: The store the row belongs to.
+    :type store: RepositoryStore
+    :param row: The index of the row.
+    :type row: int
+    """
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, field):
+        return self.store.value(self.row, field)
+
+    def __setitem__(self, field, value):
+        self.store.set_value(self.row, field, value)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __contains__(self, field):
+        return ALIASES.get(field, field) in FIELDS
+
+    def __eq__(self, other):
+        return isinstance(other, Mapping) and dict(self) == dict(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'RepositoryRow({dict(self)!r})'
+
+
+class RepositoryStore:
+    """
+    A compact, columnar container of repositories.
+
+    Only the fields that are scored, ranked and recommended on are kept, one NumPy array per field, instead of one
+    dictionary of about a hundred fields per repository. Languages and popularity categories are interned: each
+    distinct string is stored once and rows hold small integer codes (-1 for a missing value).
+
+    Indexing with an integer returns a RepositoryRow view, and iterating yields one view per row, so a store can be
+    passed wherever a list of repository dictionaries is read. Indexing with a slice or an array of row indices
+    returns a new store.
+
+    :param columns: The arrays of the text and numeric fields, and the code arrays of the interned fields, all of the
+                    same length. Missing fields are filled with empty values.
+    :type columns: dict
+    :param interned: The table of distinct strings of every interned field.
+    :type interned: dict or None
+    """
+
+    def __init__(self, columns, interned=None):
+        size = len(next(iter(columns.values()))) if columns else 0
+        self.interned = {field: list((interned or {}).get(field, ())) for field in INTERNED_FIELDS}
+        self._codes = {field: {value: code for code, value in enumerate(values)}
+                       for field, values in self.interned.items()}
+        self.columns = {}
+        for field in FIELDS:
+            if field in columns:
+                column = np.asarray(columns[field], dtype=self._dtype(field))
+            elif field in INTERNED_FIELDS:
+                column = np.full(size, -1, dtype=np.int32)
+            else:
+                column = np.zeros(size, dtype=self._dtype(field)) if field in NUMERIC_FIELDS else np.full(size, None)
+            if len(column) != size:
+                raise ValueError(f"Column {field} has {len(column)} rows, expected {size}")
+            self.columns[field] = column
+
+    @staticmethod
+    def _dtype(field):
+        if field in NUMERIC_FIELDS:
+            return NUMERIC_FIELDS[field]
+        return np.int32 if field in INTERNED_FIELDS else object
+
+    @classmethod
+    def from_repositories(cls, repositories):
+        """
+        Builds a store from repository dictionaries, e.g. GitHub search results or processed repositories.
+
+        :param repositories: A list of repository dictionaries. Fields may use the names of the GitHub search API
+                             ('stargazers_count', 'html_url').
+        :type repositories: list of dict
+
+        :return: The store, with one row per repository in the same order.
+        :rtype: RepositoryStore
+        """
+        # An empty store collects the interned strings while the columns are gathered
+        store = cls({field: [] for field in FIELDS})
+        values = {field: [] for field in FIELDS}
+        for repo in repositories:
+            for field in FIELDS:
+                # The GitHub search API name comes first, since its 'url' is the API address, not the web page
+                value = repo.get(_FIELD_ALIASES[field]) if field in _FIELD_ALIASES else None
+                if value is None:
+                    value = repo.get(field)
+                if field in INTERNED_FIELDS:
+                    value = store.intern(field, value)
+                elif field in NUMERIC_FIELDS and value is None:
+                    value = 0
+                values[field].append(value)
+
+        return cls(values, store.interned)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Builds a store from whole columns of values.
+
+        :param columns: The values of each field, as lists or arrays of the same length. Interned fields are given as
+                        strings (or None) and are interned here. Missing fields are filled with empty values.
+        :type columns: dict
+
+        :return: The store.
+        :rtype: RepositoryStore
+        """
+        columns = {ALIASES.get(field, field): values for field, values in columns.items()}
+        interned = {}
+        for field in INTERNED_FIELDS:
+            if field in columns:
+                codes = {None: -1}
+                columns[field] = [codes.setdefault(value, len(codes) - 1) for value in columns[field]]
+                interned[field] = [value for value in codes if value is not None]
+        return cls(columns, interned)
+
+    def intern(self, field, value):
+        """
+        Returns the code of a string of an interned field, adding it to the table if it is new.
+
+        :param field: 'language' or 'category'.
+        :type field: str
+        :param value: The string, or None for a missing value.
+        :type value: str or None
+
+        :return: The code of the string, or -1 for None.
+        :rtype: int
+        """
+        if value is None:
+            return -1
+        codes = self._codes[field]
+        if value not in codes:
+            codes[value] = len(self.interned[field])
+            self.interned[field].append(value)
+        return codes[value]
+
+    def __len__(self):
+        return len(self.columns['full_name'])
+
+    def __iter__(self):
+        return (RepositoryRow(self, row) for row in range(len(self)))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            row = int(key)
+            if not -len(self) <= row < len(self):
+                raise IndexError(f"Row {row} out of range for a store of {len(self)} repositories")
+            return RepositoryRow(self, row % len(self))
+        return self.take(np.arange(len(self))[key] if isinstance(key, slice) else key)
+
+    def take(self, rows):
+        """
+        Returns a new store with the given rows, in the given order.
+
+        :param rows: The row indices.
+        :type rows: array_like of int
+
+        :return: The new store, with a copy of the interned string tables of this store.
+        :rtype: RepositoryStore
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return RepositoryStore({field: column[rows] for field, column in self.columns.items()}, self.interned)
+
+    def column(self, field):
+        """
+        Returns the values of a field for every row.
+
+        :param field: The name of the field.
+        :type field: str
+
+        :return: The column. Interned fields are decoded into an object array of strings (None where missing).
+        :rtype: numpy.ndarray
+        """
+        field = ALIASES.get(field, field)
+        if field not in INTERNED_FIELDS:
+            return self.columns[field]
+        table = np.empty(len(self.interned[field]) + 1, dtype=object)
+        table[:-1] = self.interned[field]
+        return table[self.columns[field]]
+
+    def value(self, row, field):
+        """
+        Returns the value of a field of one row as a Python object.
+
+        :param row: The row index.
+        :type row: int
+        :param field: The name of the field.
+        :type field: str
+
+        :return: The value.
+
+        :raises KeyError: If the field is not stored.
+        """
+        field = ALIASES.get(field, field)
+        if field not in self.columns:
+            raise KeyError(field)
+        value = self.columns[field][row]
+        if field in INTERNED_FIELDS:
+            return self.interned[field][value] if value >= 0 else None
+        return value.item() if isinstance(value, np.generic) else value
+
+    def set_value(self, row, field, value):
+        """
+        Sets the value of a field of one row.
+
+        :param row: The row index.
+        :type row: int
+        :param field: The name of the field.
+        :type field: str
+        :param value: The new value.
+
+        :return: None
+
+        :raises KeyError: If the field is not stored.
+        """
+        field = ALIASES.get(field, field)
+        if field not in self.columns:
+            raise KeyError(field)
+        self.columns[field][row] = self.intern(field, value) if field in INTERNED_FIELDS else value
+
+    def to_repositories(self):
+        """
+        Converts the store back to a list of repository dictionaries.
+
+        :return: One dictionary per row, with every stored field.
+        :rtype: list of dict
+        """
+        return [dict(row) for row in self]
+
+    def nbytes(self):
+        """
+        Returns the memory used by the arrays of the store, not counting the string objects they refer to.
+
+        :return: The size in bytes.
+        :rtype: int
+        """
+        return sum(column.nbytes for column in self.columns.values())
@@ -0,0 +1,558 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from .ann_index import (EXACT_BACKEND, LSH_BACKEND, RECOMMENDER_BACKENDS, LSHIndex, add_backend_arguments,
+                        lsh_parameters)
+from .metrics import PROMETHEUS_CONTENT_TYPE, get_metrics, timed
+
+# Default directory of the catalog served by the recommendation service
+DEFAULT_CATALOG_PATH = 'catalog'
+
+# Default address of the recommendation service
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+
+# Default number of recommendation results kept in the LRU cache
+DEFAULT_CACHE_SIZE = 1024
+
+# Default and maximum number of recommendations per request
+DEFAULT_K = 5
+MAX_K = 100
+
+# The repository fields kept in the catalog and returned with every recommendation
+CATALOG_FIELDS = ('full_name', 'name', 'description', 'language', 'stargazers_count', 'html_url', 'learning_score',
+                  'weighted_score')
+REPOSITORIES_FILE = 'repositories.json'
+
+# Largest request line or header accepted by the server
+MAX_LINE = 8192
+
+
+def save_catalog(repositories, path=DEFAULT_CATALOG_PATH, index=None):
+    """
+    Saves the repositories and their TF-IDF index to a catalog directory that can be served by RecommendationServer.
+
+    The index of the catalog already saved at path is patched instead of being refitted: only new and changed
+    descriptions are tokenized, and repositories that are no longer in the list are removed. The repositories are
+    saved in the order of the rows of the index. The catalog is written to a temporary directory first and then moved
+    into place, so a running server that reloads the catalog never sees a half-written one.
+
+    :param repositories: A list of repository dictionaries with unique 'full_name' attributes.
+    :type repositories: list of dict
+    :param path: The catalog directory. An existing catalog is replaced.
+    :type path: str
+    :param index: The index to patch instead of the one saved at path. It is updated in place.
+    :type index: incremental_index.IncrementalIndex or None
+
+    :return: The number of repositories that were added to, updated in or removed from the index.
+    :rtype: int
+    """
+    from .incremental_index import IncrementalIndex
+
+    path = os.path.abspath(path)
+    if index is None:
+        try:
+            index = IncrementalIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            # There is no catalog yet, or it cannot be patched
+            index = IncrementalIndex()
+    changed = index.apply(repositories, remove_missing=True)
+
+    staging, previous = f'{path}.new', f'{path}.old'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    index.save(staging)
+    by_name = {repo['full_name']: repo for repo in repositories}
+    with open(os.path.join(staging, REPOSITORIES_FILE), 'w', encoding='utf-8') as f:
+        json.dump([{field: by_name[full_name].get(field) for field in CATALOG_FIELDS} for full_name in index.repo_ids],
+                  f)
+
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return changed
+
+
+class RecommendationService:
+    """
+    A loaded catalog: the repositories, their TF-IDF index and the hybrid feature matrix, kept in memory to answer
+    recommendation queries without refitting anything. A service is never modified after it is created; a reload
+    creates a new one.
+
+    :param repositories: A list of repository dictionaries.
+    :type repositories: list of dict
+    :param index: The TF-IDF index of the repositories, in the same order.
+    :type index: recommender_system.TfidfIndex or incremental_index.IncrementalIndex
+    :param feature_weights: The weights of the hybrid feature blocks.
+    :type feature_weights: dict or None
+    :param backend: ann_index.EXACT_BACKEND to compare a repository with every other one, or ann_index.LSH_BACKEND
+                    to only compare it with the candidates of an LSH index of each feature matrix, which keeps
+                    queries fast for hundreds of thousands of repositories.
+    :type backend: str
+    :param lsh_parameters: The n_tables, n_bits, n_probes and seed of the LSH indexes.
+    :type lsh_parameters: dict or None
+    """
+
+    def __init__(self, repositories, index, feature_weights=None, backend=EXACT_BACKEND, lsh_parameters=None):
+        import numpy as np
+        from sklearn.preprocessing import normalize
+        from .recommender_system import hybrid_matrix
+
+        if backend not in RECOMMENDER_BACKENDS:
+            raise ValueError(f"Unknown recommender backend: {backend}")
+
+        # A hashed index has far more columns than terms. Dropping the empty ones does not change any similarity,
+        # but keeps the hyperplanes of the LSH indexes small.
+        matrix = index.matrix
+        columns = np.unique(matrix.indices)
+        if len(columns) < matrix.shape[1]:
+            matrix = matrix[:, columns]
+
+        self.repositories = repositories
+        self.index = index
+        self.matrices = {
+            'description': matrix,
+            'hybrid': normalize(hybrid_matrix(matrix, repositories, feature_weights), norm='l2'),
+        }
+        self.positions = {repo['full_name']: row for row, repo in enumerate(repositories)}
+        self.backend = backend
+        self.ann_indexes = {}
+        if backend == LSH_BACKEND:
+            self.ann_indexes = {features: LSHIndex(matrix, **(lsh_parameters or {}))
+                                for features, matrix in self.matrices.items()}
+        self._languages = {}
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, path=DEFAULT_CATALOG_PATH, feature_weights=None, backend=EXACT_BACKEND, lsh_parameters=None):
+        """
+        Loads a catalog saved with save_catalog.
+
+        :param path: The catalog directory.
+        :type path: str
+        :param feature_weights: The weights of the hybrid feature blocks.
+        :type feature_weights: dict or None
+        :param backend: The recommender backend, see RecommendationService.
+        :type backend: str
+        :param lsh_parameters: The parameters of the LSH indexes of the LSH backend.
+        :type lsh_parameters: dict or None
+
+        :return: The loaded service.
+        :rtype: RecommendationService
+
+        :raises ValueError: If the index and the repositories of the catalog do not match.
+        """
+        from .incremental_index import IncrementalIndex
+
+        with open(os.path.join(path, REPOSITORIES_FILE), encoding='utf-8') as f:
+            repositories = json.load(f)
+        index = IncrementalIndex.load(path)
+        if index.repo_ids != [repo['full_name'] for repo in repositories]:
+            raise ValueError("The index does not match the repositories of the catalog")
+        return cls(repositories, index, feature_weights, backend, lsh_parameters)
+
+    def language_mask(self, language):
+        """
+        Marks the repositories of a language, see recommender_system.language_mask.
+
+        :param language: The language, compared case-insensitively.
+        :type language: str
+
+        :return: A boolean array that is True for every repository of the language.
+        :rtype: numpy.ndarray
+        """
+        from .recommender_system import language_mask
+
+        language = language.lower()
+        mask = self._languages.get(language)
+        if mask is None:
+            mask = language_mask(self.repositories, language)
+            # Only the languages of the catalog are kept, so unknown languages cannot grow the cache
+            if mask.any():
+                self._languages[language] = mask
+        return mask
+
+    @timed('recommendation')
+    def recommend(self, full_name, k=DEFAULT_K, features='description', language=None):
+        """
+        Recommends repositories similar to a repository of the catalog.
+
+        :param full_name: The full name of the repository in the format 'owner/repo'.
+        :type full_name: str
+        :param k: The number of recommendations.
+        :type k: int
+        :param features: 'description' to compare descriptions only, or 'hybrid' to include language and stars.
+        :type features: str
+        :param language: Only recommend repositories of this language (case-insensitive). None recommends any.
+        :type language: str or None
+
+        :return: The recommended repositories with their 'score', most similar first. There are fewer than k if the
+                 language does not have enough other repositories.
+        :rtype: list of dict
+
+        :raises KeyError: If the repository is not in the catalog.
+        """
+        from .recommendation_table import top_k_rows
+
+        row = self.positions[full_name]
+        k = min(k, len(self.repositories) - 1)
+        if k < 1:
+            return []
+        allowed = self.language_mask(language) if language is not None else None
+        if self.backend == LSH_BACKEND:
+            ann_index = self.ann_indexes[features]
+            neighbours, scores = ann_index.query(ann_index.matrix[row], k, exclude=row, allowed=allowed)
+            return [dict(self.repositories[i], score=float(score)) for i, score in zip(neighbours, scores)]
+        neighbours, scores = top_k_rows(self.matrices[features], row, row + 1, k, allowed)
+        return [dict(self.repositories[i], score=float(score)) for i, score in zip(neighbours[0], scores[0])
+                if score != float('-inf')]
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache with a fixed number of entries.
+
+    :param max_entries: The maximum number of entries.
+    :type max_entries: int
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a cached value and marks it as recently used.
+
+        :param key: The key of the value.
+        :type key: hashable
+
+        :return: The cached value, or None if the key is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """
+        Caches a value, evicting the least recently used entry if the cache is full.
+
+        :param key: The key of the value.
+        :type key: hashable
+        :param value: The value to cache.
+
+        :return: None
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry.
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        :return: A dictionary with the number of hits, misses and entries and the hit ratio.
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+
+class RecommendationServer:
+    """
+    An asyncio HTTP/JSON server that answers recommendation queries from a catalog kept warm in memory.
+
+    Endpoints:
+
+    - GET /recommend?repo=owner/name&k=5&features=description|hybrid&language=go: the recommendations for a
+      repository, optionally only of one language.
+    - GET /health: the size and age of the loaded catalog and the result cache counters.
+    - GET /metrics: the stage timers, HTTP counters and result cache counters in the Prometheus text format.
+    - POST /reload: loads the catalog again, e.g. after a new crawl saved it with save_catalog.
+
+    A reload builds the new service in a worker thread while the old one keeps answering queries, then swaps them and
+    clears the result cache, so there is no downtime. A reload that fails keeps the old service.
+
+    :param path: The catalog directory.
+    :type path: str
+    :param cache_size: The number of recommendation results kept in the LRU cache.
+    :type cache_size: int
+    :param service: An already loaded service, instead of loading it from path.
+    :type service: RecommendationService or None
+    :param backend: The recommender backend of every loaded catalog, see RecommendationService.
+    :type backend: str
+    :param lsh_parameters: The parameters of the LSH indexes of the LSH backend.
+    :type lsh_parameters: dict or None
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, cache_size=DEFAULT_CACHE_SIZE, service=None, backend=EXACT_BACKEND,
+                 lsh_parameters=None):
+        self.path = path
+        self.backend = backend
+        self.lsh_parameters = lsh_parameters
+        self.service = service if service is not None else self.load()
+        self.cache = LRUCache(cache_size)
+        self._reload_lock = None
+
+    def load(self):
+        """
+        Loads the catalog with the backend of the server.
+
+        :return: The loaded service.
+        :rtype: RecommendationService
+        """
+        return RecommendationService.load(self.path, backend=self.backend, lsh_parameters=self.lsh_parameters)
+
+    async def reload(self):
+        """
+        Loads the catalog again and swaps it in once it is ready.
+
+        :return: The number of repositories of the new catalog.
+        :rtype: int
+        """
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            service = await asyncio.get_running_loop().run_in_executor(None, self.load)
+            self.service = service
+            self.cache.clear()
+        return len(service.repositories)
+
+    async def recommend(self, query):
+        """
+        Answers a /recommend query.
+
+        Recommendations that are not cached are computed in a worker thread, so a query over a large catalog does not
+        hold up the other connections.
+
+        :param query: The parsed query string.
+        :type query: dict
+
+        :return: The HTTP status and the JSON payload.
+        :rtype: tuple of (int, dict)
+        """
+        repo = query.get('repo', [''])[0]
+        features = query.get('features', ['description'])[0]
+        language = query.get('language', [None])[0]
+        try:
+            k = int(query.get('k', [DEFAULT_K])[0])
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': 'k must be an integer'}
+        if not 1 <= k <= MAX_K:
+            return HTTPStatus.BAD_REQUEST, {'error': f'k must be between 1 and {MAX_K}'}
+        if features not in ('description', 'hybrid'):
+            return HTTPStatus.BAD_REQUEST, {'error': "features must be 'description' or 'hybrid'"}
+
+        # The service is read once, so a concurrent reload cannot mix two catalogs in one answer
+        service = self.service
+        key = (id(service), repo, k, features, language and language.lower())
+        recommendations = self.cache.get(key)
+        if recommendations is None:
+            try:
+                recommendations = await asyncio.get_running_loop().run_in_executor(
+                    None, service.recommend, repo, k, features, language)
+            except KeyError:
+                return HTTPStatus.NOT_FOUND, {'error': f'Unknown repository: {repo}'}
+            self.cache.put(key, recommendations)
+        return HTTPStatus.OK, {'repo': repo, 'features': features, 'language': language,
+                               'recommendations': recommendations}
+
+    def metrics(self):
+        """
+        Renders the shared metrics of the package and the counters of the server in the Prometheus text format.
+
+        :return: The text of the /metrics endpoint.
+        :rtype: str
+        """
+        service = self.service
+        cache = self.cache.stats()
+        return get_metrics().prometheus({
+            'catalog_repositories': ('Number of repositories in the loaded catalog.', len(service.repositories)),
+            'catalog_loaded_timestamp_seconds': ('Unix time the catalog was loaded.', service.loaded_at),
+            'result_cache_hits': ('Number of recommendations answered from the result cache.', cache['hits']),
+            'result_cache_misses': ('Number of recommendations computed for the result cache.', cache['misses']),
+            'result_cache_hit_ratio': ('Share of recommendations answered from the result cache.', cache['hit_ratio']),
+        })
+
+    async def route(self, method, target):
+        """
+        Dispatches a request to its endpoint.
+
+        :param method: The HTTP method.
+        :type method: str
+        :param target: The request target, i.e. the path and query string.
+        :type target: str
+
+        :return: The HTTP status and the JSON payload, or the text of /metrics.
+        :rtype: tuple of (int, dict or str)
+        """
+        url = urlsplit(target)
+        if url.path == '/recommend' and method == 'GET':
+            return await self.recommend(parse_qs(url.query))
+        if url.path == '/health' and method == 'GET':
+            service = self.service
+            return HTTPStatus.OK, {'repositories': len(service.repositories), 'loaded_at': service.loaded_at,
+                                   'cache': self.cache.stats()}
+        if url.path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics()
+        if url.path == '/reload' and method == 'POST':
+            try:
+                return HTTPStatus.OK, {'repositories': await self.reload()}
+            except Exception as e:
+                # A missing, damaged or half-written catalog must not leave the client without an answer
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'Reload failed: {e}'}
+        if url.path in ('/recommend', '/health', '/metrics', '/reload'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f'{method} is not allowed'}
+        return HTTPStatus.NOT_FOUND, {'error': f'Unknown path: {url.path}'}
+
+    async def handle(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of one connection.
+
+        :param reader: The stream of the connection.
+        :type reader: asyncio.StreamReader
+        :param writer: The stream of the connection.
+        :type writer: asyncio.StreamWriter
+
+        :return: None
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    if len(line) > MAX_LINE:
+                        raise ValueError('Header line too long')
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # Request bodies are not used by any endpoint, but must be read to keep the connection usable
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                if len(parts) != 3 or len(request_line) > MAX_LINE:
+                    status, payload = HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'}
+                else:
+                    status, payload = await self.route(parts[0], parts[1])
+
+                keep_alive = len(parts) == 3 and parts[2] == 'HTTP/1.1' and headers.get('connection') != 'close'
+                if isinstance(payload, str):
+                    body, content_type = payload.encode(), PROMETHEUS_CONTENT_TYPE
+                else:
+                    body, content_type = json.dumps(payload).encode(), 'application/json'
+                writer.write(
+                    f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Length: {len(body)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Starts listening for connections.
+
+        :param host: The address to listen on.
+        :type host: str
+        :param port: The port to listen on. 0 picks a free port.
+        :type port: int
+
+        :return: The listening server.
+        :rtype: asyncio.Server
+        """
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE * 2)
+
+
+async def serve(path=DEFAULT_CATALOG_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=DEFAULT_CACHE_SIZE,
+                service=None, backend=EXACT_BACKEND, lsh_parameters=None):
+    """
+    Runs the recommendation server until it is cancelled. SIGHUP reloads the catalog, like POST /reload.
+
+    :param path: The catalog directory.
+    :type path: str
+    :param host: The address to listen on.
+    :type host: str
+    :param port: The port to listen on.
+    :type port: int
+    :param cache_size: The number of recommendation results kept in the LRU cache.
+    :type cache_size: int
+    :param service: An already loaded service, instead of loading it from path.
+    :type service: RecommendationService or None
+    :param backend: The recommender backend, see RecommendationService.
+    :type backend: str
+    :param lsh_parameters: The parameters of the LSH indexes of the LSH backend.
+    :type lsh_parameters: dict or None
+
+    :return: None
+    """
+    server = RecommendationServer(path, cache_size, service, backend, lsh_parameters)
+    listener = await server.start(host, port)
+    if hasattr(signal, 'SIGHUP'):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(server.reload()))
+
+    print(f"Serving {len(server.service.repositories)} repositories on http://{host}:{listener.sockets[0].getsockname()[1]}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GitHub Repository Recommender service')
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, type=str, help='Catalog directory saved by a crawl')
+    parser.add_argument('--host', default=DEFAULT_HOST, type=str, help='Address to listen on')
+    parser.add_argument('--port', default=DEFAULT_PORT, type=int, help='Port to listen on')
+    parser.add_argument('--cache-size', default=DEFAULT_CACHE_SIZE, type=int, help='Number of recommendation results to cache')
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.catalog, args.host, args.port, args.cache_size, backend=args.recommender,
+                          lsh_parameters=lsh_parameters(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .news_parser import NEWS_URL
+
+# Identifies snapshot files, and the version of their layout
+SNAPSHOT_FORMAT = 'github-recommender-snapshot'
+SNAPSHOT_VERSION = 1
+
+# Record types of a snapshot
+REPOSITORY_RECORD = 'repository'
+NEWS_RECORD = 'news'
+
+
+class SnapshotWriter:
+    """
+    Writes a crawl to a snapshot file, record by record.
+
+    A snapshot is one gzip-compressed file of JSON lines. The first line is a header with the format, its version and
+    any metadata of the crawl. Every other line is one record: a repository search result together with the text of
+    its README, or a news article. Records are written as they are produced, so a crawl is never held in memory as a
+    whole.
+
+    :param path: The path of the snapshot file. An existing file is replaced.
+    :type path: str
+    :param metadata: Information about the crawl stored in the header, e.g. the language and minimum stars.
+    :type metadata: dict or None
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self.repositories = 0
+        self.news = 0
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        header = {'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION, 'created_at': time.time()}
+        header.update(metadata or {})
+        self._write(header)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def write_repository(self, repo, readme):
+        """
+        Adds a repository and its README.
+
+        :param repo: A repository dictionary as returned by the GitHub search API.
+        :type repo: dict
+        :param readme: The content of the README, or an empty string if the repository has none.
+        :type readme: str
+
+        :return: None
+        """
+        self._write({'type': REPOSITORY_RECORD, 'repository': repo, 'readme': readme})
+        self.repositories += 1
+
+    def write_news(self, article):
+        """
+        Adds a news article.
+
+        :param article: A news article dictionary with 'date', 'title', 'link' and 'description'.
+        :type article: dict
+
+        :return: None
+        """
+        self._write({'type': NEWS_RECORD, 'article': article})
+        self.news += 1
+
+    def close(self):
+        """
+        Finishes the file.
+
+        :return: None
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header(path):
+    """
+    Reads the header of a snapshot file.
+
+    :param path: The path of the snapshot file.
+    :type path: str
+
+    :return: The header, with the 'format', 'version' and 'created_at' of the snapshot and the metadata of the crawl.
+    :rtype: dict
+
+    :raises ValueError: If the file is not a snapshot, or was written by a newer, unsupported version.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return _check_header(f.readline())
+
+
+def _check_header(line):
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError("Not a snapshot file")
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}, expected {SNAPSHOT_VERSION}")
+    return header
+
+
+def iter_records(path, record_type=None):
+    """
+    Streams the records of a snapshot file, decompressing and parsing one line at a time.
+
+    :param path: The path of the snapshot file.
+    :type path: str
+    :param record_type: REPOSITORY_RECORD or NEWS_RECORD to only read one type of records. None reads all of them.
+    :type record_type: str or None
+
+    :return: The records, in the order they were written.
+    :rtype: iterator of dict
+
+    :raises ValueError: If the file is not a snapshot, or was written by a newer, unsupported version.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        _check_header(f.readline())
+        for line in f:
+            record = json.loads(line)
+            if record_type is None or record['type'] == record_type:
+                yield record
+
+
+def iter_repositories(path):
+    """
+    Streams the repositories of a snapshot file with their READMEs.
+
+    :param path: The path of the snapshot file.
+    :type path: str
+
+    :return: The repository dictionaries and the content of their READMEs.
+    :rtype: iterator of tuple of (dict, str)
+    """
+    for record in iter_records(path, REPOSITORY_RECORD):
+        yield record['repository'], record['readme']
+
+
+def load_news(path):
+    """
+    Reads the news articles of a snapshot file.
+
+    :param path: The path of the snapshot file.
+    :type path: str
+
+    :return: The news article dictionaries, in the order of the crawl.
+    :rtype: list of dict
+    """
+    return [record['article'] for record in iter_records(path, NEWS_RECORD)]
+
+
+def load_repositories(path):
+    """
+    Scores and ranks the repositories of a snapshot file, without any network access.
+
+    Each README is scored as soon as it is read and then dropped, so only the repository dictionaries are kept in
+    memory.
+
+    :param path: The path of the snapshot file.
+    :type path: str
+
+    :return: The same result as data_acquisition.fetch_repositories for the crawl: the repositories with their
+             learning score, star score and weighted score, ranked by weighted score.
+    :rtype: list of dict
+    """
+    from .data_processing import rank_repositories, score_repository
+
+    repos = [score_repository(repo, readme) for repo, readme in iter_repositories(path)]
+    repos.sort(key=lambda x: x['stargazers_count'], reverse=True)
+    return rank_repositories(repos)
+
+
+def export_snapshot(path, language, min_stars, max_repos=None, max_workers=None, news_days=3, news_url=NEWS_URL):
+    """
+    Crawls GitHub and planetpython.org and writes everything the ranking and recommendations need to a snapshot.
+
+    :param path: The path of the snapshot file. An existing file is replaced.
+    :type path: str
+    :param language: The programming language to filter repositories by.
+    :type language: str
+    :param min_stars: The minimum number of stars a repository must have to be included in the results.
+    :type min_stars: int
+    :param max_repos: The number of repositories to fetch, as for data_acquisition.fetch_repositories.
+    :type max_repos: int or None
+    :param max_workers: The maximum number of READMEs fetched concurrently. None or 1 fetches them one at a time.
+    :type max_workers: int or None
+    :param news_days: The number of days of news stored.
+    :type news_days: int
+    :param news_url: The URL of the news page.
+    :type news_url: str
+
+    :return: The number of repositories and of news articles written.
+    :rtype: tuple of (int, int)
+
+    :raises http_client.GitHubAPIError: If the search request or any README request fails.
+    """
+    from .data_acquisition import fetch_readme_blob, search_pages
+    from .news_parser import fetch_news
+
+    pages = search_pages(language, min_stars, max_repos)
+    metadata = {'language': language, 'min_stars': min_stars, 'max_repos': max_repos}
+    with SnapshotWriter(path, metadata) as writer, ThreadPoolExecutor(max_workers=max_workers or 1) as executor:
+        for page in pages:
+            for repo, (readme, readme_sha) in zip(page, executor.map(fetch_readme_blob,
+                                                                     [repo['full_name'] for repo in page])):
+                repo['readme_sha'] = readme_sha
+                repo['readme_size'] = len(readme)
+                writer.write_repository(repo, readme)
+
+        day_articles, _ = fetch_news(days=news_days, url=news_url)
+        for article in day_articles:
+            writer.write_news(article)
+
+    return writer.repositories, writer.news
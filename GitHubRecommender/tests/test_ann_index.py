@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from GitHubRecommender.ann_index import LSHIndex, ann_recommendation, recall_at_k
+from GitHubRecommender.recommender_system import TfidfIndex, content_based_recommendation
+from GitHubRecommender.tests.test_recommender_system import make_repositories
+
+
+class TestLSHIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(400)
+        self.index = TfidfIndex.build(self.repositories)
+
+    def test_probing_every_bucket_is_exact(self):
+        # One bit probed on both sides puts every row into the candidates
+        ann = LSHIndex(self.index.matrix, n_tables=1, n_bits=1, n_probes=1)
+        self.assertEqual(recall_at_k(ann, k=10, sample=50)['recall'], 1.0)
+
+        rows, scores = ann.query(self.index.matrix[5], top_n=10, exclude=5)
+        exact = (self.index.matrix @ self.index.matrix[5].T).toarray().ravel()
+        exact[5] = -np.inf
+        np.testing.assert_allclose(scores, np.sort(exact)[::-1][:10])
+        self.assertNotIn(5, rows)
+
+    def test_more_tables_increase_recall(self):
+        few = recall_at_k(LSHIndex(self.index.matrix, n_tables=1, n_bits=8, n_probes=0), k=10, sample=100)
+        many = recall_at_k(LSHIndex(self.index.matrix, n_tables=16, n_bits=8, n_probes=2), k=10, sample=100)
+
+        self.assertLess(few['candidates'], many['candidates'])
+        self.assertLessEqual(few['recall'], many['recall'])
+        self.assertGreater(many['recall'], 0.9)
+        self.assertEqual(many['queries'], 100)
+
+    def test_same_interface_as_exact_recommendation(self):
+        ann = LSHIndex(self.index.matrix, n_tables=1, n_bits=1, n_probes=1)
+        recommended = ann_recommendation(self.repositories, 3, top_n=5, ann_index=ann)
+        exact = content_based_recommendation(self.repositories, 3, top_n=5, index=self.index)
+
+        self.assertEqual(len(recommended), 5)
+        self.assertNotIn(self.repositories[3], recommended)
+        # Ties may be ordered differently, but the similarities of the recommendations are the same
+        similarity = (self.index.matrix @ self.index.matrix[3].T).toarray().ravel()
+        scores = lambda repos: sorted(round(similarity[self.repositories.index(repo)], 12) for repo in repos)
+        self.assertEqual(scores(recommended), scores(exact))
+        self.assertEqual(len(ann_recommendation(self.repositories, 3, True, top_n=5, n_tables=4)), 5)
+
+    def test_allowed_rows(self):
+        ann = LSHIndex(self.index.matrix, n_tables=1, n_bits=1, n_probes=1)
+        allowed = np.zeros(len(self.repositories), dtype=bool)
+        allowed[::3] = True
+
+        rows, _ = ann.query(self.index.matrix[4], top_n=10, exclude=4, allowed=allowed)
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(allowed[rows].all())
+        go = ann_recommendation(self.repositories, 4, top_n=5, ann_index=ann, language='go')
+        self.assertEqual({repo['language'] for repo in go}, {'Go'})
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            LSHIndex(self.index.matrix, n_bits=64)
+        with self.assertRaises(ValueError):
+            LSHIndex(self.index.matrix, n_tables=0)
+        with self.assertRaises(ValueError):
+            LSHIndex(self.index.matrix).query(self.index.matrix[0], top_n=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+from GitHubRecommender.benchmark import STAGES, StandInServer, compare, main, make_repository, run_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_every_stage_is_timed(self):
+        results = run_benchmark(sizes=[20, 60], network_limit=40, workers=2, queries=3)
+
+        self.assertEqual([(result['stage'], result['repos']) for result in results['results']],
+                         [(stage, min(size, 40) if stage in ('search', 'readme_fetch', 'news') else size)
+                          for size in (20, 60) for stage in STAGES])
+        by_stage = {(result['stage'], result['repos']): result for result in results['results']}
+        self.assertEqual(by_stage['search', 40]['items'], 40)
+        self.assertEqual(by_stage['recommendation', 60]['items'], 3)
+        self.assertTrue(all(result['seconds'] >= 0 for result in results['results']))
+        self.assertEqual(results['parameters']['sizes'], [20, 60])
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            run_benchmark(sizes=[10], stages=['search', 'compile'])
+
+    def test_latency(self):
+        with StandInServer(corpus_size=5, latency=0.05) as server:
+            client = server.client()
+            response = client.get(f'{server.url}/repos/{make_repository(1)["full_name"]}/readme')
+            self.assertEqual(response.status_code, 200)
+            self.assertGreaterEqual(response.elapsed.total_seconds(), 0.05)
+            self.assertEqual(server.requests, 1)
+            client.close()
+
+    def test_regressions_against_a_baseline(self):
+        baseline = {'results': [{'stage': 'scoring', 'repos': 100, 'seconds': 1.0},
+                                {'stage': 'vectorization', 'repos': 100, 'seconds': 1.0}]}
+        results = {'results': [{'stage': 'scoring', 'repos': 100, 'seconds': 1.2},
+                               {'stage': 'vectorization', 'repos': 100, 'seconds': 1.5},
+                               {'stage': 'recommendation', 'repos': 100, 'seconds': 9.0}]}
+        regressions = compare(results, baseline, tolerance=0.25)
+        self.assertEqual([(regression['stage'], regression['ratio']) for regression in regressions],
+                         [('vectorization', 1.5)])
+
+    def test_command_line_writes_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            self.assertEqual(main(['--sizes', '10', '--stages', 'scoring', 'vectorization', '-o', output]), 0)
+            with open(output, encoding='utf-8') as f:
+                results = json.load(f)
+            self.assertEqual([result['stage'] for result in results['results']], ['scoring', 'vectorization'])
+
+            # A run is never slower than itself by more than the tolerance
+            self.assertEqual(main(['--sizes', '10', '--stages', 'scoring', '-o', output + '.new',
+                                   '--baseline', output, '--tolerance', '1000']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from GitHubRecommender.crawl_state import CrawlState
+
+
+class TestCrawlState(unittest.TestCase):
+
+    def setUp(self):
+        self.state = CrawlState(':memory:')
+        self.state.save([
+            {'full_name': 'user/same', 'pushed_at': '2023-01-01T00:00:00Z', 'updated_at': '2023-01-01T00:00:00Z',
+             'readme_sha': 'aaa', 'learning_score': 420},
+            {'full_name': 'user/pushed', 'pushed_at': '2023-01-01T00:00:00Z', 'updated_at': '2023-01-01T00:00:00Z',
+             'readme_sha': 'bbb', 'learning_score': 300},
+        ])
+
+    def tearDown(self):
+        self.state.close()
+
+    def test_only_changed_repositories_are_returned(self):
+        repos = [
+            {'full_name': 'user/same', 'pushed_at': '2023-01-01T00:00:00Z', 'updated_at': '2023-06-01T00:00:00Z'},
+            {'full_name': 'user/pushed', 'pushed_at': '2023-05-01T00:00:00Z', 'updated_at': '2023-05-01T00:00:00Z'},
+            {'full_name': 'user/new', 'pushed_at': '2023-05-01T00:00:00Z', 'updated_at': '2023-05-01T00:00:00Z'},
+        ]
+        changed = self.state.split_unchanged(repos)
+
+        self.assertEqual([repo['full_name'] for repo in changed], ['user/pushed', 'user/new'])
+        self.assertEqual(repos[0]['learning_score'], 420)
+        self.assertEqual(repos[0]['readme_sha'], 'aaa')
+        self.assertNotIn('learning_score', repos[1])
+        self.assertEqual(self.state.stats()['reused'], 1)
+        self.assertEqual(self.state.stats()['refetched'], 2)
+
+    def test_updated_at_is_used_without_pushed_at(self):
+        repos = [{'full_name': 'user/same', 'updated_at': '2023-01-01T00:00:00Z'}]
+        self.assertEqual(self.state.split_unchanged(repos), [])
+
+    def test_unchanged_readme_keeps_its_score(self):
+        self.assertEqual(self.state.stored_score('user/pushed', 'bbb'), 300)
+        self.assertIsNone(self.state.stored_score('user/pushed', 'ccc'))
+        self.assertIsNone(self.state.stored_score('user/new', 'ddd'))
+        self.assertEqual(self.state.stats()['rescored'], 2)
+
+    def test_save_replaces_previous_state(self):
+        self.state.save([{'full_name': 'user/same', 'pushed_at': '2024-01-01T00:00:00Z', 'readme_sha': 'eee',
+                          'learning_score': 10}])
+        record = self.state.lookup('user/same')
+        self.assertEqual(record.pushed_at, '2024-01-01T00:00:00Z')
+        self.assertEqual(record.learning_score, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
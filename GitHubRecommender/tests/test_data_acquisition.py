@@ -1,42 +1,66 @@
 import unittest
-from GitHubRecommender.data_acquisition import fetch_repositories, fetch_contributors_count, parse_repositories
+from GitHubRecommender.benchmark import StandInServer, make_readme
+from GitHubRecommender.data_acquisition import (fetch_latest_python_news, fetch_readme, fetch_repositories,
+                                                fetch_repositories_multi)
+from GitHubRecommender.data_processing import process_repositories
+from GitHubRecommender.http_client import set_client
+from GitHubRecommender.news_acquisition import fetch_latest_python_news as fetch_latest_posts
+
 
 class TestDataAcquisition(unittest.TestCase):
-    
+
+    def setUp(self):
+        # A local stand-in for GitHub and planetpython.org, so the tests never depend on the network
+        self.server = StandInServer(corpus_size=50)
+        set_client(self.server.client())
+
+    def tearDown(self):
+        set_client(None)
+        self.server.close()
+
     def test_fetch_repositories(self):
         """Test fetch_repositories function with valid inputs."""
         result = fetch_repositories('python', 100)
         self.assertIsInstance(result, list)  # Checks if the result is a list
-        self.assertGreater(len(result), 0)    # Checks if at least one repository is returned
-
-    def test_fetch_contributors_count(self):
-        """Test fetch_contributors_count function with a known repository."""
-        # Using a known repository URL for testing
-        test_url = 'https://api.github.com/repos/python/cpython'
-        result = fetch_contributors_count(test_url)
-        self.assertIsInstance(result, int)   # Checks if the result is an integer
-        self.assertGreater(result, 0)        # Checks if the contributors count is greater than 0
-
-    def test_parse_repositories(self):
-        """Test parse_repositories function with a sample data."""
-        sample_data = [
-            {
-                'name': 'sample_repo',
-                'stargazers_count': 150,
-                'language': 'Python',
-                'html_url': 'https://github.com/sample/sample_repo'
-            }
-        ]
-        result = parse_repositories(sample_data)
-        self.assertIsInstance(result, list)              # Checks if the result is a list
-        self.assertEqual(len(result), 1)                 # Checks if the list contains one item
-        self.assertEqual(result[0]['name'], 'sample_repo')  # Checks if the name is correctly parsed
+        self.assertEqual(len(result), 30)    # The first page of search results
+        scores = [repo['weighted_score'] for repo in result]
+        self.assertEqual(scores, sorted(scores, reverse=True))
 
-if __name__ == '__main__':
-    unittest.main()
+    def test_fetch_repositories_multi(self):
+        """Test that repositories found under several languages are fetched once and ranked together."""
+        result = fetch_repositories_multi(['python', 'Python', 'go'], 100, max_workers=4, max_repos=40)
+        # The stand-in answers every language with the same repositories: 3 x 1 search page and 40 READMEs
+        self.assertEqual(self.server.requests, 3 + 40)
+        self.assertEqual(len(result), 40)
+        self.assertEqual(result[0]['languages'], ['python', 'Python', 'go'])
+        self.assertEqual([repo['full_name'] for repo in result],
+                         [repo['full_name'] for repo in fetch_repositories('python', 100, max_repos=40)])
 
-    
-    
+        with self.assertRaises(ValueError):
+            fetch_repositories_multi([], 100)
 
+    def test_fetch_readme(self):
+        """Test fetch_readme function with a known repository."""
+        self.assertEqual(fetch_readme('owner3/repo3'), make_readme(3))
 
+    def test_process_fetched_repositories(self):
+        """Test process_repositories function with fetched data."""
+        result = process_repositories(fetch_repositories('python', 100, max_repos=40))
+        self.assertIsInstance(result, list)              # Checks if the result is a list
+        self.assertEqual(len(result), 40)
+        self.assertEqual(set(result[0]), {'full_name', 'name', 'description', 'language', 'stars', 'updated_at',
+                                          'url'})
+
+    def test_fetch_latest_python_news(self):
+        """Test both news fetchers against the same page."""
+        news_df = fetch_latest_python_news(url=self.server.news_url)
+        self.assertEqual(list(news_df.columns), ['date', 'title', 'link', 'description'])
+        self.assertEqual(news_df['date'].nunique(), 3)
+
+        posts = fetch_latest_posts(url=self.server.news_url)
+        self.assertEqual(len(posts), 10)
+        self.assertEqual(posts[0]['date'], 'October 28, 2023 01:00 PM UTC')
 
+
+if __name__ == '__main__':
+    unittest.main()
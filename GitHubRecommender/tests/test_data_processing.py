@@ -1,5 +1,55 @@
+import copy
+import random
+import re
 import unittest
-from GitHubRecommender.data_processing import clean_and_transform, process_repositories
+import numpy as np
+from GitHubRecommender.data_processing import (clean_and_transform, clean_and_transform_batch, clean_names,
+                                               evaluate_learning_friendliness, evaluate_learning_friendliness_batch,
+                                               process_repositories, process_repositories_batch)
+
+
+def reference_learning_friendliness(readme_data):
+    # The original, unoptimised implementation of evaluate_learning_friendliness
+    learning_score = 0
+    readme_length = len(readme_data)
+    if readme_length >= 900:
+        learning_score += readme_length // 10
+    num_requirements = readme_data.lower().count('requirement')
+    if num_requirements <= 3:
+        learning_score += 100
+    elif 3 < num_requirements <= 6:
+        learning_score += 50
+    elif 6 < num_requirements <= 10:
+        learning_score += 10
+    else:
+        learning_score -= 10
+    if 'no limits' in readme_data.lower():
+        learning_score += 100
+    learning_score += 10 * readme_data.count('?')
+    learning_score -= 10 * readme_data.upper().count('WARNING')
+    for section in ["getting started", "quick start", "tutorial", "examples"]:
+        if re.search(section, readme_data, re.IGNORECASE):
+            learning_score += 100
+    for keyword in ["forum", "faq", "discussion", "chat", "discord", "slack", "gitter"]:
+        if re.search(keyword, readme_data, re.IGNORECASE):
+            learning_score += 50
+    if re.search(r'\bvideo\b|\bdemo\b', readme_data, re.IGNORECASE):
+        learning_score += 100
+    if re.search(r'\bapi\b.*\bdocumentation\b|\bdocumentation\b.*\bapi\b', readme_data, re.IGNORECASE):
+        learning_score += 100
+    if re.search(r'\bcommon errors\b|\bfaq\b|\btroubleshooting\b', readme_data, re.IGNORECASE):
+        learning_score += 100
+    return learning_score
+
+
+README_FRAGMENTS = [
+    'Requirement', 'REQUIREMENTS', 'requirement', 'No Limits', 'no limits', '?', 'Warning', 'WARNING', 'warning',
+    'Getting Started', 'quick start', 'Tutorial', 'EXAMPLES', 'forum', 'FAQ', 'faq-like', 'Discussion', 'chat',
+    'Discord', 'slack', 'Gitter', 'video', 'videos', 'Demo', 'demonstration', 'API', 'api_key', 'Documentation',
+    'common errors', 'Troubleshooting', 'install', 'pip', 'the', 'a', '_', '-', '.', ' ', ' ', '\n', '\n\n',
+    '\u0130', '\u0131', '\u017f', '\u212a', '\u00df', '\ufb01', '\u00e9', '\U0001f680', 'warn\u0131ng',
+    'requ\u0130rement', 'troubles\u017footing', 'fa\u0071', '\u0130api', 'api\u0130',
+]
 
 class TestDataProcessing(unittest.TestCase):
 
@@ -52,6 +102,91 @@ class TestDataProcessing(unittest.TestCase):
         self.assertEqual(processed_data[0]['stars'], 100)
         self.assertEqual(processed_data[0]['updated_at'], '2023-01-01T00:00:00Z')
 
+class TestEvaluateLearningFriendliness(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.readmes = [''.join(rng.choice(README_FRAGMENTS) for _ in range(rng.randint(0, 400)))
+                        for _ in range(500)]
+        self.readmes += [
+            '',
+            'x' * 899,
+            'x' * 900,
+            'API reference\nfull documentation',
+            'API and documentation on one line',
+            'documentation then the api',
+            'requirement ' * 4,
+            'requirement ' * 7,
+            'requirement ' * 11,
+            'warn\u0131ng: use the \u0130API documentation',
+            'troubles\u017footing and the \u212aelvin sign',
+        ]
+
+    def test_parity_with_reference(self):
+        for readme in self.readmes:
+            self.assertEqual(evaluate_learning_friendliness(readme), reference_learning_friendliness(readme), readme)
+
+    def test_batch_parity(self):
+        scores = evaluate_learning_friendliness_batch(self.readmes)
+        self.assertIsInstance(scores, np.ndarray)
+        self.assertEqual(scores.tolist(), [reference_learning_friendliness(readme) for readme in self.readmes])
+
+    def test_batch_accepts_iterators(self):
+        scores = evaluate_learning_friendliness_batch(iter(self.readmes[:10]))
+        self.assertEqual(scores.tolist(), [evaluate_learning_friendliness(readme) for readme in self.readmes[:10]])
+
+    def test_batch_of_nothing(self):
+        self.assertEqual(evaluate_learning_friendliness_batch([]).shape, (0,))
+
+
+class TestBatchTransforms(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.repositories = []
+        for i in range(300):
+            name = ''.join(rng.choice('abcXYZ019-_.') for _ in range(rng.randint(1, 12)))
+            repo = {
+                'full_name': f'owner{i}/{name}',
+                'name': name,
+                'stargazers_count': rng.choice([0, 4999, 5000, 10000, 10001, rng.randint(0, 50000)]),
+                'url': f'https://github.com/owner{i}/{name}',
+                'html_url': f'https://github.com/owner{i}/{name}',
+                'description': f'Repository {i}',
+                'language': rng.choice(['Python', 'Rust', None]),
+                'updated_at': '2023-01-01T00:00:00Z',
+            }
+            for field in ('description', 'language', 'updated_at'):
+                if rng.random() < 0.1:
+                    del repo[field]
+            self.repositories.append(repo)
+
+    def test_clean_names(self):
+        names = ['Sample-Repo', 'a.b_c', '', 'Caf\u00e9-Bar', 'line\nbreak', '\u0130stanbul']
+        self.assertEqual(clean_names(names), [re.sub(r'\W+', '', name).lower() for name in names])
+        self.assertEqual(clean_names(['Sample-Repo', 'x.y']), ['samplerepo', 'xy'])
+        self.assertEqual(clean_names([]), [])
+
+    def test_clean_and_transform_parity(self):
+        expected = clean_and_transform(copy.deepcopy(self.repositories))
+        data = copy.deepcopy(self.repositories)
+        self.assertIs(clean_and_transform_batch(data), data)
+        self.assertEqual(data, expected)
+
+    def test_category_boundaries(self):
+        data = [{'name': 'r', 'stargazers_count': stars, 'url': 'https://github.com/o/r'}
+                for stars in (4999, 5000, 10000, 10001)]
+        categories = [item['category'] for item in clean_and_transform_batch(data)]
+        self.assertEqual(categories, ['Moderately Popular', 'Popular', 'Popular', 'Highly Popular'])
+
+    def test_process_repositories_parity(self):
+        expected = process_repositories(self.repositories)
+        store = process_repositories_batch(self.repositories)
+        self.assertEqual(len(store), len(expected))
+        for row, repo in zip(store, expected):
+            self.assertEqual({field: row[field] for field in repo}, repo)
+
+
 if __name__ == '__main__':
     unittest.main()
 
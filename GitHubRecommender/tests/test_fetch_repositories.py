@@ -0,0 +1,198 @@
+import base64
+import json
+import threading
+import time
+import unittest
+from contextlib import redirect_stderr
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from GitHubRecommender import data_acquisition as da
+from GitHubRecommender import fetch_repos
+from GitHubRecommender import main as main_module
+from GitHubRecommender.crawl_state import CrawlState
+from GitHubRecommender.http_client import GitHubAPIError, HTTPClient, RateLimitError, set_client
+
+
+def make_items(count):
+    return [
+        {
+            'full_name': f'user/repo{i}',
+            'name': f'repo{i}',
+            'stargazers_count': 1000 + (i * 7919) % 5000,
+            'pushed_at': '2023-01-01T00:00:00Z',
+            'updated_at': '2023-01-01T00:00:00Z',
+        }
+        for i in range(count)
+    ]
+
+
+def make_readme(i):
+    return 'Getting started? ' * (i * 13 % 40) + 'WARNING ' * (i % 3) + 'requirement ' * (i % 12)
+
+
+class GitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        status, payload, headers = 404, {'message': 'Not Found'}, {}
+
+        if self.path.startswith('/search/repositories'):
+            query = parse_qs(urlsplit(self.path).query)
+            items = self.server.items
+            if 'page' in query:
+                per_page, page = int(query['per_page'][0]), int(query['page'][0])
+                items = items[(page - 1) * per_page:page * per_page]
+            status, payload = 200, {'total_count': len(self.server.items), 'items': items}
+        elif self.path.endswith('/readme'):
+            i = int(self.path.split('/repos/user/repo')[1].split('/')[0])
+            time.sleep(self.server.delays.get(i, 0))
+            if i in self.server.rate_limited:
+                status, payload = 403, {'message': 'API rate limit exceeded'}
+                headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0'}
+            elif i not in self.server.missing:
+                content = base64.b64encode(make_readme(i).encode()).decode()
+                status, payload = 200, {'content': content, 'encoding': 'base64', 'sha': f'sha{i}'}
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFetchRepositories(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), GitHubHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.items = make_items(30)
+        self.server.missing = set()
+        self.server.rate_limited = set()
+        self.server.delays = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        set_client(HTTPClient(token='', api_url=self.base_url))
+
+    def tearDown(self):
+        set_client(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _search_pages(self):
+        return [int(parse_qs(urlsplit(path).query)['page'][0])
+                for path in self.server.requests if path.startswith('/search/repositories') and 'page=' in path]
+
+    def test_concurrent_ranking_matches_sequential(self):
+        sequential = da.fetch_repositories('python', 1000)
+        self.server.items = make_items(30)
+        concurrent = da.fetch_repositories('python', 1000, max_workers=8)
+
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([repo['weighted_score'] for repo in sequential],
+                         sorted((repo['weighted_score'] for repo in sequential), reverse=True))
+
+    def test_scores_do_not_depend_on_completion_order(self):
+        sequential = da.score_repositories(make_items(8))
+        # The first READMEs arrive last
+        self.server.delays = {i: 0.05 * (8 - i) for i in range(8)}
+        repos = make_items(8)
+        concurrent = da.score_repositories(repos, max_workers=8)
+
+        self.assertIs(concurrent, repos)
+        self.assertEqual(concurrent, sequential)
+
+    def test_invalid_worker_count(self):
+        with self.assertRaises(ValueError):
+            da.fetch_repositories('python', 1000, max_workers=0)
+        with self.assertRaises(ValueError):
+            da.score_repositories(make_items(2), max_workers=-1)
+        with mock.patch('sys.argv', ['main', '--workers', '0']), redirect_stderr(StringIO()), \
+                self.assertRaises(SystemExit):
+            main_module.main()
+        self.assertEqual(self.server.requests, [])
+
+    def test_missing_readme_scores_as_empty(self):
+        self.server.missing = {3}
+        repos = {repo['full_name']: repo for repo in da.fetch_repositories('python', 1000, max_workers=4)}
+        self.assertEqual(repos['user/repo3']['learning_score'], da.score_repository({'stargazers_count': 0}, '')['learning_score'])
+
+    def test_rate_limited_readme_is_not_scored(self):
+        self.server.rate_limited = {5}
+        with self.assertRaises(RateLimitError):
+            da.fetch_repositories('python', 1000, max_workers=4)
+
+    def test_failed_search_raises(self):
+        set_client(HTTPClient(token='', api_url=f'http://127.0.0.1:{self.server.server_port}/missing'))
+        with self.assertRaises(GitHubAPIError):
+            da.fetch_repositories('python', 1000)
+
+    def test_delta_crawl_only_fetches_changed_repositories(self):
+        state = CrawlState(':memory:')
+        full = da.fetch_repositories('python', 1000, max_workers=4, state=state)
+        self.assertEqual(len(self.server.requests), 31)
+
+        self.server.items = make_items(30)
+        self.server.items[4]['pushed_at'] = '2024-01-01T00:00:00Z'
+        delta = da.fetch_repositories('python', 1000, max_workers=4, state=state)
+
+        # One search request and the README of the only repository that was pushed to
+        self.assertEqual(self.server.requests[31:], ['/search/repositories?q=language:python&sort=stars&min_stars=1000',
+                                                     '/repos/user/repo4/readme'])
+        self.assertEqual([(repo['full_name'], repo['weighted_score']) for repo in delta],
+                         [(repo['full_name'], repo['weighted_score']) for repo in full])
+        self.assertEqual(state.stats(), {'reused': 29, 'refetched': 31, 'rescored': 30})
+        state.close()
+
+    def test_streamed_ranking_matches_single_page(self):
+        single = da.fetch_repositories('python', 1000, max_workers=4)
+        streamed = da.fetch_repositories('python', 1000, max_workers=4, max_repos=30)
+        self.assertEqual(streamed, single)
+
+    def test_streams_pages_up_to_max_repos(self):
+        self.server.items = make_items(250)
+        repos = da.fetch_repositories('python', 1000, max_workers=4, max_repos=230)
+
+        self.assertEqual(len(repos), 230)
+        self.assertEqual({repo['full_name'] for repo in repos}, {f'user/repo{i}' for i in range(230)})
+        self.assertEqual(self._search_pages(), [1, 2, 3])
+
+    def test_no_request_past_the_last_page(self):
+        self.server.items = make_items(200)
+        pages = list(fetch_repos.iter_search_pages(f'{self.base_url}/search/repositories?q=language:python'))
+
+        self.assertEqual([len(page) for page in pages], [100, 100])
+        self.assertEqual(self._search_pages(), [1, 2])
+
+    def test_next_page_is_prefetched(self):
+        self.server.items = make_items(250)
+        pages = fetch_repos.iter_search_pages(f'{self.base_url}/search/repositories?q=language:python')
+        next(pages)
+
+        # The second page is requested while the caller still holds the first one
+        deadline = time.monotonic() + 5
+        while self._search_pages() != [1, 2] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._search_pages(), [1, 2])
+        pages.close()
+
+    def test_github_repositories_keeps_pages_before_a_failure(self):
+        self.server.items = make_items(250)
+        repos = fetch_repos.fetch_github_repositories(max_repos=150)
+        self.assertEqual([repo['full_name'] for repo in repos], [f'user/repo{i}' for i in range(150)])
+
+        set_client(HTTPClient(token='', api_url=f'{self.base_url}/missing'))
+        self.assertEqual(fetch_repos.fetch_github_repositories(max_repos=150), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from GitHubRecommender.data_processing import evaluate_learning_friendliness
+from GitHubRecommender.graphql_acquisition import fetch_repositories_graphql, fetch_repository_batch
+from GitHubRecommender.http_client import GitHubAPIError, HTTPClient
+
+REPOSITORIES = {
+    'user/tutorial': {'stars': 1500, 'readme': ('README.md', 'Getting started tutorial. FAQ? ' * 40)},
+    'user/big': {'stars': 9000, 'readme': ('README.rst', 'WARNING: requirement ' * 20)},
+    'user/bare': {'stars': 3000, 'readme': None},
+}
+README_PATHS = ['README.md', 'README.rst', 'README.txt', 'README', 'readme.md', 'Readme.md']
+
+
+def repository_node(full_name):
+    repo = REPOSITORIES[full_name]
+    node = {
+        'nameWithOwner': full_name,
+        'name': full_name.split('/')[1],
+        'description': f'The {full_name} repository',
+        'url': f'https://github.com/{full_name}',
+        'stargazerCount': repo['stars'],
+        'updatedAt': '2023-01-01T00:00:00Z',
+        'pushedAt': '2023-01-01T00:00:00Z',
+        'primaryLanguage': {'name': 'Python'},
+        'defaultBranchRef': {'name': 'develop'},
+        'issues': {'totalCount': 7},
+    }
+    for i, path in enumerate(README_PATHS):
+        readme = repo['readme']
+        node[f'readme{i}'] = {'text': readme[1], 'oid': f'sha-{full_name}'} if readme and readme[0] == path else None
+    return node
+
+
+class GraphQLHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.queries.append(request)
+        variables = request['variables']
+
+        if 'search(' in request['query']:
+            nodes = [repository_node(name) for name in REPOSITORIES][:variables['first']]
+            payload = {'data': {'search': {'repositoryCount': len(nodes), 'nodes': nodes,
+                                           'pageInfo': {'hasNextPage': False, 'endCursor': None}}}}
+        else:
+            data, errors = {}, []
+            for key in [key for key in variables if key.startswith('owner')]:
+                i = key[len('owner'):]
+                full_name = f"{variables[key]}/{variables['name' + i]}"
+                if full_name in REPOSITORIES:
+                    data[f'repo{i}'] = repository_node(full_name)
+                else:
+                    data[f'repo{i}'] = None
+                    errors.append({'type': 'NOT_FOUND', 'message': f'Could not resolve {full_name}'})
+            payload = {'data': data, 'errors': errors} if errors else {'data': data}
+
+        if 'fail' in variables.values():
+            payload = {'data': None, 'errors': [{'type': 'INTERNAL', 'message': 'Something went wrong'}]}
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestGraphQLAcquisition(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), GraphQLHandler)
+        self.server.daemon_threads = True
+        self.server.queries = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = HTTPClient(token='secret', api_url=f'http://127.0.0.1:{self.server.server_port}')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batch_fetches_all_repositories_in_one_query(self):
+        repos = fetch_repository_batch(['user/big', 'user/missing', 'user/tutorial'], client=self.client)
+
+        self.assertEqual(len(self.server.queries), 1)
+        self.assertEqual([repo['full_name'] for repo in repos], ['user/big', 'user/tutorial'])
+        self.assertEqual(repos[0]['default_branch'], 'develop')
+        self.assertEqual(repos[0]['open_issues_count'], 7)
+        self.assertEqual(repos[0]['readme'], REPOSITORIES['user/big']['readme'][1])
+        self.assertEqual(repos[0]['stargazers_count'], 9000)
+        self.assertEqual(repos[0]['html_url'], 'https://github.com/user/big')
+
+    def test_batches_are_split(self):
+        fetch_repository_batch(list(REPOSITORIES), batch_size=2, client=self.client)
+        self.assertEqual(len(self.server.queries), 2)
+
+    def test_ranking_matches_rest_scoring(self):
+        repos = fetch_repositories_graphql('python', 1000, client=self.client)
+
+        expected = {}
+        for full_name, repo in REPOSITORIES.items():
+            readme = repo['readme'][1] if repo['readme'] else ''
+            expected[full_name] = round(repo['stars'] * 0.35 + evaluate_learning_friendliness(readme) * 0.65, 2)
+
+        self.assertEqual({repo['full_name']: repo['weighted_score'] for repo in repos}, expected)
+        self.assertEqual([repo['full_name'] for repo in repos],
+                         sorted(expected, key=expected.get, reverse=True))
+        self.assertEqual(len(self.server.queries), 1)
+
+    def test_errors_are_raised(self):
+        with self.assertRaises(GitHubAPIError):
+            fetch_repository_batch(['fail/fail'], client=self.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
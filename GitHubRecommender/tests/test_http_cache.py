@@ -0,0 +1,130 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from GitHubRecommender.http_cache import ResponseCache
+from GitHubRecommender.http_client import HTTPClient
+from GitHubRecommender.metrics import Metrics
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        etag = f'"{self.server.version}"'
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('X-RateLimit-Remaining', '4999')
+            self.end_headers()
+            return
+        body = f'{{"path": "{self.path}", "version": {self.server.version}}}'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ETagHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.version = 1
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.cache = ResponseCache(':memory:')
+        self.client = HTTPClient(token='', api_url=self.base_url, cache=self.cache)
+
+    def tearDown(self):
+        self.client.close()
+        self.cache.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_not_modified_is_served_from_cache(self):
+        url = f'{self.base_url}/repos/user/repo/readme'
+        first = self.client.get(url)
+        second = self.client.get(url)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.headers['X-RateLimit-Remaining'], '4999')
+        self.assertEqual(self.server.requests[1]['If-None-Match'], '"1"')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_cache_lookups_are_counted_in_the_metrics(self):
+        metrics = Metrics()
+        client = HTTPClient(token='', api_url=self.base_url, cache=self.cache, metrics=metrics)
+        url = f'{self.base_url}/repos/user/repo/readme'
+        for _ in range(3):
+            client.get(url)
+        client.close()
+
+        report = metrics.report()
+        self.assertEqual((report['cache']['hits'], report['cache']['misses']), (2, 1))
+        self.assertEqual(report['http']['status_codes'], {'200': 1, '304': 2})
+        self.assertEqual(report['http']['targets']['core']['bytes'], len(self.client.get(url).content))
+
+    def test_streamed_responses_are_not_buffered(self):
+        url = f'{self.base_url}/repos/user/repo/readme'
+        response = self.client.get(url, stream=True)
+
+        # requests marks a body that was never read with _content = False
+        self.assertIs(response._content, False)
+        self.assertIn(b'"version": 1', b''.join(response.iter_content(16)))
+        self.assertIsNone(self.cache.lookup(url))
+        self.assertEqual(self.cache.stats()['misses'], 0)
+
+        # Pages of other hosts, e.g. the news, are not cached either
+        other = HTTPClient(token='', api_url='http://127.0.0.1:1', cache=self.cache)
+        other.get(url)
+        other.close()
+        self.assertIsNone(self.cache.lookup(url))
+
+    def test_uncacheable_responses_are_not_read(self):
+        class UnreadResponse:
+            status_code = 200
+            headers = {}
+
+            @property
+            def content(self):
+                raise AssertionError("the body was read")
+
+        self.assertFalse(self.cache.store('http://example.com/', UnreadResponse()))
+        UnreadResponse.headers = {'ETag': '"1"', 'Content-Length': str(self.cache.max_bytes + 1)}
+        self.assertFalse(self.cache.store('http://example.com/', UnreadResponse()))
+
+    def test_changed_resource_is_downloaded_again(self):
+        url = f'{self.base_url}/repos/user/repo'
+        self.client.get(url)
+        self.server.version = 2
+        response = self.client.get(url)
+
+        self.assertEqual(response.json()['version'], 2)
+        self.assertFalse(getattr(response, 'from_cache', False))
+        self.assertEqual(self.cache.lookup(url).etag, '"2"')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        first_url = f'{self.base_url}/repos/user/first'
+        first_size = len(self.client.get(first_url).content)
+        self.cache.max_bytes = first_size * 2
+
+        self.client.get(f'{self.base_url}/repos/user/secnd')
+        self.client.get(f'{self.base_url}/repos/user/third')
+
+        self.assertIsNone(self.cache.lookup(first_url))
+        self.assertLessEqual(self.cache.stats()['bytes'], self.cache.max_bytes)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import requests
+from GitHubRecommender.http_client import (HTTPClient, RateLimitError, RateLimitScheduler, check_response,
+                                          content_length)
+from GitHubRecommender.metrics import Metrics
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers), self.client_address[1]))
+        if self.server.rate_limited > 0:
+            self.server.rate_limited -= 1
+            body = b'{"message": "You have exceeded a secondary rate limit."}'
+            self.send_response(403)
+            self.send_header('Retry-After', '7')
+        else:
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('X-RateLimit-Limit', '5000')
+            self.send_header('X-RateLimit-Remaining', '4321')
+            self.send_header('X-RateLimit-Reset', '2000000000')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.rate_limited = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_github_requests_are_authenticated(self):
+        client = HTTPClient(token='secret', api_url=self.base_url)
+        response = client.get(f'{self.base_url}/repos/user/repo/readme')
+        self.assertEqual(response.status_code, 200)
+
+        path, headers, _ = self.server.requests[0]
+        self.assertEqual(path, '/repos/user/repo/readme')
+        self.assertEqual(headers['Authorization'], 'token secret')
+        self.assertEqual(headers['Accept'], 'application/vnd.github.v3+json')
+        client.close()
+
+    def test_token_not_sent_to_other_hosts(self):
+        client = HTTPClient(token='secret', api_url='https://api.github.com')
+        client.get(f'{self.base_url}/news')
+
+        _, headers, _ = self.server.requests[0]
+        self.assertNotIn('Authorization', headers)
+        client.close()
+
+    def test_response_sizes_are_counted(self):
+        metrics = Metrics()
+        client = HTTPClient(token='', api_url=self.base_url, metrics=metrics)
+        client.get(f'{self.base_url}/repos/user/repo')
+        self.assertEqual(metrics.report()['http']['bytes'], len(b'{"ok": true}'))
+
+        # A streamed body is not read to count it
+        response = client.get(f'{self.base_url}/repos/user/repo', stream=True)
+        self.assertIs(response._content, False)
+        self.assertEqual(metrics.report()['http']['bytes'], 2 * len(b'{"ok": true}'))
+        response.close()
+        client.close()
+
+    def test_malformed_content_length(self):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Length'] = 'twelve'
+        self.assertEqual(content_length(response), 0)
+
+        metrics = Metrics()
+        client = HTTPClient(token='', api_url=self.base_url, metrics=metrics)
+        with mock.patch.object(client.session, 'request', return_value=response):
+            self.assertIs(client.get(f'{self.base_url}/repos/user/repo', stream=True), response)
+        self.assertEqual(metrics.report()['http']['requests'], 1)
+        self.assertEqual(metrics.report()['http']['bytes'], 0)
+        client.close()
+
+    def test_connections_are_reused(self):
+        client = HTTPClient(token='', api_url=self.base_url)
+        for i in range(5):
+            client.get(f'{self.base_url}/repos/user/repo{i}')
+
+        # Every request should have arrived over the same keep-alive connection
+        client_ports = {port for _, _, port in self.server.requests}
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(client_ports), 1)
+        client.close()
+
+    def fake_scheduler(self):
+        # A scheduler whose clock only moves forward when it sleeps
+        self.now = 1000.0
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        return RateLimitScheduler(clock=lambda: self.now, sleep=sleep)
+
+    def test_rate_limited_request_is_retried_after_waiting(self):
+        scheduler = self.fake_scheduler()
+        client = HTTPClient(token='', api_url=self.base_url, scheduler=scheduler)
+        self.server.rate_limited = 1
+
+        response = client.get(f'{self.base_url}/repos/user/repo')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(sum(self.sleeps), 7)
+
+        core = scheduler.stats()['resources']['core']
+        self.assertEqual(core['limit'], 5000)
+        self.assertEqual(core['remaining'], 4321)
+        client.close()
+
+    def test_rate_limit_error_after_retries(self):
+        client = HTTPClient(token='', api_url=self.base_url, scheduler=self.fake_scheduler(), rate_limit_retries=1)
+        self.server.rate_limited = 5
+
+        response = client.get(f'{self.base_url}/search/repositories?q=language:python')
+        self.assertEqual(len(self.server.requests), 2)
+        with self.assertRaises(RateLimitError):
+            check_response(response)
+        client.close()
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.scheduler = RateLimitScheduler(limits={'core': (3, 60), 'search': (1, 60)},
+                                            clock=lambda: self.now, sleep=self.sleep)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def test_requests_within_budget_do_not_wait(self):
+        for _ in range(3):
+            self.assertEqual(self.scheduler.acquire('core'), 0.0)
+        self.assertEqual(self.sleeps, [])
+
+    def test_exhausted_budget_waits_for_reset(self):
+        for _ in range(3):
+            self.scheduler.acquire('core')
+        waited = self.scheduler.acquire('core')
+        self.assertEqual(waited, 60)
+        self.assertEqual(self.scheduler.stats()['waits'], 1)
+
+    def test_search_and_core_have_separate_budgets(self):
+        self.scheduler.acquire('search')
+        self.assertEqual(self.scheduler.acquire('core'), 0.0)
+        self.assertEqual(self.scheduler.resource_for('/search/repositories?q=x'), 'search')
+        self.assertEqual(self.scheduler.resource_for('/repos/user/repo/readme'), 'core')
+
+    def test_in_flight_requests_are_subtracted_from_reported_budget(self):
+        self.scheduler.acquire('core')
+        self.scheduler.acquire('core')
+
+        class Response:
+            status_code = 200
+            headers = {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': '1060', 'X-RateLimit-Limit': '100'}
+            text = ''
+
+        self.scheduler.update('core', Response())
+        self.assertEqual(self.scheduler.stats()['resources']['core']['remaining'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from GitHubRecommender.incremental_index import IncrementalIndex
+from GitHubRecommender.recommender_system import TfidfIndex
+from GitHubRecommender.tests.test_recommender_system import make_repositories
+
+
+def similarities(matrix):
+    return (matrix @ matrix.T).toarray()
+
+
+class TestIncrementalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(100)
+        self.index = IncrementalIndex()
+        self.assertEqual(self.index.apply(self.repositories), 100)
+
+    def test_matches_fitted_tfidf(self):
+        np.testing.assert_allclose(similarities(self.index.matrix),
+                                   similarities(TfidfIndex.build(self.repositories).matrix), atol=1e-12)
+
+    def test_updates_match_a_refit(self):
+        self.index.remove('user/repo3')
+        self.index.update(dict(self.repositories[10], description='A brand new gizmo for async data'))
+        self.index.add({'full_name': 'user/new', 'description': 'Gizmo tutorial'})
+
+        corpus = [repo for repo in self.repositories if repo['full_name'] != 'user/repo3']
+        corpus[9] = dict(corpus[9], description='A brand new gizmo for async data')
+        corpus.append({'full_name': 'user/new', 'description': 'Gizmo tutorial'})
+
+        self.assertEqual(self.index.repo_ids, [repo['full_name'] for repo in corpus])
+        np.testing.assert_allclose(similarities(self.index.matrix), similarities(TfidfIndex.build(corpus).matrix),
+                                   atol=1e-12)
+        self.assertEqual(self.index.recommend('user/new', 1)[0]['full_name'], 'user/repo10')
+
+    def test_unchanged_description_is_not_reweighted(self):
+        matrix = self.index.matrix
+        self.assertEqual(self.index.apply([dict(repo, stargazers_count=1) for repo in self.repositories]), 0)
+        self.assertIs(self.index.matrix, matrix)
+
+    def test_failed_add_changes_nothing(self):
+        matrix = self.index.matrix
+        with mock.patch.object(self.index, '_term_counts', side_effect=MemoryError):
+            with self.assertRaises(MemoryError):
+                self.index.add({'full_name': 'user/new', 'description': 'Gizmo tutorial'})
+            with self.assertRaises(MemoryError):
+                self.index.update(dict(self.repositories[10], description='Gizmo tutorial'))
+
+        self.assertNotIn('user/new', self.index)
+        self.assertEqual(self.index.repo_ids, [repo['full_name'] for repo in self.repositories])
+        self.assertIs(self.index.matrix, matrix)
+        self.assertEqual(self.index.position('user/repo10'), 10)
+        self.assertNotIn(self.repositories[10], self.index.recommend('user/repo10', 99))
+
+    def test_saved_index_is_patched_without_refitting(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.index.save(directory)
+            loaded = IncrementalIndex.load(directory)
+
+        self.assertEqual(loaded.repo_ids, self.index.repo_ids)
+        np.testing.assert_array_equal(loaded.document_frequency, self.index.document_frequency)
+        np.testing.assert_allclose(similarities(loaded.matrix), similarities(self.index.matrix), atol=1e-12)
+
+        # Only the changed description is tokenized again
+        crawl = [dict(repo, stargazers_count=1) for repo in self.repositories[:90]]
+        crawl[5] = dict(crawl[5], description='A brand new gizmo for async data')
+        with mock.patch.object(loaded, '_term_counts', wraps=loaded._term_counts) as term_counts:
+            self.assertEqual(loaded.apply(crawl, remove_missing=True), 11)
+        self.assertEqual(term_counts.call_count, 1)
+        self.assertEqual(loaded.recommend('user/repo1', 1)[0]['stargazers_count'], 1)
+        np.testing.assert_allclose(similarities(loaded.matrix), similarities(TfidfIndex.build(crawl).matrix),
+                                   atol=1e-12)
+
+    def test_remove_missing(self):
+        self.assertEqual(self.index.apply(self.repositories[:60], remove_missing=True), 40)
+        self.assertEqual(len(self.index), 60)
+        self.assertNotIn('user/repo70', self.index)
+        self.assertEqual(int(self.index.document_frequency.sum()), self.index.matrix.nnz)
+        with self.assertRaises(KeyError):
+            self.index.remove('user/repo70')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import re
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from GitHubRecommender.http_client import GitHubAPIError, HTTPClient, set_client
+from GitHubRecommender.issue_stats import (ISSUES_PAGE_SIZE, add_issue_stats, count_labelled_issues,
+                                           search_labelled_issues)
+from GitHubRecommender.repo_catalog import RepositoryCatalog
+
+# Number of open issues and pull requests of every label of every test repository
+LABELLED = {
+    'user/busy': {'good first issue': (250, 30), 'help wanted': (100, 0)},
+    'user/quiet': {'good first issue': (3, 1), 'help wanted': (0, 0)},
+}
+
+
+class IssuesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        url = urlsplit(self.path)
+        full_name = url.path[len('/repos/'):-len('/issues')]
+        query = parse_qs(url.query)
+        status, payload = 404, {'message': 'Not Found'}
+
+        if url.path == '/search/issues':
+            match = re.fullmatch(r'repo:(\S+) label:"([^"]+)" is:issue is:open', query['q'][0])
+            if match and match.group(1) in LABELLED:
+                status, payload = 200, {'total_count': LABELLED[match.group(1)][match.group(2)][0], 'items': []}
+            else:
+                status, payload = 422, {'message': 'Validation Failed'}
+        elif full_name == 'user/disabled':
+            status, payload = 410, {'message': 'Issues are disabled for this repository'}
+        elif full_name == 'user/broken':
+            status, payload = 500, {'message': 'Server Error'}
+        elif full_name in LABELLED and query['state'] == ['open']:
+            issues, pulls = LABELLED[full_name][query['labels'][0]]
+            listing = [{'number': i} for i in range(issues)] + [{'number': i, 'pull_request': {}} for i in range(pulls)]
+            per_page, page = int(query['per_page'][0]), int(query['page'][0])
+            status, payload = 200, listing[(page - 1) * per_page:page * per_page]
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestIssueStats(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), IssuesHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        set_client(HTTPClient(token='', api_url=f'http://127.0.0.1:{self.server.server_port}'))
+
+    def tearDown(self):
+        set_client(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_counts_issues_without_pull_requests(self):
+        self.assertEqual(count_labelled_issues('user/quiet', 'good first issue'), 3)
+        self.assertEqual(count_labelled_issues('user/busy', 'good first issue'), 250)
+
+    def test_stops_at_the_first_page_that_is_not_full(self):
+        count_labelled_issues('user/busy', 'good first issue')
+        # 280 issues and pull requests fit into three pages
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertIn(f'per_page={ISSUES_PAGE_SIZE}', self.server.requests[0])
+        self.assertIn('labels=good%20first%20issue', self.server.requests[0])
+
+    def test_counts_past_the_page_limit_are_searched(self):
+        # Two full pages are only a lower bound, so the exact count comes from the search API
+        self.assertEqual(count_labelled_issues('user/busy', 'good first issue', max_pages=2), 250)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertTrue(self.server.requests[2].startswith('/search/issues?q=repo%3Auser/busy'))
+        self.assertIn('per_page=1', self.server.requests[2])
+
+        self.assertEqual(search_labelled_issues('user/quiet', 'good first issue'), 3)
+        with self.assertRaises(GitHubAPIError):
+            search_labelled_issues('user/missing', 'help wanted')
+
+    def test_disabled_issues(self):
+        self.assertEqual(count_labelled_issues('user/disabled', 'help wanted'), 0)
+
+    def test_failures_are_raised(self):
+        with self.assertRaises(GitHubAPIError):
+            count_labelled_issues('user/broken', 'help wanted')
+
+    def test_concurrent_stats(self):
+        repos = [{'full_name': name} for name in ('user/busy', 'user/quiet', 'user/disabled')]
+        self.assertIs(add_issue_stats(repos, max_workers=3), repos)
+        self.assertEqual([(repo['good_first_issues'], repo['help_wanted_issues']) for repo in repos],
+                         [(250, 100), (3, 0), (0, 0)])
+
+        sequential = add_issue_stats([{'full_name': repo['full_name']} for repo in repos])
+        self.assertEqual(sequential, repos)
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            add_issue_stats([], max_workers=0)
+
+    def test_stats_are_stored_with_the_scores(self):
+        repo = {'full_name': 'user/quiet', 'name': 'quiet', 'stargazers_count': 1000, 'open_issues_count': 7,
+                'learning_score': 100, 'star_score': 350.0, 'weighted_score': 415.0}
+        catalog = RepositoryCatalog(':memory:')
+        catalog.save(add_issue_stats([repo]))
+
+        # A later crawl without issue statistics keeps the stored counts
+        del repo['good_first_issues'], repo['help_wanted_issues']
+        repo['open_issues_count'] = 8
+        catalog.save([repo])
+
+        stored = catalog.lookup('user/quiet')
+        self.assertEqual((stored['open_issues_count'], stored['good_first_issues'], stored['help_wanted_issues']), (8, 3, 0))
+        self.assertEqual(len(catalog.ranking(min_good_first_issues=3)), 1)
+        self.assertEqual(catalog.ranking(min_good_first_issues=4), [])
+        catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
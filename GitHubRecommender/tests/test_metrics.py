@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import unittest
+from GitHubRecommender.benchmark import StandInServer
+from GitHubRecommender.data_acquisition import fetch_repositories
+from GitHubRecommender.data_processing import evaluate_learning_friendliness
+from GitHubRecommender.http_client import set_client
+from GitHubRecommender.metrics import Metrics, get_metrics, timed
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_stages(self):
+        clock = FakeClock()
+        metrics = Metrics(clock=clock)
+        with metrics.stage('scoring', items=10):
+            clock.now += 2.0
+        with metrics.stage('scoring') as timer:
+            clock.now += 0.5
+            timer.items = 30
+
+        self.assertEqual(metrics.report()['stages'],
+                         {'scoring': {'calls': 2, 'seconds': 2.5, 'items': 40, 'items_per_second': 16.0}})
+
+    def test_failed_runs_are_timed(self):
+        metrics = Metrics()
+        with self.assertRaises(KeyError):
+            with metrics.stage('lookup'):
+                raise KeyError('missing')
+        self.assertEqual(metrics.report()['stages']['lookup']['calls'], 1)
+
+    def test_http_and_cache(self):
+        metrics = Metrics()
+        metrics.record_request('core', 200, 1000, 0.25)
+        metrics.record_request('core', 404, 50, 0.25)
+        metrics.record_request('planetpython.org', 200, 5000, 1.0)
+        metrics.record_rate_limit_wait(3.0)
+        metrics.record_cache(True)
+        metrics.record_cache(True)
+        metrics.record_cache(False)
+
+        report = metrics.report()
+        self.assertEqual(report['http']['requests'], 3)
+        self.assertEqual(report['http']['bytes'], 6050)
+        self.assertEqual(report['http']['seconds'], 1.5)
+        self.assertEqual(report['http']['rate_limit_wait'], 3.0)
+        self.assertEqual(report['http']['status_codes'], {'200': 2, '404': 1})
+        self.assertEqual(report['http']['targets']['core'], {'requests': 2, 'bytes': 1050, 'seconds': 0.5})
+        self.assertAlmostEqual(report['cache']['hit_ratio'], 2 / 3)
+        json.dumps(report)
+
+        metrics.reset()
+        self.assertEqual(metrics.report()['http']['requests'], 0)
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.record_stage('readme_fetch', 1.5, items=3)
+        metrics.record_request('search', 200, 100, 0.1)
+        metrics.record_request('host"with\\quotes', 503, 0, 0.1)
+
+        lines = metrics.prometheus({'catalog_repositories': ('Number of repositories.', 42)}).splitlines()
+        self.assertIn('# TYPE github_recommender_stage_seconds_total counter', lines)
+        self.assertIn('github_recommender_stage_seconds_total{stage="readme_fetch"} 1.5', lines)
+        self.assertIn('github_recommender_stage_items_total{stage="readme_fetch"} 3', lines)
+        self.assertIn('github_recommender_http_responses_total{code="503"} 1', lines)
+        self.assertIn('github_recommender_http_requests_total{target="host\\"with\\\\quotes"} 1', lines)
+        self.assertIn('# TYPE github_recommender_catalog_repositories gauge', lines)
+        self.assertIn('github_recommender_catalog_repositories 42', lines)
+
+    def test_timed(self):
+        @timed('test_timed', count=len)
+        def split(text):
+            return text.split()
+
+        get_metrics().reset()
+        self.assertEqual(split('a b c'), ['a', 'b', 'c'])
+        self.assertEqual(split.__name__, 'split')
+        evaluate_learning_friendliness('# Title')
+
+        stages = get_metrics().report()['stages']
+        self.assertEqual((stages['test_timed']['calls'], stages['test_timed']['items']), (1, 3))
+        self.assertEqual(stages['learning_score']['calls'], 1)
+
+    def test_report_file(self):
+        metrics = Metrics()
+        metrics.record_stage('ranking', 0.1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            metrics.write_report(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['stages']['ranking']['calls'], 1)
+
+
+class TestCrawlMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer(corpus_size=150)
+        get_metrics().reset()
+
+    def tearDown(self):
+        set_client(None)
+        self.server.close()
+
+    def test_crawl_is_instrumented(self):
+        set_client(self.server.client())
+        fetch_repositories('python', 100, max_workers=4, max_repos=120)
+
+        report = get_metrics().report()
+        # Both pages of search results are counted, including the 30 results past max_repos
+        self.assertEqual(report['stages']['search']['items'], 150)
+        self.assertEqual(report['stages']['readme_fetch']['calls'], 120)
+        self.assertEqual(report['stages']['learning_score']['calls'], 120)
+        self.assertEqual(report['stages']['ranking']['items'], 120)
+        self.assertEqual(report['http']['requests'], self.server.requests)
+        self.assertEqual(report['http']['status_codes'], {'200': self.server.requests})
+        self.assertEqual(set(report['http']['targets']), {'core', 'search'})
+        self.assertGreater(report['http']['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
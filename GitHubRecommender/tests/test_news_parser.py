@@ -0,0 +1,72 @@
+import os
+import unittest
+from GitHubRecommender.news_parser import NEWS_CHUNK_SIZE, _soup_news, benchmark, parse_news
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'planetpython.html')
+
+
+class TestNewsParser(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE, encoding='utf-8') as f:
+            cls.html = f.read()
+
+    def test_parity_with_beautifulsoup(self):
+        for days, posts in [(3, 0), (0, 10), (1, 1), (10, 100)]:
+            self.assertEqual(parse_news(self.html, days, posts), _soup_news(self.html, days, posts), (days, posts))
+
+    def test_articles(self):
+        day_articles, post_articles = parse_news(self.html, days=3, posts=10)
+        self.assertEqual(day_articles[0], {
+            'date': 'October 17, 2023',
+            'title': 'Python Bytes',
+            'link': 'https://pythonbytes.fm/',
+            'description': 'Performance data interpreter guide package & more',
+        })
+        self.assertEqual({article['date'] for article in day_articles},
+                         {'October 17, 2023', 'October 16, 2023', 'October 15, 2023'})
+        self.assertEqual(len(post_articles), 10)
+        self.assertEqual(post_articles[0]['date'], 'October 17, 2023 07:00 PM UTC')
+
+    def test_chunk_boundaries_do_not_matter(self):
+        expected = parse_news(self.html, days=3, posts=10)
+        chunks = (self.html[start:start + 7] for start in range(0, len(self.html), 7))
+        self.assertEqual(parse_news(chunks, days=3, posts=10), expected)
+
+    def test_stops_reading_after_the_requested_articles(self):
+        page = self.html * 50
+        read = []
+
+        def chunks():
+            for start in range(0, len(page), NEWS_CHUNK_SIZE):
+                read.append(start)
+                yield page[start:start + NEWS_CHUNK_SIZE]
+
+        day_articles, _ = parse_news(chunks(), days=1)
+        self.assertEqual({article['date'] for article in day_articles}, {'October 17, 2023'})
+        self.assertLess(len(read), 3)
+
+    def test_missing_elements_get_defaults(self):
+        page = ('<div><h2> Today </h2><h3>No link</h3><p>text</p>'
+                '<h3 class="post"><a href="https://example.com/">Blog</a></h3></div><h4>Outside</h4>')
+        day_articles, post_articles = parse_news(page, days=2, posts=2)
+        self.assertEqual(day_articles, [
+            {'date': 'Today', 'title': 'No link', 'link': 'No link available',
+             'description': 'No description available'},
+            {'date': 'Today', 'title': 'Blog', 'link': 'https://example.com/',
+             'description': 'No description available'},
+        ])
+        self.assertEqual(post_articles, [
+            {'title': 'Blog', 'link': 'https://example.com/', 'date': 'No date available', 'description': 'Outside'},
+        ])
+
+    def test_benchmark(self):
+        result = benchmark(self.html, repeat=1)
+        self.assertTrue(result['same'])
+        self.assertEqual(result['bytes'], len(self.html.encode('utf-8')))
+        self.assertGreater(result['soup_seconds'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
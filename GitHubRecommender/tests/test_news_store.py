@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+from GitHubRecommender.news_store import NewsStore, parse_news_date
+
+
+def make_article(link, day='October 16, 2023'):
+    return {'date': day, 'title': f'Title of {link}', 'link': link, 'description': f'About {link}'}
+
+
+class TestParseNewsDate(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertEqual(parse_news_date('October 16, 2023'), '2023-10-16')
+        self.assertEqual(parse_news_date('October 16, 2023 03:00 PM UTC'), '2023-10-16')
+        self.assertEqual(parse_news_date(' Monday, 16 October 2023 '), '2023-10-16')
+        self.assertIsNone(parse_news_date('yesterday'))
+        self.assertIsNone(parse_news_date(None))
+
+
+class TestNewsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = NewsStore(':memory:')
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_only_unseen_articles_are_appended(self):
+        self.assertEqual(self.store.add([make_article('a'), make_article('b')]), 2)
+        self.assertEqual(self.store.add([make_article('b'), make_article('c'), make_article('c')]), 1)
+        self.assertEqual(len(self.store), 3)
+
+    def test_latest(self):
+        self.store.add([make_article('new', 'October 17, 2023'), make_article('old', 'October 15, 2023')])
+        self.store.add([make_article('newer', 'October 17, 2023'), make_article('middle')])
+
+        latest = self.store.latest(3)
+        self.assertEqual([article['link'] for article in latest], ['newer', 'new', 'middle'])
+        self.assertEqual(latest[0]['published'], '2023-10-17')
+        self.assertEqual(latest[0]['title'], 'Title of newer')
+
+    def test_articles_of_one_run_keep_the_page_order(self):
+        self.store.add([make_article('first'), make_article('second'), make_article('third')])
+        self.assertEqual([article['link'] for article in self.store.latest()], ['first', 'second', 'third'])
+
+    def test_since(self):
+        self.store.add([make_article('new', 'October 17, 2023'), make_article('middle'),
+                        make_article('old', 'October 15, 2023')])
+        self.assertEqual([article['link'] for article in self.store.since('2023-10-16')], ['new', 'middle'])
+        self.assertEqual([article['link'] for article in self.store.since(date(2023, 10, 16), limit=1)], ['new'])
+
+    def test_queries_use_the_index(self):
+        plan = self.store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT link FROM news WHERE published >= ? "
+            "ORDER BY published DESC, fetched_at DESC, rowid LIMIT 5", ('2023-10-16',)
+        ).fetchall()
+        self.assertEqual([row[-1] for row in plan], ['SEARCH news USING INDEX news_published (published>?)'])
+
+    def test_replaced_table_is_upgraded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'python_news.db')
+            conn = sqlite3.connect(path)
+            conn.execute('CREATE TABLE news ("date" TEXT, "title" TEXT, "link" TEXT, "description" TEXT)')
+            conn.executemany("INSERT INTO news VALUES (?, ?, ?, ?)",
+                             [('October 15, 2023', 't', 'a', 'd'), ('October 15, 2023', 't', 'a', 'd')])
+            conn.commit()
+            conn.close()
+
+            store = NewsStore(path)
+            self.assertEqual(len(store), 1)
+            self.assertEqual(store.latest()[0]['published'], '2023-10-15')
+            self.assertEqual(store.add([make_article('a'), make_article('b')]), 1)
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import tracemalloc
+import unittest
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from GitHubRecommender.recommendation_table import (BYTES_PER_SCORE, HYBRID_MODE, RecommendationTable, all_pairs_top_k,
+                                                    chunk_rows, top_k_rows)
+from GitHubRecommender.recommender_system import TfidfIndex, hybrid_matrix
+from GitHubRecommender.tests.test_recommender_system import make_repositories
+
+
+def exact_top_k(matrix, k):
+    # Full sort of every row of the dense similarity matrix, without the row itself
+    dense = matrix.toarray()
+    dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-300)
+    scores = dense @ dense.T
+    np.fill_diagonal(scores, -np.inf)
+    return -np.sort(-scores, axis=1)[:, :k]
+
+
+class TestAllPairsTopK(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(150)
+        self.index = TfidfIndex.build(self.repositories)
+
+    def test_scores_match_exact_similarity(self):
+        neighbours, scores = all_pairs_top_k(self.index.matrix, k=10)
+
+        self.assertEqual(neighbours.shape, (150, 10))
+        np.testing.assert_allclose(scores, exact_top_k(self.index.matrix, 10), atol=1e-12)
+        self.assertFalse((neighbours == np.arange(150)[:, None]).any())
+
+    def test_chunking_and_processes_do_not_change_results(self):
+        matrix = hybrid_matrix(self.index.matrix, self.repositories)
+        single = all_pairs_top_k(matrix, k=7)
+        chunked = all_pairs_top_k(matrix, k=7, memory_limit=BYTES_PER_SCORE * 150 * 16)
+        parallel = all_pairs_top_k(matrix, k=7, memory_limit=BYTES_PER_SCORE * 150 * 16, workers=2)
+
+        for result in (chunked, parallel):
+            np.testing.assert_array_equal(result[0], single[0])
+            np.testing.assert_array_equal(result[1], single[1])
+
+    def test_chunk_rows_respects_memory_limit(self):
+        self.assertEqual(chunk_rows(1000, BYTES_PER_SCORE * 1000 * 64), 64)
+        self.assertEqual(chunk_rows(1000, 1), 1)
+        self.assertEqual(chunk_rows(10, 10 ** 9), 10)
+
+    def test_memory_limit_is_held(self):
+        # Every pair of rows shares a column, so the similarity blocks are fully dense
+        matrix = normalize(sp.random(4000, 300, density=0.2, format='csr', random_state=0))
+        matrix.data += 1.0
+        n_rows, k = matrix.shape[0], 10
+
+        for memory_limit in (4 * 1024 * 1024, 16 * 1024 * 1024):
+            step = chunk_rows(n_rows, memory_limit)
+            tracemalloc.start()
+            try:
+                top_k_rows(matrix, 0, step, k)
+                chunk_peak = tracemalloc.get_traced_memory()[1]
+
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                all_pairs_top_k(matrix, k, memory_limit)
+                total_peak = tracemalloc.get_traced_memory()[1] - baseline
+            finally:
+                tracemalloc.stop()
+
+            self.assertLessEqual(chunk_peak, memory_limit)
+            # Besides the chunk, only the normalized copy of the matrix and the results of every chunk, which are
+            # stacked into the (rows, k) results at the end, are held
+            matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+            self.assertLessEqual(total_peak, memory_limit + matrix_bytes + 2 * n_rows * k * 16)
+
+    def test_k_is_capped_by_corpus_size(self):
+        neighbours, scores = all_pairs_top_k(self.index.matrix[:3], k=10)
+        self.assertEqual(neighbours.shape, (3, 2))
+
+
+class TestRecommendationTable(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(60)
+        self.table = RecommendationTable(':memory:')
+
+    def tearDown(self):
+        self.table.close()
+
+    def test_lookup_returns_precomputed_neighbours(self):
+        self.table.build(self.repositories, k=5)
+        neighbours, scores = all_pairs_top_k(TfidfIndex.build(self.repositories).matrix, k=5)
+
+        lookup = self.table.lookup('user/repo7', top_n=3)
+        self.assertEqual(lookup, [(f'user/repo{i}', float(score)) for i, score in zip(neighbours[7][:3], scores[7][:3])])
+        self.assertEqual([repo['full_name'] for repo in self.table.recommend(self.repositories, 7, top_n=3)],
+                         [name for name, _ in lookup])
+
+    def test_changed_repositories_are_detected(self):
+        self.assertFalse(self.table.is_current(self.repositories))
+        self.table.build(self.repositories, k=5)
+        self.assertTrue(self.table.is_current(self.repositories, k=5))
+        self.assertFalse(self.table.is_current(self.repositories, k=6))
+        self.assertFalse(self.table.is_current(self.repositories, HYBRID_MODE))
+
+        self.repositories[3]['description'] = 'Something else entirely'
+        self.assertFalse(self.table.is_current(self.repositories))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import random
+import tempfile
+import unittest
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import issparse
+from GitHubRecommender.recommender_system import (TfidfIndex, calculate_similarity, content_based_recommendation,
+                                                  hybrid_matrix, preprocess_text, star_features)
+
+
+WORDS = ['web', 'framework', 'python', 'machine', 'learning', 'library', 'fast', 'async', 'http', 'client', 'data',
+         'analysis', 'tutorial', 'awesome', 'list', 'deep', 'neural', 'network', 'api', 'cli', 'tool', 'the', 'a']
+
+
+def make_repositories(count, seed=0):
+    rng = random.Random(seed)
+    repositories = []
+    for i in range(count):
+        # A few repositories without or with duplicate descriptions to exercise ties
+        if i % 11 == 0:
+            description = None
+        elif i % 7 == 0:
+            description = 'A fast web framework'
+        else:
+            description = ' '.join(rng.choice(WORDS).title() if rng.random() < 0.2 else rng.choice(WORDS)
+                                   for _ in range(rng.randint(1, 12)))
+        repositories.append({
+            'full_name': f'user/repo{i}',
+            'name': f'repo{i}',
+            'description': description,
+            'language': rng.choice(['Python', 'Go', None]),
+            'stargazers_count': rng.randint(1000, 50000),
+        })
+    return repositories
+
+
+def reference_recommendation(repositories, base_repo_id, top_n=5):
+    # The original implementation of content_based_recommendation without additional features
+    descriptions = [preprocess_text(repo.get('description', '')) for repo in repositories]
+    base_description = preprocess_text(repositories[base_repo_id].get('description', ''))
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(descriptions)
+    scores = calculate_similarity(vectorizer, matrix, vectorizer.transform([base_description]))
+    return [repositories[i] for i in np.argsort(scores)[::-1][1:top_n+1]]
+
+
+class TestTfidfIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(120)
+        self.index = TfidfIndex.build(self.repositories)
+
+    def test_matches_reference_recommendations(self):
+        for base_repo_id in range(len(self.repositories)):
+            expected = reference_recommendation(self.repositories, base_repo_id)
+            self.assertEqual(self.index.recommend(self.repositories, base_repo_id), expected)
+            self.assertEqual(content_based_recommendation(self.repositories, base_repo_id), expected)
+
+    def test_prebuilt_index_is_reused(self):
+        self.assertEqual(content_based_recommendation(self.repositories, 3, top_n=8, index=self.index),
+                         reference_recommendation(self.repositories, 3, top_n=8))
+
+    def test_transform_matches_vectorizer(self):
+        vectorizer = TfidfVectorizer()
+        vectorizer.fit([preprocess_text(repo['description']) for repo in self.repositories])
+        texts = ['A Python web framework', 'unknown words only', '', 'deep deep learning tutorial']
+
+        np.testing.assert_array_equal(self.index.transform(texts).toarray(),
+                                      vectorizer.transform([preprocess_text(text) for text in texts]).toarray())
+
+    def test_saved_index_is_memory_mapped_and_identical(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.index.save(path)
+            loaded = TfidfIndex.load(path)
+
+            # The matrix is backed by the read-only memory-mapped files rather than copies of them
+            self.assertFalse(loaded.matrix.data.flags.writeable)
+            self.assertIsInstance(loaded.idf, np.memmap)
+            self.assertEqual(len(loaded), len(self.repositories))
+            self.assertEqual(loaded.position('user/repo42'), 42)
+            self.assertEqual(loaded.vocabulary, self.index.vocabulary)
+            for base_repo_id in range(0, len(self.repositories), 7):
+                self.assertEqual(loaded.recommend(self.repositories, base_repo_id),
+                                 self.index.recommend(self.repositories, base_repo_id))
+            del loaded
+
+
+class TestHybridFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(120)
+        self.index = TfidfIndex.build(self.repositories)
+
+    def test_matrix_stays_sparse(self):
+        matrix = hybrid_matrix(self.index.matrix, self.repositories)
+        languages = sum(1 for repo in self.repositories if repo['language'])
+
+        self.assertTrue(issparse(matrix))
+        self.assertEqual(matrix.shape, (len(self.repositories), self.index.matrix.shape[1] + 2 + 2))
+        self.assertLessEqual(matrix.nnz, self.index.matrix.nnz + languages + 2 * len(self.repositories))
+
+    def test_language_only_recommends_the_same_language(self):
+        weights = {'description': 0, 'language': 1, 'stars': 0}
+        recommended = content_based_recommendation(self.repositories, 1, True, top_n=10, feature_weights=weights)
+        self.assertEqual({repo['language'] for repo in recommended}, {self.repositories[1]['language']})
+
+    def test_language_filter(self):
+        scores = self.index.similarity(4)
+        go = [i for i, repo in enumerate(self.repositories) if repo['language'] == 'Go' and i != 4]
+        expected = sorted(go, key=lambda i: (-scores[i], i))[:6]
+
+        recommended = content_based_recommendation(self.repositories, 4, top_n=6, language='go')
+        self.assertEqual(recommended, [self.repositories[i] for i in expected])
+        hybrid = content_based_recommendation(self.repositories, 4, True, top_n=6, language='Go')
+        self.assertEqual({repo['language'] for repo in hybrid}, {'Go'})
+        self.assertEqual(content_based_recommendation(self.repositories, 4, language='Rust'), [])
+
+    def test_similar_star_counts_are_similar(self):
+        repositories = [{'stars': 1000}, {'stars': 1050}, {'stars': 2000}, {'stargazers_count': 90000}]
+        features = star_features(repositories).toarray()
+        similarity = features @ features.T
+
+        np.testing.assert_allclose(np.diag(similarity), 1)
+        self.assertGreater(similarity[0, 1], similarity[0, 2])
+        self.assertGreater(similarity[0, 2], similarity[0, 3])
+
+    def test_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            hybrid_matrix(self.index.matrix, self.repositories, {'forks': 1})
+        with self.assertRaises(ValueError):
+            hybrid_matrix(self.index.matrix, self.repositories, {'description': 0, 'language': 0, 'stars': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
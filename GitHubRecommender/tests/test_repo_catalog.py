@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from GitHubRecommender.repo_catalog import ISSUE_FIELDS, RepositoryCatalog
+
+
+def make_repository(full_name, stars, learning_score, language='Python', **fields):
+    repo = {
+        'full_name': full_name,
+        'name': full_name.split('/')[1],
+        'description': f'The {full_name} repository',
+        'language': language,
+        'stargazers_count': stars,
+        'html_url': f'https://github.com/{full_name}',
+        'updated_at': '2023-01-01T00:00:00Z',
+        'pushed_at': '2023-01-01T00:00:00Z',
+        'open_issues_count': 3,
+        'readme_sha': f'sha-{full_name}',
+        'readme_size': 1200,
+        'learning_score': learning_score,
+        'star_score': stars * 0.35,
+        'weighted_score': round(stars * 0.35 + learning_score * 0.65, 2),
+    }
+    repo.update(fields)
+    return repo
+
+
+class TestRepositoryCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = RepositoryCatalog(':memory:')
+        self.catalog.save([
+            make_repository('user/popular', 20000, 100),
+            make_repository('user/friendly', 3000, 9000),
+            make_repository('user/small', 500, 200),
+            make_repository('user/rusty', 8000, 300, language='Rust'),
+        ])
+
+    def tearDown(self):
+        self.catalog.close()
+
+    def test_ranking_by_weighted_score(self):
+        ranking = self.catalog.ranking()
+        self.assertEqual([repo['full_name'] for repo in ranking],
+                         ['user/popular', 'user/friendly', 'user/rusty', 'user/small'])
+        self.assertEqual(ranking[0]['stargazers_count'], 20000)
+        self.assertEqual(ranking[0]['weighted_score'], 7065.0)
+        self.assertEqual(ranking[0]['open_issues_count'], 3)
+        self.assertIsNone(ranking[0]['good_first_issues'])
+
+    def test_ranking_can_be_saved_again(self):
+        # Rankings use the keys of crawled repositories, so saving one again changes nothing
+        ranking = self.catalog.ranking()
+        self.assertLessEqual({'open_issues_count', *ISSUE_FIELDS}, set(ranking[0]))
+        self.catalog.save(ranking)
+        self.assertEqual(self.catalog.ranking(), ranking)
+
+    def test_ranking_filters(self):
+        python = self.catalog.ranking(language='python', min_stars=1000)
+        self.assertEqual([repo['full_name'] for repo in python], ['user/popular', 'user/friendly'])
+        self.assertEqual(len(self.catalog.ranking(limit=2)), 2)
+        self.assertEqual(self.catalog.ranking(language='Go'), [])
+
+    def test_upsert_updates_and_keeps_readme_metadata(self):
+        # A recrawl that reused the stored score has no new README metadata
+        self.catalog.save([make_repository('user/small', 50000, 200, readme_sha=None, readme_size=None)])
+
+        self.assertEqual(len(self.catalog), 4)
+        repo = self.catalog.lookup('user/small')
+        self.assertEqual(repo['stargazers_count'], 50000)
+        self.assertEqual(repo['readme_sha'], 'sha-user/small')
+        self.assertEqual(self.catalog.ranking()[0]['full_name'], 'user/small')
+
+    def test_unscored_repositories_are_not_ranked(self):
+        repo = make_repository('user/unscored', 100000, 0)
+        del repo['weighted_score']
+        self.catalog.save([repo])
+
+        self.assertIsNone(self.catalog.lookup('user/unscored')['weighted_score'])
+        self.assertNotIn('user/unscored', [repo['full_name'] for repo in self.catalog.ranking()])
+        self.assertIsNone(self.catalog.lookup('user/missing'))
+
+    def test_queries_use_the_indexes(self):
+        plan = self.catalog._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT full_name FROM repositories WHERE language = ? AND stars >= ?", ('python', 0)
+        ).fetchall()
+        self.assertTrue(any('USING INDEX' in row[-1] for row in plan))
+
+    def test_persisted_in_wal_mode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.db')
+            catalog = RepositoryCatalog(path)
+            catalog.save([make_repository('user/popular', 20000, 100)])
+            self.assertEqual(catalog._conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            catalog.close()
+
+            catalog = RepositoryCatalog(path)
+            self.assertEqual([repo['full_name'] for repo in catalog.ranking()], ['user/popular'])
+            catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
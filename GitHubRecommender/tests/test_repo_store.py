@@ -0,0 +1,115 @@
+import copy
+import random
+import unittest
+import numpy as np
+from GitHubRecommender.data_processing import (clean_and_transform, process_repositories, rank_repositories,
+                                               score_repository)
+from GitHubRecommender.recommender_system import content_based_recommendation
+from GitHubRecommender.repo_store import RepositoryRow, RepositoryStore
+from GitHubRecommender.tests.test_recommender_system import make_repositories
+
+
+def make_search_results(count, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for repo in make_repositories(count, seed):
+        owner, name = repo['full_name'].split('/')
+        results.append({
+            'full_name': repo['full_name'],
+            'name': f'{name.title()}-Py.{rng.randint(0, 9)}',
+            'description': repo['description'],
+            'language': repo['language'],
+            'stargazers_count': rng.choice([100, 4999, 5000, 7500, 10000, 10001, 250000]),
+            'url': f'https://api.github.com/repos/{repo["full_name"]}',
+            'html_url': f'https://github.com/{repo["full_name"]}',
+            'updated_at': '2023-01-01T00:00:00Z',
+            'forks_count': rng.randint(0, 100),
+        })
+    return results
+
+
+class TestRepositoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.results = make_search_results(200)
+        self.store = RepositoryStore.from_repositories(self.results)
+
+    def test_only_used_fields_are_kept(self):
+        row = self.store[3]
+        self.assertIsInstance(row, RepositoryRow)
+        self.assertEqual(row['full_name'], 'user/repo3')
+        self.assertEqual(row['stars'], self.results[3]['stargazers_count'])
+        self.assertEqual(row['stargazers_count'], self.results[3]['stargazers_count'])
+        self.assertEqual(row['url'], 'https://github.com/user/repo3')
+        self.assertNotIn('forks_count', row)
+        self.assertEqual(self.store[-1]['full_name'], 'user/repo199')
+        with self.assertRaises(IndexError):
+            self.store[200]
+
+    def test_strings_are_interned(self):
+        self.assertEqual(sorted(self.store.interned['language']), ['Go', 'Python'])
+        self.assertEqual(self.store.columns['language'].dtype, np.int32)
+        self.assertEqual(self.store.column('language').tolist(), [repo['language'] for repo in self.results])
+
+        self.store[0]['language'] = 'Rust'
+        self.assertEqual(self.store[0]['language'], 'Rust')
+        self.assertEqual(len(self.store.interned['language']), 3)
+
+    def test_rows_are_writable_views(self):
+        score_repository(self.store[5], 'Getting started? FAQ')
+        self.assertEqual(self.store.columns['star_score'][5], self.results[5]['stargazers_count'] * 0.35)
+        self.assertEqual(self.store[5]['learning_score'], score_repository({'stargazers_count': 0},
+                                                                         'Getting started? FAQ')['learning_score'])
+
+    def test_slices_and_takes_are_copies(self):
+        part = self.store[10:20]
+        part[0]['name'] = 'changed'
+        self.assertEqual(len(part), 10)
+        self.assertEqual(self.store[10]['name'], self.results[10]['name'])
+        self.assertEqual([row['full_name'] for row in self.store.take([4, 2])], ['user/repo4', 'user/repo2'])
+
+
+class TestStoreProcessing(unittest.TestCase):
+
+    def setUp(self):
+        self.results = make_search_results(300)
+        for repo in self.results:
+            repo['url'] = repo['html_url']
+        self.results[7].pop('updated_at')
+
+    def test_clean_and_transform_matches_list(self):
+        expected = clean_and_transform(copy.deepcopy(self.results))
+        store = clean_and_transform(RepositoryStore.from_repositories(self.results))
+
+        for field in ('name', 'url', 'category', 'updated_at', 'stars'):
+            self.assertEqual(store.column(field).tolist(), [repo[field] for repo in expected], field)
+
+    def test_rank_matches_list(self):
+        rng = random.Random(1)
+        for repo in self.results:
+            score_repository(repo, None, rng.choice([0, 100, 150, 333, 1000]))
+        expected = rank_repositories(copy.deepcopy(self.results))
+        ranked = rank_repositories(RepositoryStore.from_repositories(self.results))
+
+        self.assertEqual(ranked.column('full_name').tolist(), [repo['full_name'] for repo in expected])
+        self.assertEqual(ranked.column('weighted_score').tolist(), [repo['weighted_score'] for repo in expected])
+
+    def test_process_repositories_copies_the_store(self):
+        store = RepositoryStore.from_repositories(self.results)
+        processed = process_repositories(store)
+        self.assertIsNot(processed, store)
+        self.assertEqual(processed.to_repositories(), store.to_repositories())
+
+    def test_recommendations_match_list(self):
+        store = RepositoryStore.from_repositories(self.results)
+        for use_additional_features in (False, True):
+            for base_repo_id in (0, 17, 123):
+                self.assertEqual(
+                    [repo['full_name'] for repo in content_based_recommendation(store, base_repo_id,
+                                                                                use_additional_features)],
+                    [repo['full_name'] for repo in content_based_recommendation(self.results, base_repo_id,
+                                                                                use_additional_features)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import asyncio
+import http.client
+import json
+import tempfile
+import threading
+import unittest
+from GitHubRecommender.recommender_system import TfidfIndex
+from GitHubRecommender.server import (REPOSITORIES_FILE, LRUCache, RecommendationServer, RecommendationService,
+                                      save_catalog)
+from GitHubRecommender.tests.test_recommender_system import make_repositories
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'entries': 2, 'hit_ratio': 0.75})
+
+
+class TestRecommendationService(unittest.TestCase):
+
+    def setUp(self):
+        self.repositories = make_repositories(80)
+        self.index = TfidfIndex.build(self.repositories)
+
+    def test_lsh_backend(self):
+        exact = RecommendationService(self.repositories, self.index)
+        # One bit probed on both sides puts every repository into the candidates, so the results are exact
+        lsh = RecommendationService(self.repositories, self.index, backend='lsh',
+                                    lsh_parameters={'n_tables': 1, 'n_bits': 1, 'n_probes': 1})
+        scores = lambda repos: sorted(round(repo['score'], 12) for repo in repos)
+
+        for features in ('description', 'hybrid'):
+            self.assertEqual(scores(lsh.recommend('user/repo4', 7, features)),
+                             scores(exact.recommend('user/repo4', 7, features)))
+        go = lsh.recommend('user/repo4', 7, language='go')
+        self.assertEqual(scores(go), scores(exact.recommend('user/repo4', 7, language='go')))
+        self.assertEqual({repo['language'] for repo in go}, {'Go'})
+
+        with self.assertRaises(ValueError):
+            RecommendationService(self.repositories, self.index, backend='faiss')
+
+
+class TestRecommendationServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalog = f'{self.directory.name}/catalog'
+        self.repositories = make_repositories(80)
+        save_catalog(self.repositories, self.catalog)
+
+        self.server = RecommendationServer(self.catalog)
+        self.loop = asyncio.new_event_loop()
+        self.listener = self.loop.run_until_complete(self.server.start('127.0.0.1', 0))
+        self.port = self.listener.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+
+    def tearDown(self):
+        self.connection.close()
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.directory.cleanup()
+
+    async def shutdown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def request(self, method, path):
+        self.connection.request(method, path)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def exact_neighbours(self, repositories, row, k):
+        index = TfidfIndex.build(repositories)
+        scores = index.similarity(row)
+        scores[row] = -1
+        return sorted(range(len(repositories)), key=lambda i: (-scores[i], i))[:k]
+
+    def test_recommendations_match_exact_similarity(self):
+        status, payload = self.request('GET', '/recommend?repo=user/repo4&k=7')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([repo['full_name'] for repo in payload['recommendations']],
+                         [self.repositories[i]['full_name'] for i in self.exact_neighbours(self.repositories, 4, 7)])
+        self.assertEqual(len(self.request('GET', '/recommend?repo=user/repo4&features=hybrid')[1]['recommendations']), 5)
+
+    def test_repeated_query_is_cached(self):
+        first = self.request('GET', '/recommend?repo=user/repo9&k=3')
+        second = self.request('GET', '/recommend?repo=user/repo9&k=3')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.request('GET', '/health')[1]['cache']['hits'], 1)
+
+    def test_errors(self):
+        self.assertEqual(self.request('GET', '/recommend?repo=user/missing')[0], 404)
+        self.assertEqual(self.request('GET', '/recommend?repo=user/repo1&k=abc')[0], 400)
+        self.assertEqual(self.request('GET', '/recommend?repo=user/repo1&k=0')[0], 400)
+        self.assertEqual(self.request('GET', '/recommend?repo=user/repo1&features=forks')[0], 400)
+        self.assertEqual(self.request('GET', '/unknown')[0], 404)
+        self.assertEqual(self.request('GET', '/reload')[0], 405)
+
+    def test_reload_swaps_in_a_new_catalog(self):
+        self.request('GET', '/recommend?repo=user/repo4&k=3')
+        repositories = make_repositories(120, seed=1)
+        save_catalog(repositories, self.catalog)
+
+        self.assertEqual(self.request('POST', '/reload'), (200, {'repositories': 120}))
+        status, payload = self.request('GET', '/recommend?repo=user/repo100&k=3')
+        self.assertEqual(status, 200)
+        self.assertEqual([repo['full_name'] for repo in payload['recommendations']],
+                         [repositories[i]['full_name'] for i in self.exact_neighbours(repositories, 100, 3)])
+
+    def test_language_filter(self):
+        status, payload = self.request('GET', '/recommend?repo=user/repo4&k=7&language=go')
+        go = [repo for i, repo in enumerate(self.repositories) if repo['language'] == 'Go' and i != 4]
+        everything = self.request('GET', '/recommend?repo=user/repo4&k=79')[1]['recommendations']
+        scores = {repo['full_name']: repo['score'] for repo in everything}
+        expected = sorted(go, key=lambda repo: -scores[repo['full_name']])[:7]
+
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['language'], 'go')
+        self.assertEqual([repo['full_name'] for repo in payload['recommendations']],
+                         [repo['full_name'] for repo in expected])
+        self.assertEqual(self.request('GET', '/recommend?repo=user/repo4&language=Rust')[1]['recommendations'], [])
+
+    def test_metrics_are_exported_for_prometheus(self):
+        self.request('GET', '/recommend?repo=user/repo4&k=3')
+        self.request('GET', '/recommend?repo=user/repo4&k=3')
+
+        self.connection.request('GET', '/metrics')
+        response = self.connection.getresponse()
+        text = response.read().decode()
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.getheader('Content-Type').startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE github_recommender_stage_seconds_total counter', text)
+        self.assertIn('github_recommender_stage_calls_total{stage="recommendation"}', text)
+        self.assertIn('github_recommender_catalog_repositories 80', text)
+        self.assertIn('github_recommender_result_cache_hit_ratio 0.5', text)
+        self.assertEqual(self.request('POST', '/metrics')[0], 405)
+
+    def test_saved_catalog_is_patched(self):
+        self.assertEqual(save_catalog(self.repositories, self.catalog), 0)
+        repositories = self.repositories[40:] + self.repositories[:30]
+        repositories[0] = dict(repositories[0], description='A brand new gizmo for async data')
+        self.assertEqual(save_catalog(repositories, self.catalog), 11)
+
+        self.assertEqual(self.request('POST', '/reload'), (200, {'repositories': 70}))
+        with open(f'{self.catalog}/{REPOSITORIES_FILE}', encoding='utf-8') as f:
+            saved = json.load(f)
+        # The repositories are saved in the order of the rows of the patched index
+        self.assertEqual([repo['full_name'] for repo in saved],
+                         [f'user/repo{i}' for i in list(range(30)) + list(range(40, 80))])
+        status, payload = self.request('GET', '/recommend?repo=user/repo40&k=3')
+        self.assertEqual(status, 200)
+        self.assertEqual([repo['full_name'] for repo in payload['recommendations']],
+                         [saved[i]['full_name'] for i in self.exact_neighbours(saved, 30, 3)])
+
+    def test_slow_recommendation_does_not_block_other_requests(self):
+        service = self.server.service
+        recommend, started, release = service.recommend, threading.Event(), threading.Event()
+
+        def slow_recommend(*args):
+            started.set()
+            release.wait(10)
+            return recommend(*args)
+
+        service.recommend = slow_recommend
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        responses = []
+        thread = threading.Thread(target=lambda: (connection.request('GET', '/recommend?repo=user/repo4'),
+                                                  responses.append(connection.getresponse().status)))
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            self.assertEqual(self.request('GET', '/health')[0], 200)
+            self.assertEqual(responses, [])
+        finally:
+            release.set()
+            thread.join()
+            connection.close()
+        self.assertEqual(responses, [200])
+
+    def test_failed_reload_keeps_serving(self):
+        # Repositories without their full name raise a KeyError while the catalog is loaded
+        with open(f'{self.catalog}/{REPOSITORIES_FILE}', 'w', encoding='utf-8') as f:
+            json.dump([{key: value for key, value in repo.items() if key != 'full_name'} for repo in self.repositories],
+                      f)
+        self.assertEqual(self.request('POST', '/reload')[0], 500)
+
+        self.directory.cleanup()
+        self.assertEqual(self.request('POST', '/reload')[0], 500)
+        self.assertEqual(self.request('GET', '/recommend?repo=user/repo4')[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
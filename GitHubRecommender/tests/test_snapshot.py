@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+from GitHubRecommender import main as main_module
+from GitHubRecommender.benchmark import StandInServer, make_readme
+from GitHubRecommender.data_acquisition import fetch_repositories
+from GitHubRecommender.http_client import set_client
+from GitHubRecommender.snapshot import (SNAPSHOT_VERSION, SnapshotWriter, export_snapshot, iter_records,
+                                        iter_repositories, load_news, load_repositories, read_header)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'crawl.jsonl.gz')
+        self.server = StandInServer(corpus_size=150)
+        set_client(self.server.client())
+
+    def tearDown(self):
+        set_client(None)
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def export(self, **kwargs):
+        return export_snapshot(self.path, 'python', 100, news_url=self.server.news_url, **kwargs)
+
+    def test_export(self):
+        self.assertEqual(self.export(max_repos=120, max_workers=4), (120, 15))
+
+        header = read_header(self.path)
+        self.assertEqual(header['version'], SNAPSHOT_VERSION)
+        self.assertEqual((header['language'], header['min_stars'], header['max_repos']), ('python', 100, 120))
+
+        repos = list(iter_repositories(self.path))
+        self.assertEqual(repos[3][0]['full_name'], 'owner3/repo3')
+        self.assertEqual(repos[3][1], make_readme(3))
+        self.assertEqual(repos[3][0]['readme_size'], len(make_readme(3)))
+        self.assertEqual(len(load_news(self.path)), 15)
+
+    def test_ranking_matches_a_crawl(self):
+        self.export(max_repos=120)
+        crawled = fetch_repositories('python', 100, max_repos=120)
+        self.server.close()
+
+        # Loading the snapshot must not open a single connection
+        with mock.patch.object(socket.socket, 'connect', side_effect=AssertionError("network access")):
+            loaded = load_repositories(self.path)
+
+        self.assertEqual([(repo['full_name'], repo['weighted_score']) for repo in loaded],
+                         [(repo['full_name'], repo['weighted_score']) for repo in crawled])
+
+    def test_writer(self):
+        with SnapshotWriter(self.path, {'language': 'go'}) as writer:
+            writer.write_repository({'full_name': 'user/repo', 'stargazers_count': 10}, '# Ünïcode')
+            writer.write_news({'title': 'News'})
+        self.assertEqual((writer.repositories, writer.news), (1, 1))
+
+        self.assertEqual([record['type'] for record in iter_records(self.path)], ['repository', 'news'])
+        self.assertEqual(list(iter_repositories(self.path)),
+                         [({'full_name': 'user/repo', 'stargazers_count': 10}, '# Ünïcode')])
+
+    def test_unsupported_files(self):
+        with gzip.open(self.path, 'wt') as f:
+            f.write(json.dumps({'format': 'github-recommender-snapshot', 'version': SNAPSHOT_VERSION + 1}) + '\n')
+        with self.assertRaises(ValueError):
+            read_header(self.path)
+
+        with gzip.open(self.path, 'wt') as f:
+            f.write('full_name,stars\n')
+        with self.assertRaises(ValueError):
+            list(iter_records(self.path))
+
+    def test_main_runs_offline(self):
+        self.export(max_repos=40)
+        self.server.close()
+
+        argv = ['main', '--snapshot', self.path, '--database', os.path.join(self.directory, 'catalog.db'),
+                '--recommendations', os.path.join(self.directory, 'recommendations.db')]
+        output = StringIO()
+        with mock.patch('sys.argv', argv), mock.patch('builtins.input', side_effect=['0', 'no']), \
+                mock.patch.object(main_module.da, 'store_news_to_db'), \
+                mock.patch.object(socket.socket, 'connect', side_effect=AssertionError("network access")), \
+                redirect_stdout(output):
+            main_module.main()
+
+        self.assertIn('Recommended Repositories:', output.getvalue())
+        self.assertIn('39: ', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
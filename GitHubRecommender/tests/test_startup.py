@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Importing every module of the package must stay well below this many seconds
+IMPORT_TIME_BUDGET = 0.5
+
+# Dependencies that must only be imported on first use
+HEAVY_MODULES = ('pandas', 'bs4', 'sklearn', 'numpy', 'requests')
+
+STARTUP_SCRIPT = """
+import json
+import socket
+import sys
+import time
+
+def refuse_network(*args, **kwargs):
+    raise AssertionError('network access during import')
+
+socket.socket.connect = refuse_network
+socket.create_connection = refuse_network
+
+start = time.perf_counter()
+import GitHubRecommender.crawl_state
+import GitHubRecommender.data_acquisition
+import GitHubRecommender.data_processing
+import GitHubRecommender.fetch_repos
+import GitHubRecommender.graphql_acquisition
+import GitHubRecommender.http_cache
+import GitHubRecommender.http_client
+import GitHubRecommender.main
+import GitHubRecommender.news_acquisition
+import GitHubRecommender.recommender_system
+elapsed = time.perf_counter() - start
+
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(name.split('.')[0] for name in sys.modules)}))
+"""
+
+
+class TestStartup(unittest.TestCase):
+
+    def import_package(self):
+        # Import in a fresh interpreter, so that nothing imported by other tests is already cached
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stderr, '')
+        return json.loads(result.stdout)
+
+    def test_import_has_no_side_effects(self):
+        # Any network access or printing during import fails the import script or leaves extra output
+        self.assertIsInstance(self.import_package(), dict)
+
+    def test_heavy_dependencies_are_lazy(self):
+        modules = set(self.import_package()['modules'])
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules)
+
+    def test_import_time_within_budget(self):
+        self.assertLess(self.import_package()['elapsed'], IMPORT_TIME_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
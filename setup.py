@@ -5,7 +5,7 @@ setup(
     version='0.1',
     packages=find_packages(),
     install_requires=[
-        'requests', 'numpy', 'scikit-learn', 'argparse',
+        'requests', 'numpy', 'scipy', 'scikit-learn', 'argparse',
         
     ],
     author='Yubin Xiao',